@@ -3,6 +3,7 @@ import logging
 from flask import Flask
 
 from csh_fantasy_bot.extensions import celery
+from csh_fantasy_bot.scoring_serializer import register_scoring_serializer
 
 log = logging.getLogger(__name__)
 
@@ -24,6 +25,8 @@ def init_celery(app=None):
     celery.conf.BROKER_URL = app.config["CELERY_BROKER_URL"]
     celery.conf.backend = app.config["CELERY_RESULT_BACKEND"]
     log.info('Setting celery config')
+    # accepted by the workers and used for results, see CELERY_ACCEPT_CONTENT
+    register_scoring_serializer()
     celery.conf.update(app.config)
 
     class ContextTask(celery.Task):
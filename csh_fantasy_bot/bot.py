@@ -21,7 +21,8 @@ from pandas.core.indexes.datetimes import date_range
 from csh_fantasy_bot import utils, yahoo_scraping
 from csh_fantasy_bot.league import FantasyLeague
 from csh_fantasy_bot.nhl import score_team
-from csh_fantasy_bot.scoring import ScoreComparer
+from csh_fantasy_bot.projection_table import ProjectionTable
+from csh_fantasy_bot.scoring import ScoreComparer, yahoo_player_variances
 from csh_fantasy_bot.yahoo_projections import (
     produce_csh_ranking, retrieve_yahoo_rest_of_season_projections)
 
@@ -99,8 +100,12 @@ class GameWeek:
     @property
     def score_comparer(self):
         if not self._score_comparer:
-            self._score_comparer = ScoreComparer(self.team_scores.values(), self.manager.stat_categories)
+            self._score_comparer = ScoreComparer(self.team_scores, self.manager.stat_categories)
+            nhl_variances = utils.StatsCache().load_player_variances()
+            if nhl_variances is not None:
+                self._score_comparer.player_variances = yahoo_player_variances(nhl_variances, self.all_players)
             self._score_comparer.opp_sum = self.opponent.scores().sum()
+            self._score_comparer.opp_variances = self._score_comparer.lineup_variances(self.opponent.scores())
 
         return self._score_comparer
 
@@ -124,11 +129,49 @@ class GameWeek:
     @property
     def team_scores(self):
         if not self._team_scores:
-            self._team_scores =  {tm['team_key'].split('.')[-1]:self.manager.lg.score_team_fpts(self.all_player_predictions[self.all_player_predictions.fantasy_status == int(tm['team_key'].split('.')[-1])], \
-                                    date_range=self.date_range, simulation_mode=self.simulation_mode, team_id=tm['team_key'])[1] 
-                                for tm in self.manager.lg.teams()}
+            team_keys = [tm['team_key'] for tm in self.manager.lg.teams()]
+            league_scores = self.manager.lg.score_teams_fpts(self.all_player_predictions, team_keys,
+                                    date_range=self.date_range, simulation_mode=self.simulation_mode)
+            self._team_scores = {team_key.split('.')[-1]:results for team_key, results in league_scores.items()}
         return self._team_scores
 
+    def update_team_scores(self, team_key, team_scores):
+        """Replace a team's projected scores, such as after a transaction, updating the league statistics in place."""
+        team_number = team_key.split('.')[-1]
+        self.team_scores[team_number] = team_scores
+        if self._score_comparer:
+            self._score_comparer.update_team(team_number, team_scores)
+            if team_key == self.opponent.key:
+                self._score_comparer.opp_sum = team_scores.sum()
+                self._score_comparer.opp_variances = self._score_comparer.lineup_variances(team_scores)
+
+    def apply_transactions(self, as_of):
+        """Move the week's rosters to as_of, rescoring only the teams whose rosters changed.
+
+        The league statistics are updated in place with update_team_scores rather than rebuilt.
+
+        Returns:
+            list: keys of the teams rescored
+        """
+        self.as_of = as_of
+        self._all_players = None
+        if self._all_player_predictions is None:
+            return []
+        predictions = self._all_player_predictions
+        fantasy_status = self.all_players.fantasy_status.reindex(predictions.index)
+        moved = fantasy_status.ne(predictions.fantasy_status) & fantasy_status.notna()
+        changed_teams = {status for status in pd.concat([predictions.fantasy_status[moved], fantasy_status[moved]]) if isinstance(status, (int, np.integer))}
+        predictions.loc[moved, 'fantasy_status'] = fantasy_status[moved]
+        if not self._team_scores:
+            return []
+
+        team_keys = [f"{self.manager.lg.league_id}.t.{team_number}" for team_number in sorted(changed_teams)]
+        for team_key in team_keys:
+            _, team_scores = self.manager.lg.score_team_fpts(predictions[predictions.fantasy_status == int(team_key.split('.')[-1])],
+                                                             date_range=self.date_range, simulation_mode=self.simulation_mode, team_id=team_key)
+            self.update_team_scores(team_key, team_scores)
+        return team_keys
+
     def score(self, team_number=None, team_key=None, scoring_algo=ScoringAlgorithm.fpts):
         if team_key:
             team_number = team_key.split('.')[-1]
@@ -289,6 +332,18 @@ class ManagerBot:
             self._current_week = self.lg.current_week()
         return self._current_week
 
+    def apply_transactions(self, as_of=None):
+        """Apply roster transactions up to as_of, defaulting to now, to the loaded game weeks.
+
+        Returns:
+            list: keys of the teams rescored
+        """
+        self._as_of = as_of or datetime.now()
+        rescored = []
+        for game_week in self._game_weeks.values():
+            rescored += game_week.apply_transactions(self._as_of)
+        return rescored
+
     def week_for_day(self, day):
         for _, game_week in self._game_weeks.items():
             if day in game_week.date_range:
@@ -445,7 +500,7 @@ class ManagerBot:
         projections_no_goalies = all_projections[all_projections.position_type == 'P']
         return projections_no_goalies[projections_no_goalies.fantasy_status == int(team_id.split('.')[-1])]
 
-    def score_team(self,player_projections=None, opponent_scores=None, date_range=None, roster_change_set=None, simulation_mode=True, date_last_use_actuals=None, team_id=None):
+    def score_team(self,player_projections=None, opponent_scores=None, date_range=None, roster_change_set=None, simulation_mode=True, date_last_use_actuals=None, team_id=None, projection_table=None):
         if date_range is None:
             date_range = self.game_week(self.current_week).date_range
 
@@ -461,7 +516,11 @@ class ManagerBot:
                 opponent_scores = self.opponent.scores().sum()
             else:
                 opponent_scores = defaultdict(lambda: 0)
-        return self.lg.score_team(player_projections, date_range, opponent_scores, roster_change_set, simulation_mode=simulation_mode, team_id=team_id)
+        if roster_change_set and projection_table is None:
+            # players added are looked up in the week's predictions
+            projection_table = ProjectionTable(self.week_for_day(date_range[0]).all_player_predictions)
+        return self.lg.score_team(player_projections, date_range, opponent_scores, roster_change_set, simulation_mode=simulation_mode, team_id=team_id,
+                                  projection_table=projection_table)
 
 
     def invalidate_free_agents(self, plyrs):
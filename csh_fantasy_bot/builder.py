@@ -6,6 +6,7 @@ from nhl_scraper import nhl
 import logging
 import datetime
 from csh_fantasy_bot import roster
+from csh_fantasy_bot.schedule import nhl_schedule
 
 logger = logging.getLogger()
 
@@ -33,8 +34,8 @@ class Builder:
         print('day of week for start: {}'.format(wk_start_date.weekday()))
         #assert(wk_start_date.weekday() == 0)
         wk_end_date = week_date_range[1]
-        self.team_game_count = self.nhl_scraper.games_count(wk_start_date,
-                                                            wk_end_date)
+        self.team_game_count = nhl_schedule(wk_start_date).games_count(wk_start_date,
+                                                                       wk_end_date)
         self.nhl_players = self.nhl_scraper.players()
 
     def predict(self, roster_cont):
@@ -192,7 +193,7 @@ class Scorer:
         stat_cols = ["G", "A", "SOG", "+/-", "HIT", "PIM", "FW"]# + temp_stat_cols
         res = dict.fromkeys(stat_cols, 0)
         for single_date in week:
-            todays_games = self.nhl_scraper.games_count(single_date, single_date)
+            todays_games = nhl_schedule(single_date).games_count(single_date, single_date)
             df["GAMEPLAYED-{}".format(single_date.strftime("%Y-%m-%d"))] = df[
                 "team_id"].map(todays_games)
            # print(df.head(10))
@@ -235,7 +236,7 @@ class Scorer:
             # compute expected output for all players on roster, maximize score
             #rosters_projections = roster_df.merge(self.player_projections, left_on='name', right_on='Name')
             print(single_date.strftime("%Y-%m-%d"))
-            todays_games = self.nhl_scraper.games_count(single_date,single_date)
+            todays_games = nhl_schedule(single_date).games_count(single_date,single_date)
             roster_with_projections["GAMEPLAYED{}".format(single_date.strftime("%Y-%m-%d"))] = roster_with_projections["team_id"].map(todays_games)
 
             roster_with_projections['fpts{}'.format( single_date.strftime("%Y-%m-%d"))] = 0
@@ -2,6 +2,9 @@ import numpy as np
 import pandas as pd
 import pymongo
 
+from csh_fantasy_bot.scoring import per_game_variances
+from csh_fantasy_bot.utils import StatsCache
+
 pd.set_option('display.max_columns', 500)
 pd.set_option('display.width', 1000)
 
@@ -84,4 +87,8 @@ query_result = list(query_result)
 # box_scores = mydb.box_scores.find()
 
 box_score_df = pd.DataFrame(list(query_result))
-pass
+# per game variances for ScoreComparer.player_variances, to score with ScoringType.win_probability.
+# box scores are keyed by NHL player id, keep each player's name and team to match him to his yahoo player_id
+player_variances = per_game_variances(box_score_df, scoring_categories)
+last_games = box_score_df.sort_values('game_date').groupby('player_id')[['player_name', 'team_id']].last()
+StatsCache().write_player_variances(player_variances.join(last_games))
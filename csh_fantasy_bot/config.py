@@ -42,3 +42,28 @@ GELF_URL = os.getenv("GELF_URL", default=None)
 
 CACHE_BACKING = CacheBacking[os.getenv("FB_CACHE_BACKING", default=CacheBacking.file.value)]
 OAUTH_TOKEN_BACKING = CacheBacking[os.getenv("FB_OAUTH_TOKEN_BACKING", default=CacheBacking.file.value)]
+# solver backend for score_gekko lineups, gekko, highs, piecewise or piecewise-polished
+LINEUP_SOLVER = os.getenv("FB_LINEUP_SOLVER", default="gekko")
+# solver backend for choosing add/drops and lineups together, a MILP too large for gekko's MINLP solver
+ROSTER_CHANGE_SOLVER = os.getenv("FB_ROSTER_CHANGE_SOLVER", default="piecewise")
+# budget for each lineup solve, when it runs out the best lineups found so far are used
+LINEUP_SOLVE_TIME_LIMIT = float(os.getenv("FB_LINEUP_SOLVE_TIME_LIMIT", default=30))
+LINEUP_SOLVE_MAX_ITERATIONS = int(os.getenv("FB_LINEUP_SOLVE_MAX_ITERATIONS", default=250))
+# solved lineups kept in process and in redis whatever the cache backing
+SOLUTION_CACHE_SIZE = int(os.getenv("FB_SOLUTION_CACHE_SIZE", default=4096))
+SOLUTION_CACHE_TTL = float(os.getenv("FB_SOLUTION_CACHE_TTL", default=3600))
+# lineups a solve fell back to the fpts lineups for, maybe out of time, are only kept briefly
+GREEDY_SOLUTION_TTL = float(os.getenv("FB_GREEDY_SOLUTION_TTL", default=60))
+# where the GA scores change sets, celery workers or a local process pool
+FITNESS_EXECUTOR = os.getenv("FB_FITNESS_EXECUTOR", default="celery")
+FITNESS_WORKERS = int(os.getenv("FB_FITNESS_WORKERS", default=os.cpu_count() or 1))
+# change sets the GA remembers the score and scoring summary of for the run
+FITNESS_MEMO_SIZE = int(os.getenv("FB_FITNESS_MEMO_SIZE", default=2048))
+# scoring contexts published for the workers, kept in process and in redis whatever the cache backing
+SCORING_CONTEXT_CACHE_SIZE = int(os.getenv("FB_SCORING_CONTEXT_CACHE_SIZE", default=16))
+SCORING_CONTEXT_TTL = float(os.getenv("FB_SCORING_CONTEXT_TTL", default=86400))
+# celery serializer of the scoring tasks, and size in bytes above which their payloads are compressed
+SCORING_SERIALIZER = "fantasy-scoring"
+SCORING_COMPRESS_THRESHOLD = int(os.getenv("FB_SCORING_COMPRESS_THRESHOLD", default=16384))
+CELERY_ACCEPT_CONTENT = ['json', SCORING_SERIALIZER]
+CELERY_RESULT_SERIALIZER = SCORING_SERIALIZER
@@ -0,0 +1,116 @@
+"""Executors that score a GA population's roster change sets, on celery workers or in a local process pool."""
+import logging
+import multiprocessing
+
+from concurrent.futures import ProcessPoolExecutor
+
+from csh_fantasy_bot.config import FITNESS_EXECUTOR, FITNESS_WORKERS
+from csh_fantasy_bot.schedule import nhl_schedule
+from csh_fantasy_bot.tasks import CHUNK_SIZE, chunks, get_league, score_change_sets, score_chunk, _league_id_from_team_key
+
+log = logging.getLogger(__name__)
+
+
+class CeleryFitnessExecutor:
+    """Score chunks of change sets as a celery group, needs a broker and result backend."""
+
+    def score(self, context, roster_change_sets):
+        """Score the team with each change set.
+
+        Args:
+            context (ScoringContext): Team, days and opponent to score in, published for the workers
+            roster_change_sets (list): Change sets to score, each with an _id
+
+        Returns:
+            list: (_id, scoring results) of each change set
+        """
+        return score_chunk(context, roster_change_sets)
+
+    def shutdown(self):
+        """Nothing to release."""
+
+
+# what a pool's workers score with, set before the pool starts so forked workers inherit it
+_worker_context = None
+
+
+def _init_worker(context):
+    global _worker_context
+    if context is not None:
+        _worker_context = context
+
+
+def _score_chunk(roster_change_sets):
+    league = get_league(_league_id_from_team_key(_worker_context.team_key))
+    return [(rc._id, score) for rc, score in score_change_sets(league, _worker_context, roster_change_sets)]
+
+
+class ProcessPoolFitnessExecutor:
+    """Score chunks of change sets in a local process pool, without a broker or serializing the roster per chunk.
+
+    The ScoringContext is handed to the workers once, when the pool starts.  Where processes are forked
+    the workers inherit it, along with the league and the memory mapped NHL schedule loaded here first;
+    otherwise it is pickled to each worker once.  The pool is kept for the next generation and only
+    restarted for a context with a different key.
+
+    Args:
+        max_workers (int, optional): Worker processes. Defaults to FITNESS_WORKERS.
+        chunk_size (int, optional): Change sets scored per task. Defaults to CHUNK_SIZE.
+    """
+
+    def __init__(self, max_workers=FITNESS_WORKERS, chunk_size=CHUNK_SIZE):
+        self.max_workers = max_workers
+        self.chunk_size = chunk_size
+        self._executor = None
+        self._context_key = None
+
+    def _pool(self, context):
+        global _worker_context
+        if self._executor is None or context.key != self._context_key:
+            self.shutdown()
+            _worker_context = context
+            if 'fork' in multiprocessing.get_all_start_methods():
+                # load once here, forked workers share it
+                get_league(_league_id_from_team_key(context.team_key))
+                nhl_schedule(context.date_range[0])
+                self._executor = ProcessPoolExecutor(self.max_workers, mp_context=multiprocessing.get_context('fork'),
+                                                     initializer=_init_worker, initargs=(None,))
+            else:
+                self._executor = ProcessPoolExecutor(self.max_workers, initializer=_init_worker, initargs=(_worker_context,))
+            self._context_key = context.key
+        return self._executor
+
+    def score(self, context, roster_change_sets):
+        """Score the team with each change set, see CeleryFitnessExecutor.score."""
+        executor = self._pool(context)
+        log.debug(f"start score, # roster change sets: {len(roster_change_sets)}")
+        futures = [executor.submit(_score_chunk, chunk) for chunk in chunks(roster_change_sets, self.chunk_size)]
+        results = []
+        for future in futures:
+            try:
+                results.extend(future.result())
+            except Exception as e:
+                log.exception(e)
+        return results
+
+    def shutdown(self):
+        """Stop the pool's workers."""
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+
+FITNESS_EXECUTORS = {
+    'celery': CeleryFitnessExecutor,
+    'process': ProcessPoolFitnessExecutor,
+}
+
+_fitness_executor = None
+
+
+def fitness_executor():
+    """The FITNESS_EXECUTOR configured, created once per process so a pool lasts across generations."""
+    global _fitness_executor
+    if _fitness_executor is None:
+        _fitness_executor = FITNESS_EXECUTORS[FITNESS_EXECUTOR]()
+    return _fitness_executor
@@ -2,20 +2,27 @@
 import random
 import logging 
 from copy import deepcopy as copy 
+from collections import OrderedDict, namedtuple
 from contextlib import suppress
 from enum import Enum
 
+import numpy as np
+
 from pygenetic import ChromosomeFactory, GAEngine
 
+from csh_fantasy_bot.config import FITNESS_MEMO_SIZE
 from csh_fantasy_bot.league import FantasyLeague
+from csh_fantasy_bot.projection_table import ProjectionTable
 from csh_fantasy_bot.roster_change_optimizer import RosterChangeSet, RosterException, RosterChange
-from csh_fantasy_bot.tasks import score_chunk
+from csh_fantasy_bot.scoring_context import ScoringContext
+from csh_fantasy_bot.fitness_executor import fitness_executor
 
 log = logging.getLogger(__name__)
 
 class ScoringType(Enum):
     opponent = "score_opp" # S_PS7 or S_PSR
     league= "score_league"
+    win_probability = "win_probability"
 
 class RosterChangeSetFactory(ChromosomeFactory.ChromosomeFactory):
     """Factory to create roster change sets."""
@@ -39,7 +46,7 @@ class RosterChangeSetFactory(ChromosomeFactory.ChromosomeFactory):
                 player_to_add = self.add_selector.select()  
                 player_to_drop = self.drop_selector.select()
                 with suppress(RosterException):
-                    rcs.add(RosterChange(player_to_drop.index.values[0], player_to_add.index.values[0], drop_date, player_to_add))
+                    rcs.add(RosterChange(player_to_drop.index.values[0], player_to_add.index.values[0], drop_date))
         else:
             # let's always start with no changes at all
             self.added_no_changes = True
@@ -91,31 +98,109 @@ class RandomWeightedSelector:
 from csh_fantasy_bot.tasks import score
 
 
-def fitness(roster_change_sets, all_players, date_range, scoring_categories, score_comparer, team_key, opponent_scores, scoring_type=ScoringType.opponent):
-    """Score the roster change set."""
+class FitnessMemo:
+    """Least recently used memo of the scores of roster change sets, by equality_value.
+
+    Kept for a whole run so change sets seen in earlier generations aren't scored again.  Each
+    entry holds the change set's scoring summary frame, so only maxsize are kept.
+
+    Args:
+        maxsize (int, optional): Maximum number of change sets kept. Defaults to FITNESS_MEMO_SIZE.
+    """
+
+    def __init__(self, maxsize=FITNESS_MEMO_SIZE):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._scores = OrderedDict()
+
+    def get(self, key):
+        """(score, scoring_summary) of the change set with equality_value key, or None if it isn't kept."""
+        entry = self._scores.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self._scores.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def set(self, key, score, scoring_summary):
+        """Remember the score and scoring summary of the change set with equality_value key."""
+        self._scores[key] = score, scoring_summary
+        self._scores.move_to_end(key)
+        if len(self._scores) > self.maxsize:
+            self._scores.popitem(last=False)
+
+    def cache_info(self):
+        """Return hit/miss statistics for the memo."""
+        return FitnessMemoInfo(self.hits, self.misses, self.maxsize, len(self._scores))
+
+    def clear(self):
+        """Empty the memo and reset statistics."""
+        self._scores.clear()
+        self.hits = 0
+        self.misses = 0
+
+
+FitnessMemoInfo = namedtuple('FitnessMemoInfo', 'hits misses maxsize currsize')
+
+
+def fitness(roster_change_sets, all_players, date_range, scoring_categories, score_comparer, team_key, opponent_scores, scoring_type=ScoringType.opponent, executor=None, memo=None, projection_table=None):
+    """Score the roster change set.
+
+    Change sets are scored by executor, defaults to the FITNESS_EXECUTOR configured.  memo is a FitnessMemo
+    kept by the caller for the whole run, change sets already in it, or repeated in the population, are not
+    sent to be scored again.  Players added are looked up in
+    projection_table, pass one built from all_players once for the run, it is built each call if not.
+    """
+    if memo is None:
+        memo = FitnessMemo()
+    if projection_table is None:
+        projection_table = ProjectionTable(all_players)
     # store the id so we can match back up after serialization
     team_id = int(team_key.split('.')[-1])
     for rcs in roster_change_sets:
         rcs._id = id(rcs) 
     log.debug("starting chunk scoring")
-    unscored_change_sets = [rc for rc in roster_change_sets if rc.score is None]
-    results = score_chunk(all_players[(all_players.fantasy_status == team_id)], date_range[0], date_range[-1], unscored_change_sets, scoring_categories, team_key=team_key, opponent_scores=opponent_scores)
+    unscored = {}
+    for change_set in roster_change_sets:
+        if change_set.score is not None:
+            continue
+        key = change_set.equality_value
+        memoized = memo.get(key)
+        if memoized is not None:
+            change_set.score, change_set.scoring_summary = memoized
+        else:
+            unscored.setdefault(key, []).append(change_set)
+    log.debug(f"memo hits: {sum(change_set.score is not None for change_set in roster_change_sets)}, to score: {len(unscored)}")
+    unscored_change_sets = [duplicates[0] for duplicates in unscored.values()]
+    executor = executor or fitness_executor()
+    context = ScoringContext(all_players[(all_players.fantasy_status == team_id)], date_range, scoring_categories, team_key, opponent_scores, projection_table)
+    results = executor.score(context, unscored_change_sets)
     log.debug("Done chunk scoring")
 
     scores_dict = {_id:score for _id,score in results}
     log.debug("computing roster change scores")
+    scored_change_sets = []
     for change_set in unscored_change_sets:
         try:
             scoring_result = scores_dict[change_set._id]
-            change_set.scoring_summary = scoring_result.reset_index()
-            # change_set.score = score_comparer.compute_score(scoring_result)
-            score = score_comparer.score(scoring_result, opponent_scores).loc[scoring_type.value].sum()
-            if score is None:
+            if scoring_result is None:
                 log.warn(f"Score is None for: {change_set}")
-                
-            change_set.score = score
+                continue
+            change_set.scoring_summary = scoring_result.reset_index()
+            scored_change_sets.append(change_set)
         except KeyError as e:
             log.exception(e)
+    # score every change set's totals at once, the summary frame is only built for the best
+    team_totals = np.array([change_set.scoring_summary[score_comparer.stat_cats].sum().to_numpy(dtype=float) for change_set in scored_change_sets])
+    team_variances = None
+    if scoring_type == ScoringType.win_probability:
+        team_variances = np.array([score_comparer.lineup_variances(change_set.scoring_summary) for change_set in scored_change_sets])
+    for change_set, score in zip(scored_change_sets, score_comparer.score_many(team_totals, opponent_scores, scoring_type.value, team_variances)):
+        memo.set(change_set.equality_value, score, change_set.scoring_summary)
+        for duplicate in unscored[change_set.equality_value]:
+            duplicate.score, duplicate.scoring_summary = score, change_set.scoring_summary
         
     log.debug('Done computing roster scores')
     return [(change_set, change_set.score) for change_set in roster_change_sets]
@@ -5,7 +5,6 @@ import logging
 import time
 import objectpath
 
-from collections import defaultdict
 from contextlib import suppress
 
 from nhl_scraper.nhl import Scraper
@@ -14,11 +13,12 @@ from csh_fantasy_bot import utils
 from csh_fantasy_bot import utils, fantasysp_scrape
 from csh_fantasy_bot import scoring
 from csh_fantasy_bot.yahoo_authentication import oauth_token
-from csh_fantasy_bot.nhl import find_teams_playing
-from csh_fantasy_bot.roster import best_roster
+from csh_fantasy_bot.roster import AssignmentRosterBuilder, best_roster, parse_projections_positions
+from csh_fantasy_bot.week_projection import WeekProjection, week_projection_cache
 from csh_fantasy_bot.scoring import ScoreComparer
 
-from csh_fantasy_bot.score_gekko import score_gekko
+from csh_fantasy_bot.score_gekko import score_gekko, WeekModel
+from csh_fantasy_bot.solution_cache import lineup_fingerprint, lineup_solution_cache
 from csh_fantasy_bot.roster import best_roster
 
 from csh_fantasy_bot.redis import RedisClient
@@ -27,14 +27,6 @@ import pickle
 
 LOG = logging.getLogger(__name__)
 
-def _roster_changes_as_day_dict(rcs):
-    rc_dict = defaultdict(list)
-    if rcs:
-        for rc in rcs.roster_changes:
-            rc_dict[rc.change_date].append(rc) 
-    
-    return rc_dict
-    
 class NoAsOfDateException(Exception):
     """Denote when trying to access state of league before setting asof."""
 
@@ -58,6 +50,8 @@ class FantasyLeague(League):
         self.cached_actual_results = {}
 
         self._roster_makeup = None
+        self._roster_builder = None
+        self._stat_modifiers = None
 
     def roster_makeup(self, position_type=None):
         if self._roster_makeup is None:
@@ -70,10 +64,40 @@ class FantasyLeague(League):
             return {key:value['count'] for key, value in self.positions().items() if position_type == value.get('position_type', None)}
         return self._roster_makeup
 
+    def roster_builder(self):
+        """Builder for the league's skater roster makeup, to solve daily lineups with."""
+        if self._roster_builder is None:
+            self._roster_builder = AssignmentRosterBuilder(self.roster_makeup(position_type='P'))
+        return self._roster_builder
+
     def scoring_categories(self, position_type=['P']):
         """Return list of categories that count for scoring."""
         return [stat['display_name'] for stat in League.stat_categories(self) if stat['position_type'] in position_type]
 
+    def stat_modifiers(self, position_type=['P']):
+        """Return points for each scoring category in a points league.
+
+        Args:
+            position_type (list, optional): Position types of the categories. Defaults to ['P'].
+
+        Returns:
+            dict: Points for each category, None if the league scores head to head categories
+        """
+        if self._stat_modifiers is None:
+            settings = self.settings()
+            if 'stat_modifiers' not in settings:
+                self._stat_modifiers = {}
+            else:
+                points = {int(stat['stat']['stat_id']): float(stat['stat']['value']) for stat in settings['stat_modifiers']['stats']}
+                # settings() leaves out the categories, and stat_categories() their ids, so look the ids up in the raw settings
+                stat_ids = {(stat['display_name'], stat['position_type']): int(stat['stat_id'])
+                            for stat in objectpath.Tree(self.yhandler.get_settings_raw(self.league_id)).execute('$..stat_categories..stat')}
+                self._stat_modifiers = {stat['display_name']: (stat['position_type'], points.get(stat_ids.get((stat['display_name'], stat['position_type'])), 0.0))
+                                        for stat in League.stat_categories(self)}
+        if not self._stat_modifiers:
+            return None
+        return {category: value for category, (category_position_type, value) in self._stat_modifiers.items() if category_position_type in position_type}
+
     def all_players(self):
         """Return dataframe of entire league for as of date."""
         if self.as_of_date:
@@ -298,7 +322,7 @@ class FantasyLeague(League):
             # results = pa.deserialize(results)
         return results
 
-    def score_team_fpts(self, player_projections, date_range, roster_change_set=None, simulation_mode=True, date_last_use_actuals=None, team_id=None):
+    def score_team_fpts(self, player_projections, date_range, roster_change_set=None, simulation_mode=True, date_last_use_actuals=None, team_id=None, projection_table=None):
         """Score the team.
         Args:
             player_projections (DataFrame): Projections for all players on the team
@@ -308,87 +332,147 @@ class FantasyLeague(League):
             simulation_mode (bool, optional): Ignores actuals if games already played, still uses projected scoring. Defaults to True.
             date_last_use_actuals (DateTime): If not in simulation mode, this value sets the last day to use actual scoring instead of projecting. 
             team_id (string, optional): Need this to look up actual scores for days which have passed.
+            projection_table (ProjectionTable, optional): Projections of the players the change set adds. Defaults to None.
 
         Returns:
-            [type]: [description]
+            tuple: roster_change_set, DataFrame of scoring indexed by play_date, player_id
         """
-        # we are going to modify this as we iterate the dates.  so we need this for the math at end
-        current_projections = player_projections.copy()
-        # projections for players who may play.  changes with roster changes during period
-        projections_with_added_players = player_projections.copy()
-        current_projections.sort_values(by='fpts', ascending=False, inplace=True)
-        # dict to keep track of how many games players play using projected stats
-        projected_games_played = defaultdict(int)
-        # we need to look up roster changes by date so let's make a dict ourselves
-        rc_dict = defaultdict(list)
-        if roster_change_set:
-            rc_dict = _roster_changes_as_day_dict(roster_change_set)
-
         scoring_categories = self.scoring_categories()
-
-        roster_week_results = None
         if not (simulation_mode or date_last_use_actuals):
             # if date_last_use_actuals is not set, we default it to 1 second before midnight today
             date_last_use_actuals = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(seconds=1)  # can't support today yet, need to watch for completed games, etc.
+        projected_days = date_range if simulation_mode else date_range[date_range >= date_last_use_actuals]
+        actual_days = date_range.difference(projected_days)
 
-        for game_day in date_range:
-            roster_results = None
-        
-            for rc in rc_dict[game_day.date()]:
-                # TODO should really figure out how to deal with this.  sometimes it is string, sometimes list. 
-                # i think has to do with serializing via jsonpickle
-                with suppress(Exception):
-                    rc.in_projections['eligible_positions'] = pd.eval(rc.in_projections['eligible_positions'])
-                # add player in projections to projection dataframe
-                current_projections = current_projections.append(rc.in_projections)
-                projections_with_added_players = projections_with_added_players.append(rc.in_projections)
-                current_projections.drop(rc.out_player_id, inplace=True)
-                current_projections.sort_values(by='fpts', ascending=False, inplace=True)
-            
-            # let's see if we should grab actuals
-            if not simulation_mode and game_day < date_last_use_actuals:
-                roster_results= self._actuals_for_team_day(team_id, game_day, scoring_categories)
-            else:
-                game_day_players = projections_with_added_players[projections_with_added_players.team_id.isin(find_teams_playing(game_day.to_pydatetime().date()))]
-                if len(game_day_players) > 0:
-                    roster = best_roster(game_day_players.loc[:,['eligible_positions']].itertuples())
-                    rostered_players = [player.player_id for player in roster]
-                    roster_results = projections_with_added_players.loc[rostered_players, scoring_categories]
-                    roster_results.loc[:,'score_type'] = 'p'
+        projection = week_projection_cache.projection(player_projections, projected_days, scoring_categories, roster_change_set,
+                                                      projection_table=projection_table, builder=self.roster_builder())
+        return roster_change_set, self._week_results(team_id, projection, actual_days, scoring_categories)
 
-                    if len(roster_results[roster_results.G != roster_results.G].index.values) > 0:
-                        LOG.warn(f"no projections for players: {roster_results[roster_results.G != roster_results.G].index.values}")
+    def _week_results(self, team_id, projection, actual_days, scoring_categories):
+        """Assemble the scoring frame for a team's week from its projection and actuals.
 
-            if roster_results is not None and len(roster_results) > 0:
-                roster_results['play_date'] = game_day
-                if roster_week_results is None:
-                    roster_week_results = roster_results
-                else:
-                    roster_week_results = pd.concat([roster_week_results, roster_results])
+        Args:
+            team_id (string): Team key, to look up actual scores
+            projection (WeekProjection): Projected lineups for the days not using actuals
+            actual_days (pd.DatetimeIndex): Days to use actual scores for
+            scoring_categories (list): List of player scoring categories scored
 
+        Returns:
+            DataFrame: Scoring for each day and player in the lineup, indexed by play_date, player_id
+        """
+        actual_results = []
+        for game_day in actual_days:
+            day_results = self._actuals_for_team_day(team_id, game_day, scoring_categories)
+            day_results['play_date'] = game_day
+            day_results.index.name = 'player_id'
+            actual_results.append(day_results.reset_index().set_index(['play_date', 'player_id']))
 
-        #TODO maybe we should formalize a return structure
-        if len(roster_week_results) > 0:
-            roster_week_results.reset_index(inplace=True)
-            roster_week_results.set_index(['play_date', 'player_id'], inplace=True)
-        return roster_change_set, roster_week_results
-    
-    def score_team(self, player_projections, date_range, opponent_scores, roster_change_set=None, simulation_mode=True, date_last_use_actuals=None, team_id=None):
+        roster_week_results = pd.concat(actual_results + [projection.results()])
+        return roster_week_results.sort_index(level='play_date', sort_remaining=False)
+
+    def score_teams_fpts(self, player_projections, team_keys, date_range, simulation_mode=True, date_last_use_actuals=None):
+        """Score several teams, solving every team's daily lineups in a single batch.
+
+        Args:
+            player_projections (DataFrame): Projections for all players, fantasy_status assigns them to teams
+            team_keys (list): Keys of the teams to score
+            date_range (pd.DateRange): Date range to project for
+            simulation_mode (bool, optional): Ignores actuals if games already played, still uses projected scoring. Defaults to True.
+            date_last_use_actuals (DateTime): If not in simulation mode, this value sets the last day to use actual scoring instead of projecting.
+
+        Returns:
+            dict: Results for each team key, in the same form as score_team_fpts
+        """
         scoring_categories = self.scoring_categories()
+        if not (simulation_mode or date_last_use_actuals):
+            date_last_use_actuals = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(seconds=1)
+        projected_days = date_range if simulation_mode else date_range[date_range >= date_last_use_actuals]
+        actual_days = date_range.difference(projected_days)
+
+        rosters = [player_projections[player_projections.fantasy_status == int(team_key.split('.')[-1])] for team_key in team_keys]
+        projections = WeekProjection.for_teams(rosters, projected_days, scoring_categories, builder=self.roster_builder())
+
+        team_results = {}
+        for team_key, projection in zip(team_keys, projections):
+            team_results[team_key] = self._week_results(team_key, projection, actual_days, scoring_categories)
+        return team_results
+
+    def _actuals_and_projected_days(self, team_id, date_range, scoring_categories):
+        """Actual scoring up to yesterday, and the days from today on to project."""
+        date_last_use_actuals = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(seconds=1)
+        # lets add actuals, they can't be optimized
+        actuals_results = self.score_actuals(team_id,date_range[date_range.slice_indexer(date_range[0],date_last_use_actuals)], scoring_categories)
+        projected_days = date_range[date_range.slice_indexer(date_last_use_actuals)]
+        return actuals_results, projected_days
+
+    def week_model(self, player_projections, date_range, opponent_scores, candidates=None, team_id=None):
+        """Lineup model of the team's week that scores any roster change set adding players from candidates.
+
+        Args:
+            player_projections (DataFrame): Projections for all players on the team
+            date_range (pd.DateRange): Date range to project for
+            opponent_scores (Series): Opponent's projected totals for each scoring category
+            candidates (DataFrame, optional): Projections for players roster changes may add. Defaults to None.
+            team_id (string, optional): Need this to look up actual scores for days which have passed.
+
+        Returns:
+            WeekModel: model to pass to score_team for each change set
+        """
+        scoring_categories = self.scoring_categories()
+        actuals_results, projected_days = self._actuals_and_projected_days(team_id, date_range, scoring_categories)
+        actual_results_summed = None
+        if actuals_results is not None:
+            actual_results_summed = actuals_results[scoring_categories].sum()
+        if candidates is not None:
+            parse_projections_positions(candidates)
+        return WeekModel(player_projections, opponent_scores, scoring_categories, projected_days, self.roster_makeup(position_type='P'),
+                         candidates=candidates, actual_scores=actual_results_summed)
+
+    def score_team(self,player_projections, date_range, opponent_scores, roster_change_set=None, simulation_mode=True, date_last_use_actuals=None, team_id=None, stat_weights=None, week_model=None,
+                   projection_table=None):
+        """Score the team, choosing lineups to beat the opponent.
+
+        With stat_weights, or in a points league, the objective is linear in the players started so each day is
+        an assignment problem, solved exactly for the whole week in a batch instead of with the MILP.
+
+        Args:
+            player_projections (DataFrame): Projections for all players on the team
+            date_range (pd.DateRange): Date range to project for
+            opponent_scores (Series): Opponent's projected totals for each scoring category
+            roster_change_set (RosterChangeSet, optional): Changes to make throughout the scoring period. Defaults to None.
+            team_id (string, optional): Need this to look up actual scores for days which have passed.
+            stat_weights (dict, optional): Value of each scoring category, makes the objective linear.
+                Defaults to the league's stat modifiers in a points league.
+            week_model (WeekModel, optional): Model of the team's week from week_model, reused instead of building
+                the lineup problem when it has the players the change set adds. Defaults to None.
+            projection_table (ProjectionTable, optional): Projections of the players the change set adds. Defaults to None.
+
+        Returns:
+            tuple: roster_change_set, DataFrame of scoring indexed by play_date, player_id
+        """
+        scoring_categories = self.scoring_categories()
+        if stat_weights is None:
+            stat_weights = self.stat_modifiers()
         roster_week_results = None
         try:
-            date_last_use_actuals = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(seconds=1)
-            # if date_range[0] > date_last_use_actuals:
-            #     date_last_use_actuals = date_range[0]
-            scoring_categories = self.scoring_categories()
-            # lets add actuals, they can't be optimized
-            actuals_results = self.score_actuals(team_id,date_range[date_range.slice_indexer(date_range[0],date_last_use_actuals)], scoring_categories)
+            actuals_results, projected_days = self._actuals_and_projected_days(team_id, date_range, scoring_categories)
             actual_results_summed = None
             if actuals_results is not None:
                 actual_results_summed = actuals_results[scoring_categories].sum()
 
-            roster_makeup = self.roster_makeup(position_type='P')    
-            projected_results = score_gekko(player_projections, team_id, opponent_scores,scoring_categories,date_range[date_range.slice_indexer(date_last_use_actuals)], roster_makeup, roster_change_set=roster_change_set, actual_scores=actual_results_summed)
+            if stat_weights is not None:
+                projected_results = week_projection_cache.projection(player_projections, projected_days, scoring_categories, roster_change_set,
+                                                                     stat_weights=stat_weights, projection_table=projection_table,
+                                                                     builder=self.roster_builder()).results().reset_index()
+            else:
+                roster_makeup = self.roster_makeup(position_type='P')
+                # identical problems, common in a GA population, are only solved once
+                key = lineup_fingerprint(player_projections, projected_days, roster_makeup, scoring_categories, opponent_scores,
+                                         actual_scores=actual_results_summed, roster_change_set=roster_change_set, projection_table=projection_table)
+                if week_model is not None and week_model.covers(roster_change_set):
+                    projected_results = lineup_solution_cache.solve(key, lambda: week_model.score(roster_change_set))
+                else:
+                    projected_results = lineup_solution_cache.solve(key, lambda: score_gekko(player_projections, team_id, opponent_scores,scoring_categories,projected_days, roster_makeup, roster_change_set=roster_change_set, actual_scores=actual_results_summed, projection_table=projection_table))
 
             if actuals_results is not None:
                 actuals_results.reset_index(inplace=True)
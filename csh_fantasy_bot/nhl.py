@@ -7,29 +7,24 @@ from collections import defaultdict
 from contextlib import suppress
 
 
-from nhl_scraper.nhl import Scraper
 from nhl_scraper.rotowire import Scraper as RWScraper
 from yahoo_fantasy_api import League, Team
-from csh_fantasy_bot.roster import best_roster
+from csh_fantasy_bot.roster import best_roster, lineup_cache
+from csh_fantasy_bot.schedule import nhl_schedule
 # from csh_fantasy_bot.league import FantasyLeague
 
 import cProfile
 
 
-nhl_schedule = {}
-nhl_scraper: Scraper = Scraper()
-
 my_leagues = {}
 
 log = logging.getLogger(__name__)
 DATE_FORMAT = "%Y-%m-%d"
 def find_teams_playing(game_day=None, num_days=1):
-    """Get list of teams playing on game_day."""
-    global nhl_schedule
-    global nhl_scraper
+    """Get games for each team playing from game_day, for num_days."""
     end_date = game_day + datetime.timedelta(days=num_days -1)
 
-    return nhl_scraper.games_count(game_day, end_date)
+    return nhl_schedule(game_day).games_count(game_day, end_date)
         
 
 # add elements of tuple - tuple(x+y for x, y in zip(a,b))
@@ -54,7 +49,7 @@ def _roster_changes_as_day_dict(rcs):
     
     return rc_dict
 
-def score_team(player_projections, date_range, scoring_categories, roster_change_set=None, simulation_mode=True, date_last_use_actuals=None, team_id=None):
+def score_team(player_projections, date_range, scoring_categories, roster_change_set=None, simulation_mode=True, date_last_use_actuals=None, team_id=None, projection_table=None):
     """Score the team.
 
     Args:
@@ -65,6 +60,7 @@ def score_team(player_projections, date_range, scoring_categories, roster_change
         simulation_mode (bool, optional): Ignores actuals if games already played, still uses projected scoring. Defaults to True.
         date_last_use_actuals (DateTime): If not in simulation mode, this value sets the last day to use actual scoring instead of projecting. 
         team_id (string, optional): Need this to look up actual scores for days which have passed.
+        projection_table (ProjectionTable, optional): Projections of the players the change set adds. Defaults to None.
 
     Returns:
         [type]: [description]
@@ -95,18 +91,15 @@ def score_team(player_projections, date_range, scoring_categories, roster_change
             pass
         else:
             for rc in rc_dict[game_day.date()]:
-                # TODO should really figure out how to deal with this.  sometimes it is string, sometimes list. 
-                # i think has to do with serializing via jsonpickle
-                with suppress(Exception):
-                    rc.in_projections['eligible_positions'] = pd.eval(rc.in_projections['eligible_positions'])
                 # add player in projections to projection dataframe
-                current_projections = current_projections.append(rc.in_projections)
-                projections_with_added_players = projections_with_added_players.append(rc.in_projections)
+                in_projections = projection_table.rows([rc.in_player_id])
+                current_projections = current_projections.append(in_projections)
+                projections_with_added_players = projections_with_added_players.append(in_projections)
                 current_projections.drop(rc.out_player_id, inplace=True)
                 current_projections.sort_values(by='fpts', ascending=False, inplace=True)
 
             game_day_players = current_projections[current_projections.team_id.isin(find_teams_playing(game_day))]
-            roster = best_roster(game_day_players.loc[:,['eligible_positions']].itertuples())
+            roster = lineup_cache.find_best(game_day_players.loc[:,['eligible_positions', 'fpts']].itertuples())
             for player in roster:
                 projected_games_played[player.player_id] += 1
 
@@ -0,0 +1,61 @@
+"""Versioned table of player projections that roster changes are resolved against."""
+import hashlib
+
+import pandas as pd
+
+from csh_fantasy_bot.roster import parse_projections_positions
+
+
+def projections_digest(projections):
+    """Digest of a projections dataframe's index, columns and values."""
+    digest = hashlib.blake2b(digest_size=20)
+    digest.update(repr((list(projections.columns), [str(eligible) for eligible in projections.eligible_positions])).encode())
+    values = projections.drop(columns='eligible_positions')
+    try:
+        hashed = pd.util.hash_pandas_object(values, index=True)
+    except TypeError:
+        # unhashable values, such as lists, are hashed by their repr
+        hashed = pd.util.hash_pandas_object(values.astype(str), index=True)
+    digest.update(hashed.to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+class ProjectionTable:
+    """Projections of every player a roster change may add, indexed by player_id.
+
+    Roster changes only carry player ids and dates, scorers look up the players added here.
+    The version is a digest of the projections, workers get the table once with the
+    ScoringContext it is part of, published through a PublishedStore.  Tables are shared,
+    don't modify their projections.
+
+    Args:
+        projections (DataFrame): Projections indexed by player_id, with team_id, eligible_positions, fpts
+            and the scoring categories
+        version (str, optional): Digest of the projections, computed if not given. Defaults to None.
+    """
+
+    def __init__(self, projections, version=None):
+        projections = projections.copy()
+        # eligible positions come back as a string after serializing via jsonpickle
+        parse_projections_positions(projections)
+        self.projections = projections
+        self.version = version or projections_digest(projections)
+
+    def __contains__(self, player_id):
+        return player_id in self.projections.index
+
+    def rows(self, player_ids):
+        """Projections of the players, a dataframe in the order given."""
+        return self.projections.loc[list(player_ids)]
+
+    def added_players(self, roster_change_sets):
+        """Projections of every player added by the change sets, each player once.
+
+        Args:
+            roster_change_sets (list): RosterChangeSets, or None for no changes
+
+        Returns:
+            DataFrame: Projections of the players added
+        """
+        player_ids = {rc.in_player_id: None for rc_set in roster_change_sets if rc_set for rc in rc_set.roster_changes}
+        return self.rows(player_ids)
@@ -0,0 +1,85 @@
+"""Values the driver publishes by key for celery workers to load, always through redis."""
+import logging
+import pickle
+import time
+
+from collections import OrderedDict
+
+LOG = logging.getLogger(__name__)
+
+
+class PublishedStore:
+    """Values published under a content digest key, such as the projections roster changes are scored with.
+
+    Workers run in other processes and on other machines, so published values always go to redis,
+    whatever FB_CACHE_BACKING is, and publishing fails if redis can't be written.  Each process keeps
+    the values it published or loaded in a least recently used dict, so a worker fetches each value
+    once.  Values are shared rather than copied, don't modify them.
+
+    Args:
+        key_prefix (str): Prefix of the redis keys
+        maxsize (int, optional): Maximum number of values kept in process. Defaults to 16.
+        ttl (float, optional): Seconds values are kept in redis. Defaults to 86400.
+        redis (RedisClient, optional): Redis to publish through. Defaults to a RedisClient.
+    """
+
+    def __init__(self, key_prefix, maxsize=16, ttl=86400, redis=None):
+        self.key_prefix = key_prefix
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._redis = redis
+        self._values = OrderedDict()
+        # when each key published from this process expires in redis
+        self._published = {}
+
+    @property
+    def redis(self):
+        """Only connect to redis when a value is published or loaded."""
+        if self._redis is None:
+            from csh_fantasy_bot.redis import RedisClient
+            self._redis = RedisClient()
+        return self._redis
+
+    def publish(self, key, value):
+        """Make the value available to workers by key, writing it to redis unless it is there already.
+
+        Raises:
+            RuntimeError: if the value can't be written to redis
+        """
+        self._store(key, value)
+        if self._published.get(key, 0) > time.monotonic():
+            return
+        try:
+            self.redis.conn.set(f'{self.key_prefix}-{key}', pickle.dumps(value), ex=max(int(self.ttl), 1))
+        except Exception as e:
+            raise RuntimeError(f"Could not publish {self.key_prefix} {key} to redis, workers couldn't load it: {e}") from e
+        # republish well before it expires in redis
+        self._published[key] = time.monotonic() + self.ttl / 2
+
+    def load(self, key):
+        """Value published with key.
+
+        Raises:
+            KeyError: if nothing has been published with key, or it has expired
+        """
+        value = self._values.get(key)
+        if value is not None:
+            self._values.move_to_end(key)
+            return value
+
+        data = self.redis.conn.get(f'{self.key_prefix}-{key}')
+        if not data:
+            raise KeyError(f"No {self.key_prefix} {key} has been published")
+        value = pickle.loads(data)
+        self._store(key, value)
+        return value
+
+    def _store(self, key, value):
+        self._values[key] = value
+        self._values.move_to_end(key)
+        if len(self._values) > self.maxsize:
+            evicted, _ = self._values.popitem(last=False)
+            self._published.pop(evicted, None)
+
+    def __len__(self):
+        return len(self._values)
@@ -1,8 +1,7 @@
 #!/usr/bin/python
-import copy
 import logging
 import numpy as np
-from collections import namedtuple, defaultdict
+from collections import namedtuple, defaultdict, OrderedDict, deque
 from functools import partial
 
 class Container:
@@ -103,6 +102,105 @@ class Container:
         raise ValueError("Player not found on roster")
 
 
+class RosterFitter:
+    """Keeps players fitted into the slots of a roster.
+
+    Tracks the players in the slots of each position so checking for an empty slot
+    is O(1).  When a player doesn't fit directly, players already on the roster are
+    moved along the shortest augmenting path to free up a slot.  Every insert or
+    remove is journaled so it can be undone, rather than copying the roster.
+
+    :param pos_count: Number of slots for each position
+    :type pos_count: dict
+    """
+    def __init__(self, pos_count):
+        self.pos_count = dict(pos_count)
+        self.position_bits = {p: 1 << bit for bit, p in enumerate(self.pos_count)}
+        self.slots = {p: [] for p in self.pos_count}
+        self.masks = {}
+        self.positions = {}
+        self.journal = []
+
+    def occupancy(self, pos):
+        """Return the number of players in slots at the position."""
+        return len(self.slots[pos])
+
+    def has_empty_slot(self, pos):
+        # Not all positions may be tracked.  Player injury could be eligible to
+        # go to the IR slot.
+        return pos in self.pos_count and len(self.slots[pos]) < self.pos_count[pos]
+
+    def position_of(self, player):
+        """Return the position the player is slotted at, None if not on the roster."""
+        return self.positions.get(player)
+
+    def place(self, player, mask, pos):
+        """Put a player directly into a slot, used to load an existing roster."""
+        self.masks[player] = mask
+        self._move(player, pos)
+        self.journal.append([(player, None, pos)])
+
+    def insert(self, player, mask):
+        """Fit a player onto the roster, moving other players if needed.
+
+        :param player: Key to identify the player by
+        :param mask: Eligible positions of the player, see position_mask
+        :return: True if the player was fit onto the roster
+        :rtype: bool
+        """
+        # breadth first search over positions, remembering who would move into each
+        came_from = {}
+        queue = deque()
+        for pos, bit in self.position_bits.items():
+            if mask & bit:
+                came_from[pos] = (player, None)
+                queue.append(pos)
+        while queue:
+            pos = queue.popleft()
+            if self.has_empty_slot(pos):
+                self.masks[player] = mask
+                self.journal.append(self._augment(pos, came_from))
+                return True
+            for occupant in self.slots[pos]:
+                for next_pos, bit in self.position_bits.items():
+                    if self.masks[occupant] & bit and next_pos not in came_from:
+                        came_from[next_pos] = (occupant, pos)
+                        queue.append(next_pos)
+        return False
+
+    def remove(self, player):
+        """Take a player off the roster."""
+        pos = self.positions[player]
+        self._move(player, None)
+        self.journal.append([(player, pos, None)])
+
+    def last_moves(self):
+        """Return (player, from position, to position) for each move of the last insert or remove."""
+        return self.journal[-1] if self.journal else []
+
+    def undo(self):
+        """Revert the last insert or remove."""
+        for player, from_pos, _ in reversed(self.journal.pop()):
+            self._move(player, from_pos)
+
+    def _augment(self, pos, came_from):
+        moves = []
+        while pos is not None:
+            player, from_pos = came_from[pos]
+            self._move(player, pos)
+            moves.append((player, from_pos, pos))
+            pos = from_pos
+        return moves
+
+    def _move(self, player, pos):
+        from_pos = self.positions.pop(player, None)
+        if from_pos is not None:
+            self.slots[from_pos].remove(player)
+        if pos is not None:
+            self.slots[pos].append(player)
+            self.positions[player] = pos
+
+
 class Builder:
     """Class that generates roster permuations suitable for evaluation"""
     def __init__(self, positions):
@@ -115,6 +213,17 @@ class Builder:
             else:
                 self.pos_count[p] = 1
 
+    def _position_mask(self, player):
+        return position_mask(parse_eligible_positions(player['eligible_positions']), list(self.pos_count))
+
+    def _fitter(self, roster):
+        """Load the players in the roster, by index, into a fitter."""
+        fitter = RosterFitter(self.pos_count)
+        for index, plyr in enumerate(roster):
+            if type(plyr['selected_position']) == str and plyr['selected_position'] in self.pos_count:
+                fitter.place(index, self._position_mask(plyr), plyr['selected_position'])
+        return fitter
+
     def fit_if_space(self, roster, player):
         """Fit a player onto a roster if there is space.
 
@@ -133,47 +242,18 @@ class Builder:
         available for the player then an LookupError assertion is returned.
         :rtype: list
         """
-        rpos = {}
-        for p in roster:
-            if p['selected_position'] in rpos:
-                rpos[p['selected_position']] += 1
-            else:
-                rpos[p['selected_position']] = 1
-        self.logger.debug("Roster positions: {}".format(rpos))
         self.logger.debug("Fit {}: positions={}".format(
             player['name'], player['eligible_positions']))
-        # Search if any of the players eligible_positions are open.  Then it is
-        # an easy fit.
-        for pos in player.eligible_positions:
-            if self._has_empty_position_slot(roster, pos):
-                self.logger.debug("Fit at empty position: {}".format(pos))
-                player.selected_position = pos
-                roster.append(player)
-                return roster
-
-        # List to keep track of the players swapped in a given fit.  This
-        # ensures the same player isn't moved more than once in a given
-        # sequence of swaps.
-        swapped_plyrs = []
-
-        # Look through the other players already starting at the new players
-        # positions.  If any of them can move to empty spot then we can fit.
-        for pos in player.eligible_positions:
-            for occurance in range(self.pos_count[pos]):
-                self.logger.debug("Attempt swap at position: {}".format(pos))
-                plyr_at_pos = self._get_player_by_pos(roster, pos, occurance)
-                self.logger.debug("Swap out {}: {}".format(
-                    plyr_at_pos['name_x'], pos))
-                if self._swap_eligible_pos_recurse(roster, plyr_at_pos,
-                                                   swapped_plyrs):
-                    assert(self._has_empty_position_slot(roster, pos))
-                    self.logger.debug('{}: {} -> {}'.format(
-                        player['name_x'], player['selected_position'], pos))
-                    player.selected_position = pos
-                    roster.append(player)
-                    return roster
-
-        raise LookupError("No space for player on roster")
+        fitter = self._fitter(roster)
+        if not fitter.insert(len(roster), self._position_mask(player)):
+            raise LookupError("No space for player on roster")
+
+        roster.append(player)
+        for index, from_pos, pos in fitter.last_moves():
+            self.logger.debug('{}: {} -> {}'.format(
+                roster[index]['name'], from_pos, pos))
+            roster[index].selected_position = pos
+        return roster
 
     def enumerate_fit(self, roster, player):
         """Generate possible enumerations by fitting the player on the roster
@@ -189,106 +269,27 @@ class Builder:
         combinations to get the player to fit.
         :rtype: iterable
         """
+        fitter = self._fitter(roster)
+        candidates = roster + [player]
+        mask = self._position_mask(player)
         for pos in self.pos_count.keys():
-            for occurance in range(self.pos_count[pos]):
-                orig_roster = copy.deepcopy(roster)
-                pos_player = self._get_player_by_pos(roster, pos, occurance)
-                if pos_player is None:
-                    continue
-                pos_player.selected_position = np.nan
-                try:
-                    new_roster = self.fit_if_space(roster, player)
-
-                    # Remove anyone from the roster that doesn't have a
-                    # selected position
+            for pos_player in list(fitter.slots[pos]):
+                fitter.remove(pos_player)
+                if fitter.insert(len(roster), mask):
+                    # copy just the players in the new roster, with their new positions
                     pruned_roster = []
-                    for plyr in new_roster:
-                        if type(plyr['selected_position']) == str:
+                    for index, plyr in enumerate(candidates):
+                        if fitter.position_of(index) is not None:
+                            plyr = plyr.copy()
+                            plyr['selected_position'] = fitter.position_of(index)
                             pruned_roster.append(plyr)
-
                     yield pruned_roster
-                except LookupError:
-                    pass
-                finally:
-                    roster = orig_roster
-                    player.selected_position = np.nan
+                    fitter.undo()
+                fitter.undo()
 
     def max_players(self):
         return len(self.positions)
 
-    def _get_player_by_pos(self, roster, pos, occurance):
-        cum_occurance = 0
-        for plyr in roster:
-            if plyr.selected_position == pos:
-                if cum_occurance == occurance:
-                    return plyr
-                cum_occurance += 1
-        return None
-
-    def _get_num_players_at_pos(self, roster, pos):
-        """Return the number of players the roster has at the given position"""
-        cum_occurance = 0
-        for plyr in roster:
-            if plyr.selected_position == pos:
-                cum_occurance += 1
-        return cum_occurance
-
-    def _has_empty_position_slot(self, roster, pos):
-        # Not all positions may be tracked.  Player injury could be eligible to
-        # go to the IR slot.
-        if pos in self.pos_count:
-            num = self._get_num_players_at_pos(roster, pos)
-            return num < self.pos_count[pos]
-        else:
-            return False
-
-    def _swap_eligible_pos_recurse(self, roster, player, swapped_plyrs):
-        """Recursively swap positions with players until all positions are used.
-
-        :param roster: The roster to work with
-        :type roster: pandas.DataFrame
-        :param player: The player to try and swap around.
-        :type player: pandas.Series
-        :param swapped_plyrs: A list of players already swapped in this
-        sequence of trying to fit the player.
-        :type swapped: list
-        :return: True if we were able to swap to an empty position
-        :rtype: Boolean
-        """
-        assert(player.selected_position is not None)
-
-        if player['player_id'] in swapped_plyrs:
-            return False
-        swapped_plyrs.append(player['player_id'])
-
-        # Check if player can change their position to an empty spot
-        for pos in player.eligible_positions:
-            if pos != player.selected_position:
-                if self._has_empty_position_slot(roster, pos):
-                    self.logger.debug('{}: {} -> {}'.format(
-                        player['name'], player['selected_position'], pos))
-                    player.selected_position = pos
-                    return True
-
-        # Recursively check each of the positions that the player plays to
-        # see if they can switch out to an empty spot.
-        for pos in player.eligible_positions:
-            if pos != player.selected_position:
-                for occurance in range(self.pos_count[pos]):
-                    other_plyr = self._get_player_by_pos(roster, pos,
-                                                         occurance)
-                    assert(other_plyr is not None), "Nobody for " + pos
-                    if self._swap_eligible_pos_recurse(roster, other_plyr,
-                                                       swapped_plyrs):
-                        assert(self._has_empty_position_slot(roster, pos))
-                        self.logger.debug('{}: {} -> {}'.format(
-                            player['name'], player['selected_position'], pos))
-                        player.selected_position = pos
-                        return True
-
-        swapped_plyrs.pop()
-        return False
-
 
 class PlayerSelector:
     """Class that will select players from a container to include on a roster.
@@ -342,9 +343,11 @@ class PlayerSelector:
     def set_descending_categories(self, cats):
         self.rank_stats_descending = cats
 
+import ast
 import pandas as pd
 import numpy as np
 from itertools import combinations
+from scipy.optimize import linear_sum_assignment
 
 
 class RecursiveRosterBuilder:
@@ -363,12 +366,18 @@ class RecursiveRosterBuilder:
             self.weights_series = pd.Series([1, .75, .5, .5, 1, .1, 1], index=self.player_stats)
             
         self.roster_position_counts = roster_makeup.value_counts()
+        self.positions = list(roster_makeup.unique())
+        self.position_bits = {position: 1 << bit for bit, position in enumerate(self.positions)}
 
-
+    def _position_mask(self, player):
+        if isinstance(player, PlayerRecord):
+            return player.positions
+        return position_mask(player.eligible_positions, self.positions)
 
     def _place_player(self, roster, player):
-        for position in player.eligible_positions:
-            if position not in self.full_positions:
+        mask = self._position_mask(player)
+        for position, bit in self.position_bits.items():
+            if mask & bit and position not in self.full_positions:
                 players_in_position = roster[position]
                 if len(players_in_position) < self.roster_position_counts[position]:
                     roster[position].append(player)
@@ -386,11 +395,12 @@ class RecursiveRosterBuilder:
 
 
     def _make_room(self, position, roster, full_positions=None):
-        for position_to_look_for_room in self.roster_makeup.unique():
+        for position_to_look_for_room in self.positions:
             # is there a player in this position that can move
             for players in roster[position_to_look_for_room]:
-                for other_possible_positions in players.eligible_positions:
-                    if not 'IR' == other_possible_positions and (len(roster[other_possible_positions]) < \
+                mask = self._position_mask(players)
+                for other_possible_positions, bit in self.position_bits.items():
+                    if mask & bit and (len(roster[other_possible_positions]) < \
                                     self.roster_position_counts[other_possible_positions] and \
                                     other_possible_positions != position_to_look_for_room):
                         roster[other_possible_positions].append(players)
@@ -399,8 +409,9 @@ class RecursiveRosterBuilder:
 
     def find_best(self, sorted_players: pd.DataFrame, weights_series=None):
         """Determine roster with highest projected output using weights."""
+        self.full_positions = set()
         roster = defaultdict(list)
-        for player in sorted_players.itertuples():
+        for player in RosterPlayers.from_frame(sorted_players, self.positions):
             self._place_player(roster, player)
         
         return pd.Series({".".join([k ,str(k2)]) :v2.Index \
@@ -408,12 +419,16 @@ class RecursiveRosterBuilder:
                         for k2,v2 in zip(range(1, max(self.roster_position_counts)+1), v)})
 
     def find_best1(self, sorted_players, weights_series=None):
-        """Determine roster with highest projected output using weights."""
+        """Determine roster with highest projected output using weights.
+
+        :param sorted_players: RosterPlayers, or itertuples() of players, in the order to place them
+        """
         full_positions = set()
         daily_roster = defaultdict(list)
         for p in sorted_players:
-            for position in p.eligible_positions:
-                if position != 'IR' and position not in full_positions:
+            mask = self._position_mask(p)
+            for position, bit in self.position_bits.items():
+                if mask & bit and position not in full_positions:
                     players_in_position = daily_roster[position]
                     if len(players_in_position) < self.roster_position_counts[position]:
                         daily_roster[position].append(p)
@@ -434,6 +449,413 @@ class RecursiveRosterBuilder:
                         for k2,v2 in zip(range(1, 10), v))
 
 
+def slots_from_makeup(roster_makeup):
+    """Expand a roster makeup into one entry per roster slot.
+
+    :param roster_makeup: Either an index with one entry per slot, or a dict of
+        position -> number of slots (as returned by FantasyLeague.roster_makeup)
+    :return: Position for each slot, grouped by position
+    :rtype: pandas.Index
+    """
+    if isinstance(roster_makeup, dict):
+        return pd.Index([position for position, count in roster_makeup.items()
+                         for _ in range(int(count))])
+    return pd.Index(roster_makeup)
+
+
+def parse_eligible_positions(eligible_positions):
+    """Return eligible positions as a list.
+
+    After a round trip through jsonpickle they come back as the string repr of the list.
+    """
+    if isinstance(eligible_positions, str):
+        return ast.literal_eval(eligible_positions)
+    return list(eligible_positions)
+
+
+def parse_projections_positions(projections):
+    """Parse eligible_positions of a projections dataframe, or single player series, in place."""
+    if isinstance(projections, pd.DataFrame):
+        projections['eligible_positions'] = projections['eligible_positions'].map(parse_eligible_positions)
+    else:
+        projections['eligible_positions'] = parse_eligible_positions(projections['eligible_positions'])
+    return projections
+
+
+def position_mask(eligible_positions, positions):
+    """Encode eligible positions as a bitmask, bit i is set if the player can play positions[i].
+
+    Positions not in positions, such as IR, are ignored.
+    """
+    mask = 0
+    for position in eligible_positions:
+        if position in positions:
+            mask |= 1 << positions.index(position)
+    return mask
+
+
+class PlayerRecord:
+    """A player as seen by the roster builders.
+
+    Attributes are named like the rows of DataFrame.itertuples() so builders accept either.
+    """
+    __slots__ = ('Index', 'positions', 'fpts')
+
+    def __init__(self, player_id, positions, fpts):
+        self.Index = player_id
+        self.positions = positions
+        self.fpts = fpts
+
+    def __repr__(self):
+        return f"PlayerRecord({self.Index}, positions={self.positions:#b}, fpts={self.fpts})"
+
+
+class RosterPlayers:
+    """Players for the roster builders, stored as parallel arrays.
+
+    :param player_ids: Id of each player
+    :param position_masks: Eligible positions of each player, encoded by position_mask
+    :param fpts: Value of starting each player
+    :param positions: Positions the bits of the masks refer to
+    :type positions: list
+    """
+    def __init__(self, player_ids, position_masks, fpts, positions):
+        self.ids = np.asarray(player_ids)
+        self.masks = np.asarray(position_masks, dtype=np.int64)
+        self.fpts = np.asarray(fpts, dtype=float)
+        self.positions = list(positions)
+
+    @classmethod
+    def from_frame(cls, players, positions):
+        """Encode a projections dataframe indexed by player_id, with eligible_positions and optionally fpts."""
+        masks = [position_mask(parse_eligible_positions(eligible), positions) for eligible in players.eligible_positions]
+        fpts = players['fpts'].values if 'fpts' in players.columns else np.full(len(players), np.nan)
+        return cls(players.index.values, masks, fpts, positions)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __iter__(self):
+        return (PlayerRecord(*player) for player in zip(self.ids, self.masks, self.fpts))
+
+    def __getitem__(self, selector):
+        return RosterPlayers(self.ids[selector], self.masks[selector], self.fpts[selector], self.positions)
+
+    def sorted(self):
+        """Return players ordered by fpts, highest first."""
+        return self[np.argsort(-np.nan_to_num(self.fpts, nan=-np.inf), kind='stable')]
+
+    def eligibility(self, positions=None):
+        """Return players x positions boolean eligibility matrix."""
+        positions = self.positions if positions is None else positions
+        bits = np.array([1 << self.positions.index(position) if position in self.positions else 0 for position in positions], dtype=np.int64)
+        return (self.masks[:, np.newaxis] & bits) > 0
+
+
+class AssignmentRosterBuilder:
+    """Builds the optimal daily roster by solving a weighted assignment of players to slots.
+
+    Each day is a bipartite graph between available players and the slots in
+    the roster makeup, with an edge wherever the player is eligible for the slot's
+    position.  The lineup is the maximum weight matching of that graph, so the
+    most players possible are started and, of those lineups, the one with the
+    highest total fpts is chosen.
+    """
+
+    def __init__(self, roster_makeup=pd.Index("C,C,LW,LW,RW,RW,D,D,D,D".split(","))):
+        """Initialize."""
+        self.roster_makeup = slots_from_makeup(roster_makeup)
+        self.roster_position_counts = self.roster_makeup.value_counts()
+        self.positions = list(self.roster_makeup.unique())
+        # column in the position eligibility matrix for each slot
+        self.slot_position_index = np.array([self.positions.index(position) for position in self.roster_makeup])
+
+    def eligibility(self, eligible_positions):
+        """Return players x positions boolean matrix of eligibility."""
+        eligible = np.zeros((len(eligible_positions), len(self.positions)), dtype=bool)
+        for player_index, player_positions in enumerate(eligible_positions):
+            for position in player_positions:
+                if position in self.roster_position_counts:
+                    eligible[player_index, self.positions.index(position)] = True
+        return eligible
+
+    def solve(self, eligible, weights):
+        """Assign players to slots.
+
+        :param eligible: players x positions eligibility matrix
+        :type eligible: numpy.ndarray
+        :param weights: Value of starting each player, typically fpts
+        :type weights: numpy.ndarray
+        :return: Slot index for each player, -1 for players left on the bench
+        :rtype: numpy.ndarray
+        """
+        assigned_slots = np.full(len(weights), -1)
+        if len(weights) == 0:
+            return assigned_slots
+        weights = np.asarray(weights, dtype=float)
+        # shift weights to be >= 1, then add a bonus larger than the sum of all weights for
+        # every player started so that filling a slot always beats any fpts difference
+        weights = weights - weights.min() + 1
+        value = eligible[:, self.slot_position_index] * (weights + weights.sum() + 1)[:, np.newaxis]
+        players, slots = linear_sum_assignment(value, maximize=True)
+        started = value[players, slots] > 0
+        assigned_slots[players[started]] = slots[started]
+        return assigned_slots
+
+    def find_best(self, players, weights_series=None):
+        """Determine roster with highest projected output.
+
+        :param players: Either RosterPlayers, or an iterable of players with Index and
+            eligible_positions attributes such as DataFrame.itertuples().  If players have
+            fpts it is used as the value of starting them, otherwise players are valued in
+            the order given.
+        :return: Rostered players
+        :rtype: generator of RosteredPlayer
+        """
+        return self.lineup(*self.player_arrays(players))
+
+    def player_arrays(self, players):
+        """Return player ids, eligibility matrix and value of starting each player."""
+        if not isinstance(players, RosterPlayers):
+            players = list(players)
+            return ([p.Index for p in players], self.eligibility([p.eligible_positions for p in players]),
+                    self._weights([getattr(p, 'fpts', np.nan) for p in players]))
+        return players.ids, players.eligibility(self.positions), self._weights(players.fpts)
+
+    def _weights(self, fpts):
+        weights = np.array(fpts, dtype=float)
+        if np.isnan(weights).all():
+            return np.arange(len(weights), 0, -1, dtype=float)
+        return np.nan_to_num(weights, nan=np.nanmin(weights))
+
+    def lineup(self, player_ids, eligible, weights):
+        """Solve the lineup and return it as rostered players.
+
+        :return: Rostered players
+        :rtype: generator of RosteredPlayer
+        """
+        assigned_slots = self.solve(eligible, weights)
+
+        # report positions in the order their best player was placed, players by value
+        daily_roster = defaultdict(list)
+        for player_index in np.argsort(-weights, kind='stable'):
+            if assigned_slots[player_index] >= 0:
+                daily_roster[self.roster_makeup[assigned_slots[player_index]]].append(player_ids[player_index])
+
+        return (RosteredPlayer(position=position, ordinal=ordinal, player_id=player_id) \
+                        for position, position_players in daily_roster.items() \
+                        for ordinal, player_id in enumerate(position_players, 1))
+
+    def games_played(self, available, eligible, weights):
+        """Solve the lineups for a batch of days, and optionally teams, at once.
+
+        The sets of players that can start together form a transversal matroid, so
+        adding players in order of weight whenever they still fit gives the same optimal
+        lineups as solve().  A set of players fits if, for every set of positions, the
+        players only eligible within those positions don't outnumber its slots (Hall's
+        condition).  Each player added is checked for all teams and days in one step.
+
+        :param available: [teams x] players x days, True if the player has a game that day
+        :type available: numpy.ndarray
+        :param eligible: [teams x] players x positions eligibility matrix
+        :type eligible: numpy.ndarray
+        :param weights: [teams x] players value of starting each player, typically fpts
+        :type weights: numpy.ndarray
+        :return: [teams x] players x days, True where the player is in the lineup
+        :rtype: numpy.ndarray
+        """
+        available = np.asarray(available, dtype=bool)
+        batched = available.ndim == 3
+        if not batched:
+            available, eligible, weights = available[np.newaxis], np.asarray(eligible)[np.newaxis], np.asarray(weights)[np.newaxis]
+
+        position_bits, position_sets, capacity = self._position_sets()
+        masks = np.asarray(eligible, dtype=np.int64) @ position_bits
+
+        order = np.argsort(-np.nan_to_num(np.asarray(weights, dtype=float), nan=-np.inf), axis=1, kind='stable')
+        num_teams, num_players, num_days = available.shape
+        teams = np.arange(num_teams)
+        # players started so far in each position set, teams x days x position sets
+        filled = np.zeros((num_teams, num_days, len(position_sets)), dtype=np.int64)
+        started = np.zeros(available.shape, dtype=bool)
+        for rank in range(num_players):
+            player = order[:, rank]
+            mask = masks[teams, player]
+            # position sets that contain every position the player is eligible for
+            within = ((mask[:, np.newaxis] & ~position_sets) == 0)[:, np.newaxis, :]
+            fits = available[teams, player] & (mask > 0)[:, np.newaxis] & (filled + within <= capacity).all(axis=2)
+            filled += fits[:, :, np.newaxis] * within
+            started[teams, player] = fits
+
+        return started if batched else started[0]
+
+    def swap_games_played(self, games_played, available, eligible, weights, out_player=None, in_player=None):
+        """Update solved lineups for one player dropped from and/or one added to the roster.
+
+        Starting from optimal lineups, dropping a starter only needs the best bench player
+        that fits in the lineup without him, and adding a player only needs him swapped for
+        the weakest starter he can replace, if he is better.  Both keep the lineups optimal
+        so the whole week doesn't need to be solved again for a single roster change.
+
+        :param games_played: players x days lineups solved before the change, by games_played()
+        :type games_played: numpy.ndarray
+        :param available: players x days, True if the player has a game that day.  The row of
+            the added player holds his games, the row of the dropped player is ignored
+        :type available: numpy.ndarray
+        :param eligible: players x positions eligibility matrix
+        :type eligible: numpy.ndarray
+        :param weights: players value of starting each player, typically fpts
+        :type weights: numpy.ndarray
+        :param out_player: row of the player dropped, None if no player is dropped
+        :type out_player: int
+        :param in_player: row of the player added, None if no player is added
+        :type in_player: int
+        :return: players x days, True where the player is in the lineup
+        :rtype: numpy.ndarray
+        """
+        position_bits, position_sets, capacity = self._position_sets()
+        masks = np.asarray(eligible, dtype=np.int64) @ position_bits
+        # position sets that contain every position each player is eligible for, players x position sets
+        within = ((masks[:, np.newaxis] & ~position_sets) == 0).astype(np.int64)
+        # same order as games_played(), higher priority starts first
+        order = np.argsort(-np.nan_to_num(np.asarray(weights, dtype=float), nan=-np.inf), kind='stable')
+        priority = np.empty(len(order), dtype=np.int64)
+        priority[order] = np.arange(len(order), 0, -1)
+
+        started = np.array(games_played, dtype=bool)
+        bench = np.array(available, dtype=bool) & ~started & (masks > 0)[:, np.newaxis]
+        filled = started.T.astype(np.int64) @ within
+        days = np.arange(started.shape[1])
+        if in_player is not None:
+            bench[in_player] = False
+
+        if out_player is not None:
+            dropped = started[out_player].copy()
+            started[out_player] = bench[out_player] = False
+            filled[dropped] -= within[out_player]
+            fits = bench & (filled + within[:, np.newaxis, :] <= capacity).all(axis=2)
+            replaced = dropped & fits.any(axis=0)
+            best = np.argmax(np.where(fits, priority[:, np.newaxis], 0), axis=0)[replaced]
+            started[best, days[replaced]] = True
+            filled[replaced] += within[best]
+
+        if in_player is not None:
+            playing = np.asarray(available, dtype=bool)[in_player] & (masks[in_player] > 0)
+            fits = playing & (filled + within[in_player] <= capacity).all(axis=1)
+            started[in_player, fits] = True
+            # starters that could make room for him, only weaker ones are worth swapping out
+            swappable = started & (priority < priority[in_player])[:, np.newaxis] & \
+                (filled - within[:, np.newaxis, :] + within[in_player] <= capacity).all(axis=2)
+            swapped = playing & ~fits & swappable.any(axis=0)
+            weakest = np.argmin(np.where(swappable, priority[:, np.newaxis], len(order) + 1), axis=0)[swapped]
+            started[weakest, days[swapped]] = False
+            started[in_player, swapped] = True
+
+        return started
+
+    def games_played_with_changes(self, available, eligible, weights, roster_changes, games_played=None):
+        """Solve the lineups for a roster that changes during the period.
+
+        Lineups are solved for the roster the period starts with, then each change only
+        updates the lineups from its first day on with swap_games_played().
+
+        :param available: players x days, True if the player has a game that day.  Includes every
+            player on the roster at some point in the period
+        :type available: numpy.ndarray
+        :param eligible: players x positions eligibility matrix
+        :type eligible: numpy.ndarray
+        :param weights: players value of starting each player, typically fpts
+        :type weights: numpy.ndarray
+        :param roster_changes: (first day, row of player dropped, row of player added) for each change,
+            in the order they happen.  Players added aren't on the roster before their change
+        :type roster_changes: list
+        :param games_played: players x days lineups already solved for the roster the period starts with
+        :type games_played: numpy.ndarray
+        :return: players x days, True where the player is in the lineup
+        :rtype: numpy.ndarray
+        """
+        available = np.asarray(available, dtype=bool)
+        roster_available = available.copy()
+        roster_available[[in_player for _, _, in_player in roster_changes if in_player is not None]] = False
+        if games_played is None:
+            games_played = self.games_played(roster_available, eligible, weights)
+        else:
+            games_played = np.array(games_played, dtype=bool)
+        for first_day, out_player, in_player in roster_changes:
+            if in_player is not None:
+                roster_available[in_player, first_day:] = available[in_player, first_day:]
+            games_played[:, first_day:] = self.swap_games_played(games_played[:, first_day:], roster_available[:, first_day:],
+                                                                 eligible, weights, out_player, in_player)
+            if out_player is not None:
+                roster_available[out_player, first_day:] = False
+        return games_played
+
+    def _position_sets(self):
+        """Bit of each position, every set of positions and the slots each set has."""
+        position_bits = 1 << np.arange(len(self.positions))
+        position_sets = np.arange(1 << len(self.positions))
+        capacity = ((position_sets[:, np.newaxis] & position_bits) > 0) @ self.roster_position_counts[self.positions].values
+        return position_bits, position_sets, capacity
+
+
+class LineupCache:
+    """Least recently used cache of solved daily lineups.
+
+    The same group of players having games on a day comes up over and over, across
+    the days of a week and across roster change sets that only differ on other days.
+    Lineups are keyed on the players available, with the positions each is eligible
+    for and the value of starting them, and the roster makeup; so a repeated daily
+    solve is a dictionary lookup.
+
+    :param maxsize: Maximum number of lineups to keep
+    :type maxsize: int
+    """
+    def __init__(self, maxsize=50000):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._lineups = OrderedDict()
+
+    def find_best(self, players, builder=None):
+        """Return the best roster for the players, solving it only if not cached.
+
+        :param players: Players as accepted by AssignmentRosterBuilder.find_best
+        :param builder: Builder for the roster makeup, defaults to roster_builder
+        :type builder: AssignmentRosterBuilder
+        :return: Rostered players
+        :rtype: tuple of RosteredPlayer
+        """
+        builder = builder or roster_builder
+        player_ids, eligible, weights = builder.player_arrays(players)
+        # eligibility rows as position_mask bits, so a player changing positions misses the cache
+        masks = eligible.astype(np.int64) @ (1 << np.arange(eligible.shape[1], dtype=np.int64))
+        key = (frozenset(zip(player_ids, masks.tolist(), weights)), tuple(builder.roster_makeup))
+        lineup = self._lineups.get(key)
+        if lineup is not None:
+            self.hits += 1
+            self._lineups.move_to_end(key)
+            return lineup
+
+        self.misses += 1
+        lineup = tuple(builder.lineup(player_ids, eligible, weights))
+        self._lineups[key] = lineup
+        if len(self._lineups) > self.maxsize:
+            self._lineups.popitem(last=False)
+        return lineup
+
+    def cache_info(self):
+        """Return hit/miss statistics for the cache."""
+        return LineupCacheInfo(self.hits, self.misses, self.maxsize, len(self._lineups))
+
+    def clear(self):
+        """Empty the cache and reset statistics."""
+        self._lineups.clear()
+        self.hits = 0
+        self.misses = 0
+
+
+LineupCacheInfo = namedtuple('LineupCacheInfo', 'hits misses maxsize currsize')
+
 RosteredPlayer = namedtuple('RosteredPlayer', 'position ordinal player_id')
 
 RosterPlayer = namedtuple('RosterPlayer', [
@@ -462,10 +884,13 @@ def remove_goalies(team):
 
 
 """default roster builder."""
-roster_builder = RecursiveRosterBuilder()
+roster_builder = AssignmentRosterBuilder()
 
 """This should be used to build rosters."""
-best_roster = roster_builder.find_best1
+best_roster = roster_builder.find_best
+
+"""Cache of lineups solved by the default roster builder."""
+lineup_cache = LineupCache()
 
 
 if __name__ == "__main__":
@@ -23,12 +23,22 @@ def profile(fnc):
         ps = pstats.Stats(pr, stream=s).sort_stats(sortby)
         ps.print_stats()
 
-RosterChange = namedtuple('RosterChange', 'out_player_id in_player_id change_date in_projections')
+# players added are looked up in a ProjectionTable, changes only carry ids so they are cheap to copy and serialize
+RosterChange = namedtuple('RosterChange', 'out_player_id in_player_id change_date')
+
+
+def _date_string(change_date):
+    """Day of a change date, whether a date, datetime, Timestamp or datetime64."""
+    if isinstance(change_date, datetime.datetime):
+        change_date = change_date.date()
+    if isinstance(change_date, datetime.date):
+        return str(change_date)
+    return np.datetime_as_string(np.datetime64(change_date), unit='D')
+
 
 class RosterChangeSet:
     def __init__(self, changes=None, max_allowed=4):
         self.max_allowed_changes = max_allowed
-        self._equality_value = None
         self.score = None
         self.scoring_summary = None
         self.roster_changes = []
@@ -39,9 +49,11 @@ class RosterChangeSet:
 
     @property
     def equality_value(self):
-        if self._equality_value is None:
-            self._compute_equality_score()
-        return self._equality_value
+        """Sorted (out_player_id, in_player_id, change day) of the changes, the same whatever order they were made in.
+
+        Computed on each access, the GA edits roster_changes in place.
+        """
+        return tuple(sorted((int(rc.out_player_id), int(rc.in_player_id), _date_string(rc.change_date)) for rc in self.roster_changes))
 
     def __copy__(self):
         newone = type(self)()
@@ -63,19 +75,17 @@ class RosterChangeSet:
     def __len__(self):
         return len(self.roster_changes)
 
-    def _compute_equality_score(self):
-        sorted_changes = sorted(self.roster_changes, key = lambda i: i.in_player_id,reverse=True)
-        self._equality_value = "RC" + ''.join(("-".join(*i) for i in self.roster_changes))
-
     def __eq__(self, other):
         if isinstance(other, RosterChangeSet):
             return self.equality_value == other.equality_value
         else:
             return False
 
+    def __hash__(self):
+        return hash(self.equality_value)
+
     def __delitem__(self, key):
         del self.roster_changes[key]
-        self._equality_value = None
 
     def can_drop_player(self, drop_player):
         """Check if player already being dropped in another roster change."""
@@ -90,14 +100,7 @@ class RosterChangeSet:
                 or change.in_player_id == rosterchange.in_player_id):
             raise RosterException("Having same player in/out on multiple roster changes not supported")
            
-        if isinstance(rosterchange.change_date, datetime.date):
-            date_string = str(rosterchange.change_date)
-        else:
-            date_string = np.datetime_as_string(rosterchange.change_date, unit='D')
-        # equality_score = "O{}I{}D{}".format(rosterchange.out_player_id, rosterchange.in_player_id,
-        #                                     date_string)
         self.roster_changes.append(rosterchange)
-        # self._compute_equality_score()
         self.score = None
             
 
@@ -176,7 +179,7 @@ class RosterChangeSet:
                 in_player_id = int(string[string.find("(")+1:string.find(")")])
                 string = roster_change_parts[2]
                 out_player_id = int(string[string.find("(")+1:string.find(")")])
-                rcs.add(RosterChange(out_player_id, in_player_id, change_date, player_df.loc[in_player_id]))
+                rcs.add(RosterChange(out_player_id, in_player_id, change_date))
             # roster_changes.append(roster_change_optimizer.RosterChange) 
         return rcs
 
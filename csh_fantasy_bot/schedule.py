@@ -0,0 +1,195 @@
+"""NHL season schedule, loaded once and kept in memory as a teams x dates matrix."""
+import datetime
+import logging
+import os
+
+import numpy as np
+import pandas as pd
+
+from nhl_scraper.nhl import Scraper
+
+LOG = logging.getLogger(__name__)
+
+SCHEDULE_CACHE_DIR = '.cache/nhl_schedule'
+# games get postponed and rescheduled, so reload the season from the scraper daily
+SCHEDULE_EXPIRY = datetime.timedelta(days=1)
+
+
+def _as_date(day):
+    """Accept dates, datetimes and timestamps."""
+    if isinstance(day, datetime.datetime):
+        return day.date()
+    return day
+
+
+def season_bounds(day):
+    """First and last day of the NHL season, September to August, that day falls in.
+
+    Args:
+        day (datetime.date): Any day of the season
+
+    Returns:
+        tuple: first and last date of the season
+    """
+    day = _as_date(day)
+    start_year = day.year if day.month >= 9 else day.year - 1
+    return datetime.date(start_year, 9, 1), datetime.date(start_year + 1, 8, 31)
+
+
+class NhlSchedule:
+    """Games of every team for a season.
+
+    The season is fetched from the scraper once, saved to the cache directory and memory mapped
+    from there, so processes share it and lookups are array indexing.
+    """
+
+    def __init__(self, season_start, season_end, cache_dir=SCHEDULE_CACHE_DIR, scraper=None):
+        """Initialize.
+
+        Args:
+            season_start (datetime.date): First day of the season
+            season_end (datetime.date): Last day of the season
+            cache_dir (str, optional): Directory to persist the schedule in. Defaults to SCHEDULE_CACHE_DIR.
+            scraper (Scraper, optional): NHL scraper to fetch the schedule with. Defaults to a new Scraper.
+        """
+        self.season_start = season_start
+        self.season_end = season_end
+        self.cache_dir = cache_dir
+        self._scraper = scraper
+        self._load()
+
+    @property
+    def scraper(self):
+        """Only create a scraper when the schedule needs to be fetched."""
+        if self._scraper is None:
+            self._scraper = Scraper()
+        return self._scraper
+
+    def _cache_file(self, name):
+        return os.path.join(self.cache_dir, f"{self.season_start:%Y%m%d}-{self.season_end:%Y%m%d}-{name}.npy")
+
+    def _load(self):
+        games_file = self._cache_file('games')
+        if not os.path.exists(games_file) or \
+                datetime.datetime.now() - datetime.datetime.fromtimestamp(os.path.getmtime(games_file)) > SCHEDULE_EXPIRY:
+            self.refresh()
+        #: NHL team ids, the rows of games
+        self.teams = np.load(self._cache_file('teams'))
+        #: teams x dates, True if the team plays that day
+        self.games = np.load(games_file, mmap_mode='r')
+        self._team_rows = {team: row for row, team in enumerate(self.teams.tolist())}
+        self.loaded = datetime.datetime.now()
+
+    def expired(self):
+        """True if the schedule was loaded longer ago than SCHEDULE_EXPIRY."""
+        return datetime.datetime.now() - self.loaded > SCHEDULE_EXPIRY
+
+    def refresh(self):
+        """Fetch the season from the scraper and persist it."""
+        LOG.info(f"Fetching NHL schedule for {self.season_start} - {self.season_end}")
+        days = pd.date_range(self.season_start, self.season_end)
+        teams_playing = self._fetch_teams_playing()
+        teams = np.array(sorted({team for day_teams in teams_playing.values() for team in day_teams}))
+        team_rows = {team: row for row, team in enumerate(teams)}
+        games = np.zeros((len(teams), len(days)), dtype=bool)
+        for day, day_teams in teams_playing.items():
+            day_index = (day - self.season_start).days
+            if 0 <= day_index < len(days):
+                games[[team_rows[team] for team in day_teams], day_index] = True
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        for name, values in (('teams', teams), ('games', games)):
+            # other processes may have the file mapped, so replace it rather than write over it
+            with open(self._cache_file(name) + '.tmp', 'wb') as f:
+                np.save(f, values)
+            os.replace(self._cache_file(name) + '.tmp', self._cache_file(name))
+
+    def _fetch_teams_playing(self):
+        """Teams playing each day of the season, from one ranged request to the schedule endpoint.
+
+        Returns:
+            dict: list of team ids for each date with games
+        """
+        response = self.scraper.ea.get(f"schedule?startDate={self.season_start:%Y-%m-%d}&endDate={self.season_end:%Y-%m-%d}")
+        teams_playing = {}
+        for schedule_date in response.get('dates', []):
+            day = datetime.date.fromisoformat(schedule_date['date'])
+            teams_playing[day] = [team['team']['id'] for game in schedule_date.get('games', []) for team in game['teams'].values()]
+        return teams_playing
+
+    def _day_slice(self, start_date, end_date):
+        """Columns of games from start_date to end_date inclusive, clipped to the season."""
+        start = max((_as_date(start_date) - self.season_start).days, 0)
+        end = max((_as_date(end_date) - self.season_start).days + 1, 0)
+        return slice(start, end)
+
+    def teams_playing(self, game_day):
+        """Teams with a game on game_day.
+
+        Args:
+            game_day (datetime.date): Day to look up
+
+        Returns:
+            numpy.ndarray: team ids
+        """
+        return self.teams[self.games[:, self._day_slice(game_day, game_day)].any(axis=1)]
+
+    def games_count(self, start_date, end_date):
+        """Number of games for each team playing from start_date to end_date inclusive.
+
+        Args:
+            start_date (datetime.date): First day
+            end_date (datetime.date): Last day
+
+        Returns:
+            dict: games for each team id with at least one game
+        """
+        counts = self.games[:, self._day_slice(start_date, end_date)].sum(axis=1)
+        return {team: int(count) for team, count in zip(self.teams.tolist(), counts) if count > 0}
+
+    def team_games(self, team_id, start_date, end_date):
+        """Number of games team_id plays from start_date to end_date inclusive."""
+        row = self._team_rows.get(team_id)
+        if row is None:
+            return 0
+        return int(self.games[row, self._day_slice(start_date, end_date)].sum())
+
+    def remaining_games(self, team_id, game_day):
+        """Number of games team_id plays from game_day to the end of the season."""
+        return self.team_games(team_id, game_day, self.season_end)
+
+    def schedule_matrix(self, team_ids, game_days):
+        """Find the days each player has a game.
+
+        Args:
+            team_ids (array-like): NHL team of each player
+            game_days (pd.DatetimeIndex): Days to look up
+
+        Returns:
+            numpy.ndarray: players x days, True if the player's team plays that day
+        """
+        columns = np.array([(_as_date(game_day) - self.season_start).days for game_day in game_days], dtype=np.int64)
+        in_season = (columns >= 0) & (columns < self.games.shape[1])
+        # players without a known team map to a last row that never plays
+        games = np.zeros((len(self.teams) + 1, len(columns)), dtype=bool)
+        games[:-1, in_season] = self.games[:, columns[in_season]]
+        rows = np.array([self._team_rows.get(team_id, -1) for team_id in team_ids], dtype=np.int64)
+        return games[rows]
+
+
+_schedules = {}
+
+
+def nhl_schedule(day=None):
+    """Schedule of the season day falls in, loaded once per process.
+
+    Args:
+        day (datetime.date, optional): Any day of the season. Defaults to today.
+
+    Returns:
+        NhlSchedule: the season's schedule
+    """
+    season = season_bounds(day or datetime.date.today())
+    if season not in _schedules or _schedules[season].expired():
+        _schedules[season] = NhlSchedule(*season)
+    return _schedules[season]
@@ -1,20 +1,30 @@
 import time
 import logging
 from math import e
-from collections import defaultdict
+from collections import defaultdict, namedtuple
 
 import numpy as np
 from contextlib import suppress
+from scipy.optimize import Bounds, LinearConstraint, milp
+from scipy.special import expit
+from scipy.sparse import csr_matrix
 
 from gekko import GEKKO
 
-from nhl_scraper.nhl import Scraper
 import pandas as pd
 
-from csh_fantasy_bot.roster_change_optimizer import RosterChange
+from csh_fantasy_bot.roster_change_optimizer import RosterChange, RosterChangeSet
+from csh_fantasy_bot.roster import AssignmentRosterBuilder, RosterPlayers, lineup_cache, parse_eligible_positions, position_mask
+from csh_fantasy_bot.schedule import nhl_schedule
+from csh_fantasy_bot.config import LINEUP_SOLVER, LINEUP_SOLVE_TIME_LIMIT, LINEUP_SOLVE_MAX_ITERATIONS, ROSTER_CHANGE_SOLVER
 
 logger = logging.getLogger('GEKKO')
-nhl_scraper = Scraper()
+
+# positions of the variables of roster changes in a problem choosing them with the lineups
+ADD = 'add'
+DROP = 'drop'
+# lineup_solver of results when no solver beat the fpts lineups, as best_roster picks them
+GREEDY = 'greedy'
 
 # available_positions = {
 #         "C":2,
@@ -23,114 +33,488 @@ nhl_scraper = Scraper()
 #         "D":4,
 #     }
 
-def _roster_changes_as_day_dict(rcs):
-    rc_dict = defaultdict(list)
-    if rcs:
-        for rc in rcs.roster_changes:
-            rc_dict[rc.change_date].append(rc) 
-    
-    return rc_dict
+def _position_masks(projections, positions):
+  """Return eligible positions of each player encoded as position bitmasks."""
+  return projections.eligible_positions.map(lambda eligible: position_mask(parse_eligible_positions(eligible), positions))
 
-def score_gekko(team_projections, team_id, opponent_scoring, scoring_categories, date_range, roster_makeup, date_last_use_actuals=None, roster_change_set=None, actual_scores=None):
+LineupProblem = namedtuple('LineupProblem', 'variables rewards margins constraints limits initial upper', defaults=(None,))
+LineupProblem.__doc__ = """Choice of which players to start at which position on each day of the period.
 
-  # if we don't have any actuals, lets return 0 for all stats
-  if actual_scores is None:
-    actual_scores = defaultdict(lambda:0)
+variables: (game day index, position, player id) of each binary, start the player at the position that day.
+  Roster changes chosen along with the lineups have position ADD or DROP, the player changes from that day on
+rewards: variables x scoring categories, projected stats of starting each variable's player
+margins: scoring categories, actual scores so far less the opponent's scores
+constraints: sparse constraints x variables, each row is a weighted sum of variables limited together
+limits: upper bound of each constraint row
+initial: 0/1 starting point for the solvers, the fpts lineups
+upper: 0/1 upper bound of each variable, 0 if the player isn't on the roster that day.  None if all can be started
+"""
 
-  m = GEKKO(remote=False, server='http://localhost:8083')
-  m.options.SOLVER = 1
 
-  # with roster changes we make changes, so let's copy the projections
-  current_projections = team_projections.copy()
-  # projections for players who may play.  changes with roster changes during period
-  projections_with_added_players = team_projections.copy()
+def _upper_bounds(problem):
+  """Upper bound of each variable."""
+  if problem.upper is None:
+    return np.ones(len(problem.variables))
+  return np.asarray(problem.upper, dtype=float)
 
-  rewards=defaultdict(list)
-  player_vars = defaultdict(dict)
+def _objective(problem, x):
+  """Sum over categories of the chance, as a sigmoid of the margin, of winning the category."""
+  return expit(problem.rewards.T @ x + problem.margins).sum()
 
-  rc_dict = defaultdict(list)
-  if roster_change_set:
-      rc_dict = _roster_changes_as_day_dict(roster_change_set)
-
-  for game_day_idx, game_day in enumerate(date_range):
-    for rc in rc_dict[game_day.date()]:
-      # TODO should really figure out how to deal with this.  sometimes it is string, sometimes list. 
-      # i think has to do with serializing via jsonpickle
-      with suppress(Exception):
-          rc.in_projections['eligible_positions'] = pd.eval(rc.in_projections['eligible_positions'])
-      # add player in projections to projection dataframe
-      if type(rc.in_projections) is pd.Series:
-        current_projections = pd.concat([current_projections, rc.in_projections.to_frame().T])
-        projections_with_added_players = pd.concat([projections_with_added_players, rc.in_projections.to_frame().T])
-      else:
-        current_projections = pd.concat([current_projections, rc.in_projections])
-        projections_with_added_players = pd.concat([projections_with_added_players, rc.in_projections])
-      # projections_with_added_players = projections_with_added_players.append(rc.in_projections)
-      
-      current_projections.drop(rc.out_player_id, inplace=True)
-      # current_projections.sort_values(by='fpts', ascending=False, inplace=True)
-
-    teams_playing_today = nhl_scraper._teams_playing_one_day(game_day.to_pydatetime().date())
-    game_day_players = current_projections[current_projections.team_id.isin(teams_playing_today)]
-    scores = {}
-    players = {}
-    for position in roster_makeup.keys():
-      available_for_position = game_day_players[game_day_players.eligible_positions.map(set([position]).issubset)]
-      if len(available_for_position) > 0:
-        players[position]= list(available_for_position.index)
-        scores[position] = available_for_position[scoring_categories]
-
-    vars_by_player = defaultdict(list)
-    for position in players:
-      for player in players[position]:
-        player_var = m.Var(1,0,1,True,name=f"{game_day_idx}_{position}_{player}")
-        if position not in player_vars[game_day_idx]:
-          player_vars[game_day_idx][position] = []
-        player_vars[game_day_idx][position].append(player_var)
-        vars_by_player[player].append(player_var)
-        for category in scoring_categories:
-          rewards[category].append(player_var * game_day_players.loc[player,category])
-      # limit amount players to roster size allowed for position
-      if position in player_vars[game_day_idx]:
-        m.Equation(m.sum(player_vars[game_day_idx][position]) <= roster_makeup[position])
-    
-      
-
-    # for players with multiple eligible positions, make sure only appear once
-    for player_id, player_info in game_day_players.iterrows():
-      eligible_positions = player_info.eligible_positions
-      if len(eligible_positions) > 1:
-          m.Equation(m.sum(vars_by_player[player_id]) <= 1)
-
-  for category in scoring_categories:
-    m.Obj(-1 * (1 / (1 + e ** (-(m.sum(rewards[category]) + actual_scores[category] - opponent_scoring[category])))))
-
-  result = None
-  try:  
-    m.solve(disp=False)
-  except Exception as ex:
-    print('Exception')
-    logger.exception("Exception in gekko scoring", ex)
-    time.sleep(1)
+
+def _best(problem, x, solver, incumbent, incumbent_solver):
+  """The better of a solver's lineups and the incumbent, with the solver that produced them."""
+  if x is not None and _objective(problem, x) > _objective(problem, incumbent) + 1e-9:
+    return np.asarray(x, dtype=float), solver
+  return np.asarray(incumbent, dtype=float), incumbent_solver
+
+
+class GekkoBackend:
+  """Solve the sigmoid objective exactly as a MINLP with GEKKO's APOPT solver.
+
+  APOPT stops at the time and iteration limits, and when it fails or finds nothing better the fpts
+  lineups are kept.  solved_by is GREEDY or 'gekko' after each solve.
+
+  :param time_limit: Seconds APOPT may run
+  :param max_iterations: Iterations APOPT may take
+  """
+
+  def __init__(self, time_limit=LINEUP_SOLVE_TIME_LIMIT, max_iterations=LINEUP_SOLVE_MAX_ITERATIONS):
+    self.time_limit = time_limit
+    self.max_iterations = max_iterations
+    self.solved_by = None
+
+  def solve(self, problem):
+    m = GEKKO(remote=False, server='http://localhost:8083')
+    m.options.SOLVER = 1
+    m.options.MAX_TIME = self.time_limit
+    m.options.MAX_ITER = self.max_iterations
+
+    player_vars = [m.Var(int(initial), 0, int(upper), True) for initial, upper in zip(problem.initial, _upper_bounds(problem))]
+    for row in range(problem.constraints.shape[0]):
+      row_slice = slice(problem.constraints.indptr[row], problem.constraints.indptr[row + 1])
+      m.Equation(m.sum([player_vars[column] * value for column, value in zip(problem.constraints.indices[row_slice], problem.constraints.data[row_slice])])
+                 <= problem.limits[row])
+    for category_index in range(problem.rewards.shape[1]):
+      rewards = [player_vars[column] * reward for column, reward in enumerate(problem.rewards[:, category_index]) if reward != 0]
+      if rewards:
+        m.Obj(-1 * (1 / (1 + e ** (-(m.sum(rewards) + problem.margins[category_index])))))
+
+    x = None
     try:
-      m.solve()
-    except Exception as ex2:
-      logger.exception("Exception in retry gekko scoring", ex2)
-      raise ex2
-
-  rostered_players = []
-  for game_day_idx, game_day in enumerate(date_range):
-    for position in roster_makeup.keys():
-      if position in player_vars[game_day_idx]:
-        for player in player_vars[game_day_idx][position]:
-          if player.value[0] == 1:
-            attrs = player.name.split("_")
-            player_id = int(attrs[-1])
-            position = player.name.split("_")[-2].upper()
-            rostered_players.append([player_id, position, 'p',game_day])
-  results = pd.DataFrame(rostered_players, columns=['player_id', 'rostered_position', 'score_type', 'play_date'])
-  results = results.join(projections_with_added_players[scoring_categories], on='player_id')
-  return results
+      m.solve(disp=False)
+      x = np.array([round(player_var.value[0]) for player_var in player_vars])
+    except Exception as ex:
+      # out of time or iterations, or failed, use the fpts lineups rather than hold up the rest of the chunk
+      logger.warning(f"Gekko found no lineup, using fpts lineups: {ex}")
+    x, self.solved_by = _best(problem, x, 'gekko', problem.initial, GREEDY)
+    return x
+
+
+class HighsBackend:
+  """Solve in process with the HiGHS MILP solver in scipy, no model files or solver process.
+
+  A MILP objective is linear, so each category's sigmoid is replaced by its tangent at the
+  current lineups.  The MILP is solved again from its solution while that improves the
+  sigmoid objective, starting from the fpts lineups.  The solves share the time limit, when
+  it runs out the best lineups so far are kept.  solved_by is GREEDY or 'highs' after each solve.
+
+  :param max_iterations: Maximum number of MILP solves
+  :type max_iterations: int
+  :param time_limit: Seconds all the MILP solves may take
+  """
+
+  def __init__(self, max_iterations=5, time_limit=LINEUP_SOLVE_TIME_LIMIT):
+    self.max_iterations = max_iterations
+    self.time_limit = time_limit
+    self.solved_by = None
+
+  def solve(self, problem):
+    deadline = time.monotonic() + self.time_limit
+    x, self.solved_by = np.asarray(problem.initial, dtype=float), GREEDY
+    constraints = LinearConstraint(problem.constraints, -np.inf, problem.limits)
+    integrality = np.ones(len(x))
+    for _ in range(self.max_iterations):
+      remaining = deadline - time.monotonic()
+      if remaining <= 0:
+        logger.warning("HiGHS out of time, using best lineups so far")
+        break
+      chance = expit(problem.rewards.T @ x + problem.margins)
+      result = milp(-(problem.rewards @ (chance * (1 - chance))), constraints=constraints, integrality=integrality,
+                    bounds=Bounds(0, _upper_bounds(problem)), options={'time_limit': remaining})
+      if result.x is None:
+        logger.warning(f"HiGHS found no lineup: {result.message}")
+        break
+      solved = np.round(result.x)
+      if _objective(problem, solved) <= _objective(problem, x) + 1e-9:
+        break
+      x, self.solved_by = solved, 'highs'
+    return x
+
+
+class PiecewiseLinearBackend:
+  """Solve a MILP where each category's sigmoid is replaced by a piecewise linear function.
+
+  The breakpoints cover the range the category's margin can take, denser where the sigmoid
+  bends.  Segments are filled in order, enforced by a binary per breakpoint, so the whole
+  problem is a MILP solved in process by HiGHS.  The surrogate's solution can be polished
+  with the exact sigmoid objective by another backend, which starts from it.
+
+  :param breakpoints: Number of breakpoints where the sigmoid bends, between margins of -SIGMOID_RANGE and SIGMOID_RANGE
+  :type breakpoints: int
+  :param polish: Backend to refine the solution with the exact objective, such as HighsBackend or GekkoBackend
+  :param time_limit: Seconds HiGHS may run, the best lineups it found by then are used
+  """
+
+  #: past this margin the sigmoid is flat, a single segment covers the rest of the range
+  SIGMOID_RANGE = 6
+
+  def __init__(self, breakpoints=9, polish=None, time_limit=LINEUP_SOLVE_TIME_LIMIT):
+    self.breakpoints = breakpoints
+    self.polish = polish
+    self.time_limit = time_limit
+    self.solved_by = None
+
+  def _breakpoints(self, low, high):
+    inner = np.linspace(max(low, -self.SIGMOID_RANGE), min(high, self.SIGMOID_RANGE), self.breakpoints)
+    return np.unique(np.concatenate([[low], inner[(inner > low) & (inner < high)], [high]]))
+
+  def solve(self, problem):
+    num_vars = len(problem.variables)
+    # range of each category's margin, from starting only the players with negative stats to only those with positive
+    lows = problem.margins + np.minimum(problem.rewards, 0).sum(axis=0)
+    highs = problem.margins + np.maximum(problem.rewards, 0).sum(axis=0)
+
+    objective = [np.zeros(num_vars)]
+    integrality = [np.ones(num_vars)]
+    blocks = []
+    for category_index, (low, high) in enumerate(zip(lows, highs)):
+      points = self._breakpoints(low, high)
+      if len(points) < 2:
+        # the category can't change, it doesn't matter to the lineup
+        continue
+      blocks.append((category_index, points))
+
+    num_segments = sum(len(points) - 1 for _, points in blocks)
+    num_binaries = sum(len(points) - 2 for _, points in blocks)
+    num_columns = num_vars + num_segments + num_binaries
+    rows, columns, values, lower_bounds, upper_bounds = [], [], [], [], []
+
+    def add_row(row_columns, row_values, lower, upper):
+      rows.extend([len(lower_bounds)] * len(row_columns))
+      columns.extend(row_columns)
+      values.extend(row_values)
+      lower_bounds.append(lower)
+      upper_bounds.append(upper)
+
+    constraints = problem.constraints.tocoo()
+    rows.extend(constraints.row)
+    columns.extend(constraints.col)
+    values.extend(constraints.data)
+    lower_bounds.extend([-np.inf] * len(problem.limits))
+    upper_bounds.extend(problem.limits)
+
+    segment_column = num_vars
+    binary_column = num_vars + num_segments
+    for category_index, points in blocks:
+      widths = np.diff(points)
+      segments = list(range(segment_column, segment_column + len(widths)))
+      # margin = first breakpoint + how much of each segment is filled
+      rewarded = np.flatnonzero(problem.rewards[:, category_index])
+      add_row(list(rewarded) + segments, list(problem.rewards[rewarded, category_index]) + list(-widths),
+              points[0] - problem.margins[category_index], points[0] - problem.margins[category_index])
+      objective.append(-np.diff(expit(points)))
+      integrality.append(np.zeros(len(widths)))
+      # a segment is only used once the one before it is full
+      for segment, binary in zip(range(len(widths) - 1), range(binary_column, binary_column + len(widths) - 1)):
+        add_row([segments[segment + 1], binary], [1, -1], -np.inf, 0)
+        add_row([binary, segments[segment]], [1, -1], -np.inf, 0)
+      segment_column += len(widths)
+      binary_column += len(widths) - 1
+    objective.append(np.zeros(num_binaries))
+    integrality.append(np.ones(num_binaries))
+
+    constraint_matrix = csr_matrix((values, (rows, columns)), shape=(len(lower_bounds), num_columns))
+    result = milp(np.concatenate(objective), constraints=LinearConstraint(constraint_matrix, lower_bounds, upper_bounds),
+                  integrality=np.concatenate(integrality), bounds=Bounds(0, np.concatenate([_upper_bounds(problem), np.ones(num_columns - num_vars)])),
+                  options={'time_limit': self.time_limit})
+    x = None
+    if result.x is None:
+      logger.warning(f"HiGHS found no lineup: {result.message}")
+    else:
+      x = np.round(result.x[:num_vars])
+    x, self.solved_by = _best(problem, x, 'piecewise', problem.initial, GREEDY)
+
+    if self.polish is not None:
+      x = self.polish.solve(problem._replace(initial=x))
+      if self.polish.solved_by != GREEDY:
+        self.solved_by = f"{self.solved_by}+{self.polish.solved_by}"
+    return x
+
+
+SOLVER_BACKENDS = {
+  'gekko': GekkoBackend,
+  'highs': HighsBackend,
+  'piecewise': PiecewiseLinearBackend,
+  'piecewise-polished': lambda: PiecewiseLinearBackend(polish=HighsBackend()),
+}
+
+
+class WeekModel:
+  """Lineup problem for a team's week, built once for the roster and every player that may be added.
+
+  Variables exist for every candidate player on each day he has a game, at each of his positions.
+  A roster change set only changes which players are on the roster on which days, so each one is
+  evaluated by setting the upper bound of the variables of players off the roster to 0 and solving
+  from the change set's fpts lineups; the structure is never rebuilt.
+
+  :param team_projections: Projections for the players on the team at the start of the period
+  :type team_projections: DataFrame
+  :param opponent_scoring: Opponent's projected totals for each scoring category
+  :param scoring_categories: List of player scoring categories scored
+  :type scoring_categories: list
+  :param date_range: Days to choose lineups for
+  :type date_range: pd.DatetimeIndex
+  :param roster_makeup: Number of slots for each position
+  :type roster_makeup: dict
+  :param candidates: Projections for players that roster changes may add
+  :type candidates: DataFrame
+  :param actual_scores: Actual totals for each scoring category so far
+  """
+
+  def __init__(self, team_projections, opponent_scoring, scoring_categories, date_range, roster_makeup, candidates=None, actual_scores=None):
+    # if we don't have any actuals, lets return 0 for all stats
+    if actual_scores is None:
+      actual_scores = defaultdict(lambda:0)
+
+    self.date_range = date_range
+    self.scoring_categories = scoring_categories
+    self.roster_makeup = roster_makeup
+    self.num_roster_players = len(team_projections)
+    # projections for every player who may play, the roster first
+    projections = [team_projections]
+    if candidates is not None:
+      projections.append(candidates[~candidates.index.isin(team_projections.index) & ~candidates.index.duplicated()])
+    self.projections = pd.concat(projections)
+    self.player_rows = {player_id: row for row, player_id in enumerate(self.projections.index)}
+
+    # fpts lineups are used as the starting point for the solver
+    self.lineup_builder = AssignmentRosterBuilder(roster_makeup)
+    self.positions = list(roster_makeup.keys())
+    self.position_masks = _position_masks(self.projections, self.positions).values
+    self.schedule = nhl_schedule(date_range[0]).schedule_matrix(self.projections.team_id.values, date_range)
+    self.eligible = RosterPlayers(self.projections.index.values, self.position_masks, self.projections.fpts.values, self.positions).eligibility()
+
+    variables = []
+    variable_rows = []
+    constraint_rows = []
+    constraint_columns = []
+    limits = []
+    for game_day_idx in range(len(date_range)):
+      columns_by_player = defaultdict(list)
+      for bit, position in enumerate(self.positions):
+        available_for_position = np.flatnonzero(self.schedule[:, game_day_idx] & ((self.position_masks & (1 << bit)) > 0))
+        if len(available_for_position) == 0:
+          continue
+        # limit amount players to roster size allowed for position
+        for row in available_for_position:
+          constraint_rows.append(len(limits))
+          constraint_columns.append(len(variables))
+          columns_by_player[row].append(len(variables))
+          variables.append((game_day_idx, position, self.projections.index[row]))
+          variable_rows.append(row)
+        limits.append(roster_makeup[position])
+
+      # for players with multiple eligible positions, make sure only appear once
+      for player_columns in columns_by_player.values():
+        if len(player_columns) > 1:
+          constraint_rows.extend([len(limits)] * len(player_columns))
+          constraint_columns.extend(player_columns)
+          limits.append(1)
+
+    self.variables = variables
+    self.variable_rows = np.array(variable_rows, dtype=np.int64)
+    self.variable_days = np.array([game_day_idx for game_day_idx, _, _ in variables], dtype=np.int64)
+    self.constraints = csr_matrix((np.ones(len(constraint_rows)), (constraint_rows, constraint_columns)), shape=(len(limits), len(variables)))
+    self.limits = np.array(limits, dtype=float)
+    self.rewards = np.nan_to_num(self.projections[scoring_categories].to_numpy(dtype=float))[self.variable_rows]
+    self.margins = np.array([actual_scores[category] - opponent_scoring[category] for category in scoring_categories], dtype=float)
+    self._variable_index = {variable: column for column, variable in enumerate(variables)}
+
+  def covers(self, roster_change_set):
+    """True if every player the change set adds is a candidate of the model."""
+    return roster_change_set is None or all(rc.in_player_id in self.player_rows for rc in roster_change_set.roster_changes)
+
+  def problem(self, roster_change_set=None):
+    """Lineup problem for the roster with the change set.
+
+    :return: The problem, with players off the roster bounded to 0
+    :rtype: LineupProblem
+    """
+    roster_changes = []
+    if roster_change_set:
+      roster_changes = sorted([rc for rc in roster_change_set.roster_changes if rc.change_date <= self.date_range[-1].date()],
+                              key=lambda rc: rc.change_date)
+    changes = [(self.date_range.searchsorted(pd.Timestamp(rc.change_date)), self.player_rows[rc.out_player_id], self.player_rows[rc.in_player_id])
+               for rc in roster_changes]
+
+    on_roster = np.zeros(self.schedule.shape, dtype=bool)
+    on_roster[:self.num_roster_players] = True
+    for first_day, out_player, in_player in changes:
+      on_roster[out_player, first_day:] = False
+      on_roster[in_player, first_day:] = True
+
+    # the fpts lineups for the roster before any changes, then updated for each change
+    available = self.schedule.copy()
+    available[self.num_roster_players:] = False
+    for _, _, in_player in changes:
+      available[in_player] = self.schedule[in_player]
+    games_played = self.lineup_builder.games_played_with_changes(available, self.eligible, self.projections.fpts.values, changes)
+
+    initial = np.zeros(len(self.variables), dtype=int)
+    for game_day_idx in range(len(self.date_range)):
+      starters = games_played[:, game_day_idx]
+      for rostered in lineup_cache.find_best(RosterPlayers(self.projections.index.values[starters], self.position_masks[starters],
+                                                           self.projections.fpts.values[starters], self.positions), self.lineup_builder):
+        initial[self._variable_index[(game_day_idx, rostered.position, rostered.player_id)]] = 1
+
+    return LineupProblem(self.variables, self.rewards, self.margins, self.constraints, self.limits, initial,
+                         on_roster[self.variable_rows, self.variable_days].astype(int))
+
+  def roster_change_problem(self, droppable, change_dates, max_adds):
+    """Lineup problem that also chooses the roster changes, adding candidates and dropping roster players.
+
+    A binary for each candidate and each change date adds him from that day on, and one for each droppable
+    player drops him.  Players are only started on days they are on the roster, each day adds as many as it
+    drops, and no more than max_adds are added over the period.
+
+    :param droppable: Ids of roster players that may be dropped
+    :param change_dates: Days roster changes may be made on
+    :param max_adds: Number of players that may still be added this period
+    :type max_adds: int
+    :return: The problem, starting from the lineups of the roster without changes
+    :rtype: LineupProblem
+    """
+    change_days = sorted({self.date_range.get_loc(pd.Timestamp(change_date)) for change_date in change_dates if pd.Timestamp(change_date) in self.date_range})
+    drop_rows = sorted({self.player_rows[player_id] for player_id in droppable if self.player_rows.get(player_id, self.num_roster_players) < self.num_roster_players})
+    add_rows = list(range(self.num_roster_players, len(self.projections)))
+
+    num_vars = len(self.variables)
+    change_variables = []
+    change_columns = {}
+    for game_day_idx in change_days:
+      for position, rows in ((DROP, drop_rows), (ADD, add_rows)):
+        for row in rows:
+          change_columns[(position, row, game_day_idx)] = num_vars + len(change_variables)
+          change_variables.append((game_day_idx, position, self.projections.index[row]))
+
+    constraints = self.constraints.tocoo()
+    rows, columns, values = list(constraints.row), list(constraints.col), list(constraints.data)
+    limits = list(self.limits)
+
+    def add_row(row_columns, row_values, limit):
+      rows.extend([len(limits)] * len(row_columns))
+      columns.extend(row_columns)
+      values.extend(row_values)
+      limits.append(limit)
+
+    # players are only started once added and until dropped
+    for column, (row, game_day_idx) in enumerate(zip(self.variable_rows, self.variable_days)):
+      if row >= self.num_roster_players:
+        adds = [change_columns[(ADD, row, day)] for day in change_days if day <= game_day_idx]
+        add_row([column] + adds, [1] + [-1] * len(adds), 0)
+      elif row in drop_rows:
+        drops = [change_columns[(DROP, row, day)] for day in change_days if day <= game_day_idx]
+        if drops:
+          add_row([column] + drops, [1] * (len(drops) + 1), 1)
+    # a player is added or dropped once
+    for position, change_rows in ((DROP, drop_rows), (ADD, add_rows)):
+      for row in change_rows:
+        if change_days:
+          add_row([change_columns[(position, row, day)] for day in change_days], [1] * len(change_days), 1)
+    # each day's adds replace as many drops
+    for game_day_idx in change_days:
+      adds = [change_columns[(ADD, row, game_day_idx)] for row in add_rows]
+      drops = [change_columns[(DROP, row, game_day_idx)] for row in drop_rows]
+      add_row(adds + drops, [1] * len(adds) + [-1] * len(drops), 0)
+      add_row(adds + drops, [-1] * len(adds) + [1] * len(drops), 0)
+    add_row([change_columns[(ADD, row, day)] for day in change_days for row in add_rows], [1] * (len(change_days) * len(add_rows)), max_adds)
+
+    num_columns = num_vars + len(change_variables)
+    unchanged = self.problem()
+    return LineupProblem(self.variables + change_variables, np.vstack([self.rewards, np.zeros((len(change_variables), len(self.scoring_categories)))]),
+                         self.margins, csr_matrix((values, (rows, columns)), shape=(len(limits), num_columns)), np.array(limits, dtype=float),
+                         np.concatenate([unchanged.initial, np.zeros(len(change_variables), dtype=int)]))
+
+  def best_roster_changes(self, droppable, change_dates, max_adds, backend=None):
+    """Choose the roster changes and lineups together in a single solve.
+
+    :param droppable: Ids of roster players that may be dropped
+    :param change_dates: Days roster changes may be made on
+    :param max_adds: Number of players that may still be added this period
+    :type max_adds: int
+    :param backend: Solver for the problem, defaults to the ROSTER_CHANGE_SOLVER configured
+    :return: The roster changes, and the rostered player, position and projected scoring for each day
+    :rtype: tuple
+    """
+    problem = self.roster_change_problem(droppable, change_dates, max_adds)
+    x, solved_by = self._solve(problem, backend or SOLVER_BACKENDS[ROSTER_CHANGE_SOLVER]())
+
+    changes = defaultdict(lambda: defaultdict(list))
+    for (game_day_idx, position, player_id), chosen in zip(problem.variables[len(self.variables):], x[len(self.variables):]):
+      if chosen == 1:
+        changes[game_day_idx][position].append(player_id)
+    roster_change_set = RosterChangeSet(max_allowed=max(max_adds, 1))
+    for game_day_idx, day_changes in sorted(changes.items()):
+      for out_player_id, in_player_id in zip(day_changes[DROP], day_changes[ADD]):
+        roster_change_set.add(RosterChange(out_player_id, in_player_id, self.date_range[game_day_idx].date()))
+    return roster_change_set, self._results(problem.variables[:len(self.variables)], x[:len(self.variables)], solved_by)
+
+  def _solve(self, problem, backend):
+    """Solve the problem, returning the lineups and which solver produced them."""
+    if not problem.variables:
+      return problem.initial, GREEDY
+    backend = backend or SOLVER_BACKENDS[LINEUP_SOLVER]()
+    x = backend.solve(problem)
+    return x, getattr(backend, 'solved_by', None) or type(backend).__name__
+
+  def _results(self, variables, x, solved_by):
+    rostered_players = [[player_id, position, 'p', self.date_range[game_day_idx]]
+                        for (game_day_idx, position, player_id), chosen in zip(variables, x) if chosen == 1]
+    results = pd.DataFrame(rostered_players, columns=['player_id', 'rostered_position', 'score_type', 'play_date'])
+    results = results.join(self.projections[self.scoring_categories], on='player_id')
+    results['lineup_solver'] = solved_by
+    return results
+
+  def score(self, roster_change_set=None, backend=None):
+    """Choose the lineups for the roster with the change set.
+
+    :param backend: Solver for the lineup problem, defaults to the LINEUP_SOLVER configured
+    :type backend: GekkoBackend or HighsBackend
+    :return: Rostered player, position and projected scoring for each day, lineup_solver is the solver
+        that chose the lineups or GREEDY if it ran out of time without beating the fpts lineups
+    :rtype: DataFrame
+    """
+    problem = self.problem(roster_change_set)
+    x, solved_by = self._solve(problem, backend)
+    return self._results(problem.variables, x, solved_by)
+
+
+def score_gekko(team_projections, team_id, opponent_scoring, scoring_categories, date_range, roster_makeup, date_last_use_actuals=None, roster_change_set=None, actual_scores=None, backend=None, projection_table=None):
+  """Choose the lineups for the period that maximize the chance of winning each category.
+
+  :param projection_table: Projections of the players the roster change set adds, needed with a change set
+  :type projection_table: ProjectionTable
+  :param backend: Solver for the lineup problem, defaults to the LINEUP_SOLVER configured
+  :type backend: GekkoBackend or HighsBackend
+  :return: Rostered player, position and projected scoring for each day, and the lineup_solver that chose them
+  :rtype: DataFrame
+  """
+  candidates = None
+  if roster_change_set:
+    candidates = projection_table.added_players([roster_change_set])
+  week_model = WeekModel(team_projections, opponent_scoring, scoring_categories, date_range, roster_makeup, candidates=candidates, actual_scores=actual_scores)
+  return week_model.score(roster_change_set, backend=backend)
 
 
 if __name__ == "__main__":
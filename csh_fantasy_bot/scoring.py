@@ -1,11 +1,62 @@
+import numpy as np
 import pandas as pd
 import logging
 import math
 
+from scipy.special import expit, ndtr
+
+from csh_fantasy_bot import utils
+
 
 def sigmoid(x):
   return 1 / (1 + math.exp(-x))
 
+def per_game_variances(box_scores, stat_categories, min_games=10):
+    """
+    Variance of each player's per game scoring in each category.
+
+    :param box_scores: A row per player per game, with player_id and the categories
+    :param stat_categories: Categories to compute variances for
+    :param min_games: Players with fewer games are left out, their variance is estimated from their projections
+    :return: Variances indexed by player_id
+    :rtype: DataFrame
+    """
+    grouped = box_scores.groupby('player_id')[stat_categories]
+    variances = grouped.var(ddof=1)
+    return variances[grouped.size() >= min_games]
+
+
+def yahoo_player_variances(nhl_variances, players):
+    """
+    Reindex per game variances from NHL player ids to Yahoo player_id.
+
+    Box scores are keyed by NHL player id, projections by Yahoo player_id.  Players are matched
+    on their name and NHL team, or on the name alone where only one player has it, as a player
+    traded since his last game is on a new team.
+
+    :param nhl_variances: per_game_variances with the player_name and team_id of each player's last game
+    :param players: Yahoo players indexed by player_id, with name and team_id
+    :return: Variances indexed by player_id, players not matched are left out
+    :rtype: DataFrame
+    """
+    def name_key(name):
+        return utils.normalized(name).lower()
+
+    names = players.name.map(name_key)
+    unique_names = names.value_counts()
+    by_name_team = {(name, team_id): player_id for player_id, name, team_id in zip(players.index, names, players.team_id)}
+    by_name = {name: player_id for player_id, name in zip(players.index, names) if unique_names[name] == 1}
+    player_ids = [by_name_team.get((name_key(name), team_id), by_name.get(name_key(name)))
+                  for name, team_id in zip(nhl_variances.player_name, nhl_variances.team_id)]
+
+    variances = nhl_variances.drop(columns=['player_name', 'team_id'])
+    variances.index = pd.Index(player_ids, name='player_id')
+    variances = variances[variances.index.notna()]
+    variances = variances[~variances.index.duplicated()]
+    variances.index = variances.index.astype(int)
+    return variances
+
+
 class ScoreComparer:
     """
     Class that compares the scores of two lineups.
@@ -15,15 +66,93 @@ class ScoreComparer:
     :param cfg: Configparser object
     :param scorer: Object that computes scores for the categories
     :param lg_lineups: All of the lineups in the league.  This is used to
-        compute a standard deviation of all of the stat categories.
+        compute a standard deviation of all of the stat categories.  A dict
+        keyed by team can have a team's lineup replaced with update_team().
+
+    The league means and standard deviations are kept as running counts, means
+    and sums of squared differences (Welford's method) over each team's totals,
+    so adding, removing or replacing a team is O(categories).
     """
     def __init__(self, lg_lineups, stat_categories):
         self.opp_sum = None
+        self.opp_variances = None
+        self.player_variances = None
         self.stdev_cap = .2
         self.stat_cats = stat_categories
-        self.stdevs = self._compute_agg(lg_lineups, 'std')
-        self.league_means = self._compute_agg(lg_lineups, 'mean')
         self.log = logging.getLogger(__name__)
+        self._team_totals = {}
+        self._counts = np.zeros(len(stat_categories))
+        self._means = np.zeros(len(stat_categories))
+        self._squared_diffs = np.zeros(len(stat_categories))
+        if not isinstance(lg_lineups, dict):
+            lg_lineups = dict(enumerate(lg_lineups))
+        for team, lineup in lg_lineups.items():
+            self.add_team(team, lineup)
+
+    @property
+    def league_means(self):
+        """Mean of each category over the teams' totals."""
+        return pd.Series(np.where(self._counts > 0, self._means, np.nan), index=self.stat_cats)
+
+    @property
+    def stdevs(self):
+        """Sample standard deviation of each category over the teams' totals."""
+        with np.errstate(divide='ignore', invalid='ignore'):
+            variances = np.where(self._counts > 1, np.maximum(self._squared_diffs, 0) / (self._counts - 1), np.nan)
+        return pd.Series(np.sqrt(variances), index=self.stat_cats)
+
+    def _totals(self, lineup):
+        """Total of each category of a lineup, a dataframe or a list of player series."""
+        if type(lineup) is pd.DataFrame:
+            df = pd.DataFrame(data=lineup, columns=lineup.columns)
+        else:
+            df = pd.DataFrame(data=lineup, columns=lineup[0].index)
+        return df.loc[:,self.stat_cats].sum().to_numpy(dtype=float)
+
+    def add_team(self, team, lineup):
+        """
+        Add a team's lineup to the league statistics, a team already added has its lineup replaced with update_team().
+
+        :param team: Key of the team
+        :param lineup: The team's lineup
+        """
+        if team in self._team_totals:
+            self.update_team(team, lineup)
+            return
+        totals = self._totals(lineup)
+        self._team_totals[team] = totals
+        counted = ~np.isnan(totals)
+        self._counts[counted] += 1
+        delta = totals[counted] - self._means[counted]
+        self._means[counted] += delta / self._counts[counted]
+        self._squared_diffs[counted] += delta * (totals[counted] - self._means[counted])
+
+    def remove_team(self, team):
+        """
+        Remove a team's lineup from the league statistics.
+
+        :param team: Key of the team
+        """
+        totals = self._team_totals.pop(team)
+        counted = ~np.isnan(totals)
+        previous_means = self._means[counted]
+        self._counts[counted] -= 1
+        remaining = self._counts[counted]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            means = np.where(remaining > 0, previous_means - (totals[counted] - previous_means) / remaining, 0)
+        self._means[counted] = means
+        self._squared_diffs[counted] = np.where(remaining > 0, self._squared_diffs[counted] - (totals[counted] - means) * (totals[counted] - previous_means), 0)
+
+    def update_team(self, team, lineup):
+        """
+        Replace a team's lineup, such as after a transaction, without aggregating the other teams again.
+
+        :param team: Key of the team
+        :param lineup: The team's new lineup
+        """
+        if team in self._team_totals:
+            self.remove_team(team)
+        self.add_team(team, lineup)
 
     def set_opponent(self, opp_sum):
         """
@@ -58,24 +187,6 @@ class ScoreComparer:
             print("{} - {:.3f}".format(cat, val))
         print("")
 
-    def _compute_agg(self, lineups, agg):
-        """
-        Compute an aggregation of each of the categories.
-
-        :param lineups: Lineups to compute the aggregation on
-        :return: Aggregation compuation for each category
-        :rtype: DataFrame
-        """
-        scores = []
-        for lineup in lineups:
-            if type(lineup) is pd.DataFrame:
-                df = pd.DataFrame(data=lineup, columns=lineup.columns)
-            else:
-                df = pd.DataFrame(data=lineup, columns=lineup[0].index)
-            scores.append(df.loc[:,self.stat_cats].sum())
-                
-        return pd.DataFrame(scores).agg([agg]).loc[agg,:]
-
     def score(self, team1_scores, team2_scores=None):
         """
         Calculate a lineup score by comparing it against the opponent.
@@ -115,6 +226,83 @@ class ScoreComparer:
                 num_std_divs_opp, score_opp ,cat_win_loss, score_differential_league, score_league],
             index=['my-scores', 'opponent', 'difference_opp', 'mean-league', 'std dev', 'mean-opp', 'num_stds_opp', 'score_opp','win_loss_opp', 'difference_league', 'score_league']).round(3)
         return summary_df
+
+    def lineup_variances(self, lineup):
+        """
+        Variance of each category total of a lineup.
+
+        Each projected row is a player's game, its variance is the player's per game variance from
+        player_variances.  Players without one are taken to score as a Poisson process, with the
+        variance equal to the projection.  Actual scores, score_type 'a', are already known.
+
+        :param lineup: Scoring with player_id in the columns or index, a row per player per game
+        :return: Variance of each category total, in stat_cats order
+        :rtype: numpy.ndarray
+        """
+        if 'player_id' not in lineup.columns:
+            lineup = lineup.reset_index()
+        variances = np.abs(lineup.loc[:, self.stat_cats].to_numpy(dtype=float))
+        if self.player_variances is not None:
+            known = self.player_variances.reindex(lineup.player_id.values).loc[:, self.stat_cats].to_numpy(dtype=float)
+            variances = np.where(np.isnan(known), variances, known)
+        if 'score_type' in lineup.columns:
+            variances[(lineup.score_type == 'a').values] = 0
+        return np.nansum(variances, axis=0)
+
+    def win_probabilities(self, team_totals, team_variances, opponent_totals=None, opponent_variances=None):
+        """
+        Chance of winning each category, with the totals taken as independent normals.
+
+        :param team_totals: Candidates x categories array of totals, categories in stat_cats order
+        :param team_variances: Candidates x categories array of the variance of the totals, from lineup_variances
+        :param opponent_totals: Opponent's total for each category, defaults to the one set with set_opponent()
+        :param opponent_variances: Variance of the opponent's totals, defaults to opp_variances or, if that isn't
+            set, the opponent's totals as Poisson variances
+        :return: Candidates x categories array of probabilities
+        :rtype: numpy.ndarray
+        """
+        team_totals = np.asarray(team_totals, dtype=float).reshape(-1, len(self.stat_cats))
+        team_variances = np.asarray(team_variances, dtype=float).reshape(-1, len(self.stat_cats))
+        if opponent_totals is None:
+            opponent_totals = self.opp_sum
+        opponent_totals = pd.Series(opponent_totals)[self.stat_cats].to_numpy(dtype=float)
+        if opponent_variances is None:
+            opponent_variances = self.opp_variances if self.opp_variances is not None else np.abs(opponent_totals)
+        differences = team_totals - opponent_totals
+        deviations = np.sqrt(team_variances + np.asarray(opponent_variances, dtype=float))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            # with no variance the category is decided, a tie is a coin flip
+            return np.where(deviations > 0, ndtr(differences / deviations), 0.5 * (np.sign(differences) + 1))
+
+    def score_many(self, team_totals, opponent_totals=None, score_type='score_opp', team_variances=None):
+        """
+        Score many candidates' category totals at once, without building summary frames.
+
+        Each score is the score_type row of the score summary summed over the categories, or for
+        'win_probability' the expected number of categories won.
+
+        :param team_totals: Candidates x categories array of totals, categories in stat_cats order
+        :param opponent_totals: Opponent's total for each category, defaults to the one set with set_opponent()
+        :param score_type: 'score_opp' to compare against the opponent, 'score_league' against the league means,
+            'win_probability' for the chance of beating the opponent in each category
+        :param team_variances: Candidates x categories variances of the totals, needed for 'win_probability'
+        :return: Score of each candidate
+        :rtype: numpy.ndarray
+        """
+        if score_type == 'win_probability':
+            return self.win_probabilities(team_totals, team_variances, opponent_totals).sum(axis=1)
+        team_totals = np.asarray(team_totals, dtype=float).reshape(-1, len(self.stat_cats))
+        if score_type == 'score_opp':
+            if opponent_totals is None:
+                opponent_totals = self.opp_sum
+            compare_to = pd.Series(opponent_totals)[self.stat_cats]
+        elif score_type == 'score_league':
+            compare_to = self.league_means[self.stat_cats]
+        else:
+            raise ValueError(f"Unknown score type: {score_type}")
+        num_std_divs = (team_totals - compare_to.to_numpy(dtype=float)) / self.stdevs[self.stat_cats].to_numpy(dtype=float)
+        # categories without a total are left out, as in score
+        return np.nansum(expit(num_std_divs), axis=1)
     
         
     def print_week_results(self, my_scores_summary):
@@ -124,3 +312,93 @@ class ScoreComparer:
         print("Score: {:4.2f}".format(sc))
 
 
+
+
+class MatchupSimulator:
+    """
+    Simulate a matchup by sampling the stat lines of each player's games in the lineups.
+
+    Each projected game of a player is drawn with the projection as its mean and the player's per
+    game variance: Poisson when there is no more variance than a Poisson process has, otherwise
+    negative binomial, drawn as a Poisson whose rate is gamma distributed.  Categories that can be
+    negative are normal.  A player's games are independent and identically distributed, and Poisson
+    draws with independent rates add up to a Poisson draw of the summed rate, so each category only
+    takes a gamma draw per distinct dispersion and one Poisson draw per matchup, exactly.  Actual
+    scores, score_type 'a', are added as they are.
+
+    :param stat_categories: Categories of the matchup
+    :param player_variances: Per game variances indexed by player_id, from per_game_variances.  Players
+        without one have Poisson variance
+    :param seed: Seed for the random generator, the same seed gives the same results
+    :param normal_categories: Categories that can be negative
+    :param tie_tolerance: Totals closer than this are a tie
+    """
+    def __init__(self, stat_categories, player_variances=None, seed=None, normal_categories=('+/-',), tie_tolerance=1e-9):
+        self.stat_cats = stat_categories
+        self.player_variances = player_variances
+        self.seed = seed
+        self.normal_categories = normal_categories
+        self.tie_tolerance = tie_tolerance
+
+    def _games(self, lineup):
+        """Actual totals, and the number of each player's projected games with their per game means and variances."""
+        if 'player_id' not in lineup.columns:
+            lineup = lineup.reset_index()
+        actual = np.zeros(len(lineup), dtype=bool)
+        if 'score_type' in lineup.columns:
+            actual = (lineup.score_type == 'a').values
+        actual_totals = np.nansum(lineup.loc[actual, self.stat_cats].to_numpy(dtype=float), axis=0)
+
+        projected = lineup[~actual]
+        means = np.nan_to_num(projected.loc[:, self.stat_cats].to_numpy(dtype=float))
+        variances = np.abs(means)
+        if self.player_variances is not None:
+            known = self.player_variances.reindex(projected.player_id.values).loc[:, self.stat_cats].to_numpy(dtype=float)
+            variances = np.where(np.isnan(known), variances, known)
+        games, counts = np.unique(np.column_stack([projected.player_id.to_numpy(dtype=float), means, variances]), axis=0, return_counts=True)
+        parameters = games[:, 1:].reshape(-1, 2, len(self.stat_cats))
+        return actual_totals, counts.astype(float), parameters[:, 0], parameters[:, 1]
+
+    def _sample(self, rng, games, num_simulations):
+        """Simulated totals, num_simulations x categories."""
+        actual_totals, counts, means, variances = games
+        totals = np.tile(actual_totals, (num_simulations, 1))
+        for category_index, category in enumerate(self.stat_cats):
+            mean, variance = means[:, category_index], variances[:, category_index]
+            if category in self.normal_categories:
+                totals[:, category_index] += rng.normal((counts * mean).sum(), np.sqrt((counts * variance).sum()), num_simulations)
+                continue
+            overdispersed = (mean > 0) & (variance > mean)
+            rate = np.full(num_simulations, (counts * mean)[~overdispersed & (mean > 0)].sum())
+            if overdispersed.any():
+                # games of the same dispersion have gamma rates of the same scale, their shapes add up
+                scales, groups = np.unique((variance[overdispersed] - mean[overdispersed]) / mean[overdispersed], return_inverse=True)
+                shapes = np.bincount(groups, weights=counts[overdispersed] * mean[overdispersed] ** 2 / (variance[overdispersed] - mean[overdispersed]))
+                rate += rng.gamma(shapes, scales, (num_simulations, len(scales))).sum(axis=1)
+            totals[:, category_index] += rng.poisson(rate)
+        return totals
+
+    def simulate(self, team_scores, opponent_scores, num_simulations=100000, seed=None, chunk_size=100000):
+        """
+        Chance of winning, tying and losing each category and the matchup.
+
+        :param team_scores: Scoring frame of the team's lineups, such as score_team's results
+        :param opponent_scores: Scoring frame of the opponent's lineups
+        :param num_simulations: Number of matchups to simulate
+        :param seed: Seed for this simulation, defaults to the simulator's seed
+        :param chunk_size: Matchups simulated at a time, bounds the memory used
+        :return: Probabilities with rows win, tie and loss, a column per category and overall
+        :rtype: DataFrame
+        """
+        rng = np.random.default_rng(self.seed if seed is None else seed)
+        team_games, opponent_games = self._games(team_scores), self._games(opponent_scores)
+        counts = np.zeros((3, len(self.stat_cats) + 1))
+        for start in range(0, num_simulations, chunk_size):
+            size = min(chunk_size, num_simulations - start)
+            differences = self._sample(rng, team_games, size) - self._sample(rng, opponent_games, size)
+            wins = differences > self.tie_tolerance
+            losses = differences < -self.tie_tolerance
+            net_categories_won = wins.sum(axis=1) - losses.sum(axis=1)
+            counts[:, :-1] += [wins.sum(axis=0), (~wins & ~losses).sum(axis=0), losses.sum(axis=0)]
+            counts[:, -1] += [(net_categories_won > 0).sum(), (net_categories_won == 0).sum(), (net_categories_won < 0).sum()]
+        return pd.DataFrame(counts / num_simulations, index=['win', 'tie', 'loss'], columns=list(self.stat_cats) + ['overall'])
@@ -0,0 +1,72 @@
+"""Immutable context a team's change sets are scored in, published once by a digest of its content."""
+import hashlib
+
+import numpy as np
+
+from csh_fantasy_bot.config import SCORING_CONTEXT_CACHE_SIZE, SCORING_CONTEXT_TTL
+from csh_fantasy_bot.projection_table import projections_digest
+from csh_fantasy_bot.published_store import PublishedStore
+from csh_fantasy_bot.roster import parse_projections_positions
+
+
+class ScoringContext:
+    """The team's roster, days, categories and opponent, with the projections of players change sets may add.
+
+    Everything about scoring a GA generation except the change sets.  The driver publishes it under
+    its key, a digest of the content, and scoring tasks only carry the key and the change sets.  Workers
+    fetch each context once and keep it.  Contexts are shared, don't modify them.
+
+    The schedule and the roster makeup aren't part of it, workers have the memory mapped schedule and
+    the league loaded already.
+
+    Args:
+        roster (DataFrame): Projections for the players on the team
+        date_range (pd.DatetimeIndex): Days of the scoring period
+        scoring_categories (list): List of player scoring categories scored
+        team_key (str): Key of the team
+        opponent_scores (dict): Opponent's projected totals for each scoring category
+        projection_table (ProjectionTable): Projections of the players the change sets may add
+    """
+
+    def __init__(self, roster, date_range, scoring_categories, team_key, opponent_scores, projection_table):
+        roster = roster.copy()
+        parse_projections_positions(roster)
+        self.roster = roster
+        self.date_range = date_range
+        self.scoring_categories = list(scoring_categories)
+        self.team_key = team_key
+        self.opponent_scores = dict(opponent_scores)
+        self.projection_table = projection_table
+
+        digest = hashlib.blake2b(digest_size=20)
+        digest.update(projections_digest(roster).encode())
+        opponent_totals = np.array([float(self.opponent_scores.get(category, 0)) for category in self.scoring_categories])
+        digest.update(repr(([str(day.date()) for day in date_range], self.scoring_categories, team_key, projection_table.version)).encode())
+        digest.update(opponent_totals.tobytes())
+        self.key = digest.hexdigest()
+
+
+# contexts by key, in redis whatever the cache backing so each worker fetches a context once
+scoring_contexts = PublishedStore('scoring-context', maxsize=SCORING_CONTEXT_CACHE_SIZE, ttl=SCORING_CONTEXT_TTL)
+
+
+def publish_scoring_context(context):
+    """Make the context available to workers by its key.
+
+    Returns:
+        str: key of the context
+
+    Raises:
+        RuntimeError: if the context can't be written to redis
+    """
+    scoring_contexts.publish(context.key, context)
+    return context.key
+
+
+def load_scoring_context(key):
+    """Context published with the key.
+
+    Raises:
+        KeyError: if no context with the key has been published, or it has expired
+    """
+    return scoring_contexts.load(key)
@@ -0,0 +1,207 @@
+"""Compact binary celery serializer for the scoring tasks.
+
+Frames are sent as typed numpy columns, roster change sets as int arrays and everything else
+as msgpack.  Payloads over SCORING_COMPRESS_THRESHOLD bytes are compressed.  Without msgpack
+installed payloads fall back to jsonpickle, in the same envelope.
+"""
+import datetime
+import logging
+import zlib
+
+import jsonpickle
+import jsonpickle.ext.pandas as jsonpickle_pandas
+import numpy as np
+import pandas as pd
+
+from csh_fantasy_bot.config import SCORING_COMPRESS_THRESHOLD, SCORING_SERIALIZER
+from csh_fantasy_bot.roster_change_optimizer import RosterChange, RosterChangeSet
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+jsonpickle_pandas.register_handlers()
+log = logging.getLogger(__name__)
+
+CONTENT_TYPE = 'application/x-fantasy-scoring'
+
+# first byte of a payload, how the rest is encoded
+MSGPACK = b'M'
+MSGPACK_ZLIB = b'm'
+JSONPICKLE = b'J'
+JSONPICKLE_ZLIB = b'j'
+
+# msgpack extension types
+_FRAME = 1
+_SERIES = 2
+_ROSTER_CHANGE_SET = 3
+_TIMESTAMP = 4
+_DATE = 5
+_ARRAY = 6
+_JSONPICKLE = 7
+
+
+def _pack_column(column):
+    """Kind and data of a column: numeric and datetime columns as bytes, strings as uniques and codes."""
+    values = column.to_numpy()
+    if values.dtype.kind in 'biufcM':
+        return ['n', values.dtype.str, values.tobytes()]
+    if all(value is None or isinstance(value, str) for value in values):
+        codes, uniques = pd.factorize(values)
+        return ['c', list(uniques), codes.dtype.str, codes.tobytes()]
+    return ['o', list(values)]
+
+
+def _unpack_column(packed):
+    kind = packed[0]
+    if kind == 'n':
+        return np.frombuffer(packed[2], dtype=np.dtype(packed[1])).copy()
+    if kind == 'c':
+        # None has code -1, the last of the uniques
+        uniques = np.array(packed[1] + [None], dtype=object)
+        return uniques[np.frombuffer(packed[3], dtype=np.dtype(packed[2]))]
+    return packed[1]
+
+
+def _pack_index(index):
+    """Levels and codes of a MultiIndex, the values of any other index, None for a default RangeIndex."""
+    if isinstance(index, pd.MultiIndex):
+        return ['m', list(index.names), [[_pack_column(level), codes.dtype.str, codes.tobytes()]
+                                         for level, codes in zip(index.levels, index.codes)]]
+    if isinstance(index, pd.RangeIndex) and index.name is None and index.start == 0 and index.step == 1:
+        return None
+    return ['i', index.name, _pack_column(index)]
+
+
+def _unpack_index(packed):
+    if packed is None:
+        return None
+    if packed[0] == 'm':
+        levels, codes = zip(*[(_unpack_column(level), np.frombuffer(level_codes, dtype=np.dtype(dtype)))
+                              for level, dtype, level_codes in packed[2]])
+        return pd.MultiIndex(levels=levels, codes=codes, names=packed[1], verify_integrity=False)
+    return pd.Index(_unpack_column(packed[2]), name=packed[1])
+
+
+def _pack_frame(frame):
+    """Index, column order, then the float columns as one block and each other column."""
+    floats, block, others = [], [], []
+    for name, column in frame.items():
+        if column.dtype == np.float64:
+            floats.append(name)
+            block.append(column.to_numpy())
+        else:
+            others.append([name, _pack_column(column)])
+    block = np.column_stack(block) if block else np.empty((len(frame), 0))
+    return [_pack_index(frame.index), len(frame), list(frame.columns), floats, block.tobytes(), others]
+
+
+def _unpack_frame(index, rows, columns, floats, block, others):
+    block = np.frombuffer(block, dtype=np.float64).reshape(rows, len(floats)).copy()
+    values = {name: block[:, column] for column, name in enumerate(floats)}
+    values.update((name, _unpack_column(packed)) for name, packed in others)
+    return pd.DataFrame(values, index=_unpack_index(index), columns=columns)
+
+
+def _pack_roster_change_set(roster_change_set):
+    """_id and max_allowed_changes, then out_player_id, in_player_id and day ordinal of each change."""
+    values = [getattr(roster_change_set, '_id', -1), roster_change_set.max_allowed_changes]
+    for rc in roster_change_set.roster_changes:
+        values += [rc.out_player_id, rc.in_player_id, pd.Timestamp(rc.change_date).toordinal()]
+    return np.array(values, dtype='<i8').tobytes()
+
+
+def _unpack_roster_change_set(data):
+    values = np.frombuffer(data, dtype='<i8').tolist()
+    roster_change_set = RosterChangeSet(max_allowed=values[1])
+    for out_player_id, in_player_id, day in zip(values[2::3], values[3::3], values[4::3]):
+        roster_change_set.add(RosterChange(out_player_id, in_player_id, datetime.date.fromordinal(day)))
+    if values[0] != -1:
+        roster_change_set._id = values[0]
+    return roster_change_set
+
+
+def _default(obj):
+    if isinstance(obj, pd.DataFrame):
+        return msgpack.ExtType(_FRAME, _packb(_pack_frame(obj)))
+    if isinstance(obj, pd.Series):
+        return msgpack.ExtType(_SERIES, _packb([obj.name, _pack_index(obj.index), _pack_column(obj)]))
+    if isinstance(obj, RosterChangeSet):
+        return msgpack.ExtType(_ROSTER_CHANGE_SET, _pack_roster_change_set(obj))
+    if isinstance(obj, pd.Timestamp):
+        return msgpack.ExtType(_TIMESTAMP, obj.isoformat().encode())
+    if isinstance(obj, datetime.date) and not isinstance(obj, datetime.datetime):
+        return msgpack.ExtType(_DATE, obj.isoformat().encode())
+    if isinstance(obj, np.ndarray) and obj.dtype.kind in 'biufcM':
+        return msgpack.ExtType(_ARRAY, _packb([obj.dtype.str, list(obj.shape), obj.tobytes()]))
+    if isinstance(obj, np.generic):
+        return obj.item()
+    # anything else goes as jsonpickle
+    return msgpack.ExtType(_JSONPICKLE, jsonpickle.encode(obj).encode())
+
+
+def _ext_hook(code, data):
+    if code == _FRAME:
+        return _unpack_frame(*_unpackb(data))
+    if code == _SERIES:
+        name, index, packed = _unpackb(data)
+        return pd.Series(_unpack_column(packed), index=_unpack_index(index), name=name)
+    if code == _ROSTER_CHANGE_SET:
+        return _unpack_roster_change_set(data)
+    if code == _TIMESTAMP:
+        return pd.Timestamp(data.decode())
+    if code == _DATE:
+        return datetime.date.fromisoformat(data.decode())
+    if code == _ARRAY:
+        dtype, shape, values = _unpackb(data)
+        return np.frombuffer(values, dtype=np.dtype(dtype)).reshape(shape).copy()
+    if code == _JSONPICKLE:
+        return jsonpickle.decode(data.decode())
+    return msgpack.ExtType(code, data)
+
+
+def _packb(obj):
+    return msgpack.packb(obj, default=_default, use_bin_type=True)
+
+
+def _unpackb(data):
+    return msgpack.unpackb(data, ext_hook=_ext_hook, raw=False, strict_map_key=False)
+
+
+def dumps(obj, compress_threshold=SCORING_COMPRESS_THRESHOLD):
+    """Encode obj, compressing it if the payload is over compress_threshold bytes.
+
+    Returns:
+        bytes: payload
+    """
+    if msgpack is not None:
+        payload, header, compressed_header = _packb(obj), MSGPACK, MSGPACK_ZLIB
+    else:
+        payload, header, compressed_header = jsonpickle.encode(obj).encode(), JSONPICKLE, JSONPICKLE_ZLIB
+    if len(payload) > compress_threshold:
+        return compressed_header + zlib.compress(payload, 1)
+    return header + payload
+
+
+def loads(data):
+    """Decode a payload from dumps."""
+    header, payload = data[:1], data[1:]
+    if header in (MSGPACK_ZLIB, JSONPICKLE_ZLIB):
+        payload = zlib.decompress(payload)
+    if header in (MSGPACK, MSGPACK_ZLIB):
+        if msgpack is None:
+            raise ValueError("Scoring payload was encoded with msgpack, which isn't installed")
+        return _unpackb(payload)
+    if header in (JSONPICKLE, JSONPICKLE_ZLIB):
+        return jsonpickle.decode(payload.decode())
+    raise ValueError(f"Unknown scoring payload header: {header}")
+
+
+def register_scoring_serializer():
+    """Register dumps and loads with kombu as the SCORING_SERIALIZER celery serializer."""
+    from kombu.serialization import register
+
+    if msgpack is None:
+        log.warning("msgpack is not installed, scoring tasks are serialized with jsonpickle")
+    register(SCORING_SERIALIZER, dumps, loads, content_type=CONTENT_TYPE, content_encoding='binary')
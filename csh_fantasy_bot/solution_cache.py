@@ -0,0 +1,190 @@
+"""Content addressed cache of solved lineups, so identical lineup problems are only solved once."""
+import hashlib
+import logging
+import pickle
+import time
+
+from collections import OrderedDict, namedtuple
+
+import numpy as np
+import pandas as pd
+
+from csh_fantasy_bot.config import GREEDY_SOLUTION_TTL, LINEUP_SOLVER, SOLUTION_CACHE_SIZE, SOLUTION_CACHE_TTL
+from csh_fantasy_bot.score_gekko import GREEDY
+
+LOG = logging.getLogger(__name__)
+
+# seconds the solution caches stop using redis after it couldn't be reached
+REDIS_RETRY_INTERVAL = 60
+
+
+def _projection_bytes(projections, scoring_categories):
+    """Ids, values and eligible positions of projections, a dataframe or a single player series."""
+    if isinstance(projections, pd.Series):
+        projections = projections.to_frame().T
+    values = projections.loc[:, ['team_id', 'fpts'] + list(scoring_categories)].to_numpy(dtype=float)
+    return repr((list(projections.index), [str(eligible) for eligible in projections.eligible_positions])).encode() + values.tobytes()
+
+
+def lineup_fingerprint(team_projections, date_range, roster_makeup, scoring_categories, opponent_scoring, actual_scores=None,
+                       roster_change_set=None, solver=LINEUP_SOLVER, decimals=2, projection_table=None):
+    """Fingerprint of everything that decides a team's lineups for the period.
+
+    Opponent and actual totals are rounded to decimals, and roster changes are put in a canonical
+    order with those after the period left out and those before it moved to its first day, so
+    problems that only differ in ways that can't change the lineups share a fingerprint.
+
+    Args:
+        team_projections (DataFrame): Projections for the players on the team at the start of the period
+        date_range (pd.DatetimeIndex): Days to choose lineups for
+        roster_makeup (dict): Number of slots for each position
+        scoring_categories (list): List of player scoring categories scored
+        opponent_scoring (dict): Opponent's projected totals for each scoring category
+        actual_scores (Series, optional): Actual totals for each scoring category so far. Defaults to None.
+        roster_change_set (RosterChangeSet, optional): Changes to make during the period. Defaults to None.
+        solver (str, optional): Lineup solver configured. Defaults to LINEUP_SOLVER.
+        decimals (int, optional): Decimals to round totals to. Defaults to 2.
+        projection_table (ProjectionTable, optional): Projections of the players the changes add. Defaults to None.
+
+    Returns:
+        str: hex digest
+    """
+    digest = hashlib.blake2b(digest_size=20)
+    digest.update(_projection_bytes(team_projections, scoring_categories))
+    digest.update(repr(([str(day.date()) for day in date_range], sorted(roster_makeup.items()), list(scoring_categories), solver)).encode())
+    for totals in (opponent_scoring, actual_scores):
+        if totals is not None:
+            totals = np.round([float(totals[category]) for category in scoring_categories], decimals) + 0.0
+        digest.update(repr(totals).encode())
+
+    roster_changes = []
+    if roster_change_set and len(date_range) > 0:
+        first_day, last_day = date_range[0].date(), date_range[-1].date()
+        roster_changes = sorted([(max(rc.change_date, first_day), rc.out_player_id, rc.in_player_id)
+                                 for rc in roster_change_set.roster_changes if rc.change_date <= last_day])
+    for change_date, out_player_id, in_player_id in roster_changes:
+        digest.update(repr((str(change_date), out_player_id, in_player_id)).encode())
+    if roster_changes:
+        digest.update(_projection_bytes(projection_table.rows([change[2] for change in roster_changes]), scoring_categories))
+    return digest.hexdigest()
+
+
+class SolutionCache:
+    """Least recently used cache of solved lineups, with entries expiring after ttl seconds.
+
+    Entries are kept in process, and with a redis client also in redis with the same ttl, so
+    workers share solutions.  If redis can't be reached the cache carries on in process, trying
+    redis again after REDIS_RETRY_INTERVAL seconds.  Keys are content digests, such as lineup_fingerprint.  Lineups that
+    were all chosen GREEDY, which a solve that ran out of time falls back to, are only kept for
+    greedy_ttl seconds so a slow solve doesn't pin them.
+
+    Args:
+        maxsize (int, optional): Maximum number of solutions kept in process. Defaults to SOLUTION_CACHE_SIZE.
+        ttl (float, optional): Seconds a solution is kept. Defaults to SOLUTION_CACHE_TTL.
+        redis (RedisClient, optional): Redis to share solutions through. Defaults to None.
+        key_prefix (str, optional): Prefix of the redis keys. Defaults to 'lineup-solution'.
+        greedy_ttl (float, optional): Seconds GREEDY lineups are kept. Defaults to GREEDY_SOLUTION_TTL.
+    """
+
+    def __init__(self, maxsize=SOLUTION_CACHE_SIZE, ttl=SOLUTION_CACHE_TTL, redis=None, key_prefix='lineup-solution',
+                 greedy_ttl=GREEDY_SOLUTION_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.greedy_ttl = greedy_ttl
+        self.redis = redis
+        self.key_prefix = key_prefix
+        self.hits = 0
+        self.misses = 0
+        self._solutions = OrderedDict()
+        # when to try redis again after it couldn't be reached
+        self._redis_retry = 0
+
+    def get(self, key):
+        """Solution for key, or None if it isn't cached."""
+        entry = self._solutions.get(key)
+        if entry is not None and entry[0] < time.monotonic():
+            del self._solutions[key]
+            entry = None
+        if entry is not None:
+            self._solutions.move_to_end(key)
+            self.hits += 1
+            return entry[1].copy()
+
+        solution = None
+        if self._redis_available():
+            try:
+                data = self.redis.conn.get(f'{self.key_prefix}-{key}')
+                if data:
+                    solution = pickle.loads(data)
+            except Exception as e:
+                self._redis_failed('read', e)
+        if solution is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._store(key, solution, self._ttl(solution))
+        return solution.copy()
+
+    def set(self, key, solution):
+        """Cache the solution for key."""
+        ttl = self._ttl(solution)
+        self._store(key, solution.copy(), ttl)
+        if self._redis_available():
+            try:
+                self.redis.conn.set(f'{self.key_prefix}-{key}', pickle.dumps(solution), ex=max(int(ttl), 1))
+            except Exception as e:
+                self._redis_failed('write', e)
+
+    def solve(self, key, solver):
+        """Solution for key, calling solver only if it isn't cached."""
+        solution = self.get(key)
+        if solution is None:
+            solution = solver()
+            if solution is not None:
+                self.set(key, solution)
+        return solution
+
+    def _redis_available(self):
+        return self.redis is not None and self._redis_retry < time.monotonic()
+
+    def _redis_failed(self, action, error):
+        LOG.warning(f"Could not {action} lineup solution in redis, only caching in process for {REDIS_RETRY_INTERVAL}s: {error}")
+        self._redis_retry = time.monotonic() + REDIS_RETRY_INTERVAL
+
+    def _ttl(self, solution):
+        """greedy_ttl if every lineup of the solution was chosen GREEDY, otherwise ttl."""
+        lineup_solver = getattr(solution, 'lineup_solver', None)
+        if lineup_solver is not None and len(lineup_solver) > 0 and (lineup_solver == GREEDY).all():
+            return self.greedy_ttl
+        return self.ttl
+
+    def _store(self, key, solution, ttl):
+        self._solutions[key] = (time.monotonic() + ttl, solution)
+        self._solutions.move_to_end(key)
+        if len(self._solutions) > self.maxsize:
+            self._solutions.popitem(last=False)
+
+    def cache_info(self):
+        """Return hit/miss statistics for the cache."""
+        return SolutionCacheInfo(self.hits, self.misses, self.maxsize, len(self._solutions))
+
+    def clear(self):
+        """Empty the in process cache and reset statistics."""
+        self._solutions.clear()
+        self.hits = 0
+        self.misses = 0
+
+
+SolutionCacheInfo = namedtuple('SolutionCacheInfo', 'hits misses maxsize currsize')
+
+
+def shared_redis():
+    """RedisClient to share caches between workers, whatever the cache backing.
+
+    Creating the client doesn't connect, a cache falls back to in process if redis can't be reached.
+    """
+    from csh_fantasy_bot.redis import RedisClient
+    return RedisClient()
+
+
+lineup_solution_cache = SolutionCache(redis=shared_redis())
@@ -9,8 +9,11 @@ import pandas as pd
 import jsonpickle
 import jsonpickle.ext.pandas as jsonpickle_pandas
 
+from csh_fantasy_bot.config import SCORING_SERIALIZER
 from csh_fantasy_bot.extensions import celery
 from csh_fantasy_bot.roster_change_optimizer import RosterChangeSet
+from csh_fantasy_bot.scoring_context import load_scoring_context, publish_scoring_context
+from csh_fantasy_bot.roster import lineup_cache
 from functools import partial
 # from csh_fantasy_bot.nhl import score_team as nhl_score_team
 
@@ -129,6 +132,24 @@ def check_daily_roster(self):
         results.append(result)
     return results
     
+def score_change_sets(league, context, roster_change_sets):
+    """Score the team of the ScoringContext with each roster change set.
+
+    Returns:
+        list: (roster_change_set, scoring results) of each change set
+    """
+    log.debug(f"starting scoring for len change_sets {len(roster_change_sets)}")
+    roster, date_range, opponent_scores, team_id = context.roster, context.date_range, context.opponent_scores, context.team_key
+    week_model = None
+    if league.stat_modifiers() is None:
+        # build the lineup model once for the chunk, each change set only toggles who is on the roster
+        candidates = context.projection_table.added_players(roster_change_sets)
+        week_model = league.week_model(roster, date_range, opponent_scores, candidates=candidates, team_id=team_id)
+    the_scores = [league.score_team(roster, date_range, opponent_scores, roster_change_set=rc, simulation_mode=False, team_id=team_id, week_model=week_model,
+                                    projection_table=context.projection_table) for rc in roster_change_sets]
+    log.debug(f"done scoring, lineup cache: {lineup_cache.cache_info()}")
+    return the_scores
+
 # league = None  
 CHUNK_SIZE = 15
 log.debug(f'chunk size for scoring is{CHUNK_SIZE}')
@@ -142,28 +163,23 @@ def do_chunk(team_key, start_date, end_date, roster_change_sets_jp, opponent=Non
 
 
 # @celery.task(bind=True, name='score_team')
-@shared_task
-def score_team(player_projections, start_date, end_date, scoring_categories, team_id, opponent_scores, roster_change_sets_jp):
-    """Score a team by applying roster change sets."""
+@shared_task(serializer=SCORING_SERIALIZER)
+def score_team(context_key, roster_change_sets):
+    """Score a team by applying roster change sets in the published scoring context.
+
+    Arguments and results are sent with the compact scoring serializer, the change sets as ids.
+    """
     try:
-        league_id = _league_id_from_team_key(team_id)
-        
-        league = get_league(league_id)
-        roster_change_sets = jsonpickle.decode(roster_change_sets_jp)
         if roster_change_sets:
-            date_range = pd.date_range(start_date, end_date)
-            # TODO figure out player projections....players on team and players getting added via roster change
-            roster = jsonpickle.decode(player_projections)
-            # json pickle seems to be decoding eligble_positions back into str...should be list
-            roster['eligible_positions'] = pd.eval(roster['eligible_positions'])
+            # fetched once per worker, then kept in process
+            context = load_scoring_context(context_key)
+            league = get_league(_league_id_from_team_key(context.team_key))
             
             if roster_change_sets:
                 try:
-                    log.debug(f"starting scoring for len change_sets {len(roster_change_sets)}")
-                    the_scores = [league.score_team(roster, date_range, opponent_scores, roster_change_set=rc, simulation_mode=False, team_id=team_id) for rc in roster_change_sets]
-                    log.debug("done scoring")
+                    the_scores = score_change_sets(league, context, roster_change_sets)
                     # just serialize the id of the roster change
-                    return jsonpickle.encode([(rc._id,score) for rc,score in the_scores])
+                    return [(rc._id,score) for rc,score in the_scores]
                 except Exception as e:
                     log.exception(e)
         else:
@@ -181,17 +197,16 @@ def chunks(lst, n):
         for i in range(0, len(lst), n): 
             yield lst[i:i + n ]
 
-def score_chunk(team_roster, start_date, end_date, roster_change_sets, scoring_categories, team_key, opponent_scores):
-    count_words = group([score_team.s(jsonpickle.encode(i)) for i in chunks(roster_change_sets,CHUNK_SIZE)])
-    # jsonpickle.encode(i)                  
+def score_chunk(context, roster_change_sets):
+    # workers fetch the context by key, tasks only carry the key and the change sets
+    context_key = publish_scoring_context(context)
+    count_words = group([score_team.s(i) for i in chunks(roster_change_sets,CHUNK_SIZE)])
     log.debug(f"start score, # roster change sets: {len(roster_change_sets)}")
-    return_val =  count_words(jsonpickle.encode(team_roster), start_date, end_date, scoring_categories, team_key, opponent_scores)
+    return_val =  count_words(context_key)
     
     final_results = []
     for result in return_val.get():
         if result:
-            rcs = jsonpickle.decode(result)
-            for rc in rcs:
-                final_results.append(rc)
+            final_results.extend(result)
     log.debug("done scoring")  
     return final_results
@@ -177,4 +177,23 @@ class LeagueCache(CacheBase):
          return self.run_loader(self.player_master_list_file(), expiry, loader)
 
     def player_master_list_file(self):
-        return f"{self.cache_dir}/player_master_list.pkl"
\ No newline at end of file
+        return f"{self.cache_dir}/player_master_list.pkl"
+
+
+class StatsCache(CacheBase):
+    """NHL statistics computed offline, such as from box scores by compute_variance."""
+    def __init__(self):
+        super(StatsCache, self).__init__('nhl_stats')
+
+    def player_variances_cache_file(self):
+        return "player_variances.pkl"
+
+    def load_player_variances(self):
+        """Per game variances keyed by NHL player id, or None if they haven't been computed."""
+        cached_data = self.load(self.player_variances_cache_file())
+        if cached_data is None:
+            return None
+        return cached_data["payload"]
+
+    def write_player_variances(self, player_variances):
+        self.write(self.player_variances_cache_file(), {"payload": player_variances, "expiry": None})
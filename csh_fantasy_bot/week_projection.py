@@ -0,0 +1,240 @@
+"""Projected scoring of rosters over a scoring period, computed on arrays."""
+import logging
+
+from collections import OrderedDict, namedtuple
+
+import numpy as np
+import pandas as pd
+
+from csh_fantasy_bot.roster import roster_builder, RosterPlayers
+from csh_fantasy_bot.schedule import nhl_schedule
+
+LOG = logging.getLogger(__name__)
+
+# lineup_solver of results, the lineups are the assignment builder's
+ASSIGNMENT = 'assignment'
+
+
+def _player_arrays(players, game_days, scoring_categories, positions):
+    """Ids, projections, schedule, eligibility and fpts arrays of the players in a projections dataframe."""
+    if len(game_days) > 0:
+        schedule = nhl_schedule(game_days[0]).schedule_matrix(players.team_id.values, game_days)
+    else:
+        schedule = np.zeros((len(players), 0), dtype=bool)
+    return (players.index.values,
+            players.loc[:, scoring_categories].to_numpy(dtype=float),
+            schedule,
+            RosterPlayers.from_frame(players, positions).eligibility(),
+            players.fpts.to_numpy(dtype=float))
+
+
+class WeekProjection:
+    """Projected scoring for a team's roster over a scoring period.
+
+    The roster, and any players added by roster changes, are held as a players x days schedule
+    matrix and a players x categories projection matrix.  Roster changes only mask which rows are
+    on the roster on each day, so lineups are solved once and category totals are matrix products.
+    The scoring frame is only built for callers that ask for it.
+    """
+
+    def __init__(self, roster, game_days, scoring_categories, roster_change_set=None, baseline=None, stat_weights=None, projection_table=None,
+                 builder=None):
+        """Initialize.
+
+        Args:
+            roster (DataFrame): Projections for the players on the team at the start of the period
+            game_days (pd.DatetimeIndex): Days to project
+            scoring_categories (list): List of player scoring categories scored
+            roster_change_set (RosterChangeSet, optional): Changes to make up to the end of the period. Defaults to None.
+            baseline (WeekProjection, optional): Projection of the same roster and days without changes, its arrays
+                and lineups are reused so only the days from the first change are solved. Defaults to None.
+            stat_weights (dict, optional): Value of each scoring category, such as the stat modifiers of a points
+                league.  Players are started by their weighted projections instead of fpts. Defaults to None.
+            projection_table (ProjectionTable, optional): Projections of the players the changes add, needed with
+                a change set. Defaults to None.
+            builder (AssignmentRosterBuilder, optional): Builder for the league's roster makeup. Defaults to roster_builder.
+        """
+        self.builder = builder or roster_builder
+        self.game_days = game_days
+        self.scoring_categories = scoring_categories
+        self.baseline = baseline
+
+        # changes in date order, those made before the first day apply from it
+        roster_changes = []
+        if roster_change_set and len(game_days) > 0:
+            roster_changes = sorted([rc for rc in roster_change_set.roster_changes if rc.change_date <= game_days[-1].date()],
+                                    key=lambda rc: rc.change_date)
+        # every player on the roster at some point in the period, players added follow the starting roster
+        frames = [projection_table.rows([rc.in_player_id for rc in roster_changes])] if roster_changes else []
+        arrays = []
+        if baseline is None:
+            frames.insert(0, roster)
+        else:
+            arrays.append((baseline.player_ids, baseline.projections, baseline.schedule, baseline.eligible, baseline.weights))
+        arrays += [_player_arrays(frame, game_days, scoring_categories, self.builder.positions) for frame in frames]
+        self.player_ids, self.projections, self.schedule, self.eligible, self.weights = (np.concatenate(column) for column in zip(*arrays))
+        if stat_weights is not None:
+            self.weights = np.nan_to_num(self.projections) @ np.array([stat_weights.get(category, 0) for category in scoring_categories], dtype=float)
+
+        rows = {player_id: row for row, player_id in enumerate(roster.index.values)}
+        self.roster_changes = []
+        for rc_index, rc in enumerate(roster_changes):
+            in_player = len(roster) + rc_index
+            self.roster_changes.append((game_days.searchsorted(pd.Timestamp(rc.change_date)), rows[rc.out_player_id], in_player))
+            rows[rc.in_player_id] = in_player
+        self._games_played = None
+
+    @classmethod
+    def for_teams(cls, rosters, game_days, scoring_categories, stat_weights=None, builder=None):
+        """Project several teams, solving every team's lineups in a single batch.
+
+        Args:
+            rosters (list): Projections dataframe for each team
+            game_days (pd.DatetimeIndex): Days to project
+            scoring_categories (list): List of player scoring categories scored
+            stat_weights (dict, optional): Value of each scoring category to start players by. Defaults to None.
+            builder (AssignmentRosterBuilder, optional): Builder for the league's roster makeup. Defaults to roster_builder.
+
+        Returns:
+            list: WeekProjection of each team
+        """
+        builder = builder or roster_builder
+        week_projections = [cls(roster, game_days, scoring_categories, stat_weights=stat_weights, builder=builder) for roster in rosters]
+        max_players = max([len(projection.player_ids) for projection in week_projections], default=0)
+        available = np.zeros((len(rosters), max_players, len(game_days)), dtype=bool)
+        eligible = np.zeros((len(rosters), max_players, len(builder.positions)), dtype=bool)
+        weights = np.full((len(rosters), max_players), np.nan)
+        for team_index, projection in enumerate(week_projections):
+            num_players = len(projection.player_ids)
+            available[team_index, :num_players] = projection.schedule
+            eligible[team_index, :num_players] = projection.eligible
+            weights[team_index, :num_players] = projection.weights
+        games_played = builder.games_played(available, eligible, weights)
+        for team_index, projection in enumerate(week_projections):
+            projection._games_played = games_played[team_index, :len(projection.player_ids)]
+        return week_projections
+
+    @property
+    def games_played(self):
+        """players x days, True where the player is in the lineup."""
+        if self._games_played is None:
+            baseline_games_played = None
+            if self.baseline is not None:
+                # players added aren't in the baseline lineups
+                baseline_games_played = np.zeros(self.schedule.shape, dtype=bool)
+                baseline_games_played[:len(self.baseline.player_ids)] = self.baseline.games_played
+            self._games_played = self.builder.games_played_with_changes(self.schedule, self.eligible, self.weights, self.roster_changes,
+                                                                          games_played=baseline_games_played)
+        return self._games_played
+
+    def category_totals(self):
+        """Projected totals for the period.
+
+        Returns:
+            pd.Series: Total of each scoring category
+        """
+        totals = self.games_played.sum(axis=1) @ np.nan_to_num(self.projections)
+        return pd.Series(totals, index=self.scoring_categories)
+
+    def daily_totals(self):
+        """Projected totals for each day.
+
+        Returns:
+            DataFrame: Days x scoring categories
+        """
+        return pd.DataFrame(self.games_played.T.astype(float) @ np.nan_to_num(self.projections),
+                            index=self.game_days, columns=self.scoring_categories)
+
+    def results(self):
+        """Projected scoring for each player in the lineup on each day.
+
+        Returns:
+            DataFrame: Scoring categories, rostered_position, score_type 'p' and lineup_solver, as WeekModel results,
+                indexed by play_date, player_id
+        """
+        day_index, player_index = np.nonzero(self.games_played.T)
+        # games_played only says who starts, the players of each day fill the slots of a matching
+        rostered_positions = np.empty(len(player_index), dtype=object)
+        for day in np.unique(day_index):
+            on_day = day_index == day
+            slots = self.builder.solve(self.eligible[player_index[on_day]], np.ones(on_day.sum()))
+            rostered_positions[on_day] = self.builder.roster_makeup[slots]
+        results = pd.DataFrame(self.projections[player_index], columns=self.scoring_categories,
+                               index=pd.MultiIndex.from_arrays([self.game_days[day_index], self.player_ids[player_index]],
+                                                               names=['play_date', 'player_id']))
+        results['rostered_position'] = rostered_positions
+        results['score_type'] = 'p'
+        results['lineup_solver'] = ASSIGNMENT
+        if 'G' in results.columns and results.G.isnull().any():
+            LOG.warning(f"no projections for players: {results[results.G.isnull()].index.get_level_values('player_id').unique().values}")
+        return results
+
+
+class WeekProjectionCache:
+    """Least recently used cache of team projections without roster changes.
+
+    A roster change set only alters scoring from its first change on, the days before are
+    the same as the roster without changes.  Each change set is projected from the cached
+    projection of its team's roster, reusing its arrays and lineups and only solving the days
+    from each change on.  Entries are keyed on the roster's players and their projections, so
+    new projections or a changed roster miss and replace them as they age out.
+
+    Args:
+        maxsize (int, optional): Maximum number of team projections to keep. Defaults to 128.
+    """
+
+    def __init__(self, maxsize=128):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._projections = OrderedDict()
+
+    def projection(self, roster, game_days, scoring_categories, roster_change_set=None, stat_weights=None, projection_table=None, builder=None):
+        """Project the roster with the change set, projecting the roster without changes only if not cached.
+
+        Args:
+            roster (DataFrame): Projections for the players on the team at the start of the period
+            game_days (pd.DatetimeIndex): Days to project
+            scoring_categories (list): List of player scoring categories scored
+            roster_change_set (RosterChangeSet, optional): Changes to make up to the end of the period. Defaults to None.
+            stat_weights (dict, optional): Value of each scoring category to start players by. Defaults to None.
+            projection_table (ProjectionTable, optional): Projections of the players the changes add. Defaults to None.
+            builder (AssignmentRosterBuilder, optional): Builder for the league's roster makeup. Defaults to roster_builder.
+
+        Returns:
+            WeekProjection: projection for the roster with the changes
+        """
+        builder = builder or roster_builder
+        key = (tuple(roster.index), roster.loc[:, ['team_id', 'fpts'] + list(scoring_categories)].to_numpy(dtype=float).tobytes(),
+               tuple(str(eligible) for eligible in roster.eligible_positions), tuple(game_days), tuple(scoring_categories),
+               tuple(sorted(stat_weights.items())) if stat_weights is not None else None, tuple(builder.roster_makeup))
+        baseline = self._projections.get(key)
+        if baseline is not None:
+            self.hits += 1
+            self._projections.move_to_end(key)
+        else:
+            self.misses += 1
+            baseline = WeekProjection(roster, game_days, scoring_categories, stat_weights=stat_weights, builder=builder)
+            self._projections[key] = baseline
+            if len(self._projections) > self.maxsize:
+                self._projections.popitem(last=False)
+
+        if not roster_change_set:
+            return baseline
+        return WeekProjection(roster, game_days, scoring_categories, roster_change_set, baseline=baseline, stat_weights=stat_weights,
+                              projection_table=projection_table, builder=builder)
+
+    def cache_info(self):
+        """Return hit/miss statistics for the cache."""
+        return WeekProjectionCacheInfo(self.hits, self.misses, self.maxsize, len(self._projections))
+
+    def clear(self):
+        """Empty the cache and reset statistics."""
+        self._projections.clear()
+        self.hits = 0
+        self.misses = 0
+
+
+WeekProjectionCacheInfo = namedtuple('WeekProjectionCacheInfo', 'hits misses maxsize currsize')
+
+week_projection_cache = WeekProjectionCache()
@@ -37,7 +37,7 @@ def to_roster_change(roster_changes, player_df):
             in_player_id = int(string[string.find("(")+1:string.find(")")])
             string = roster_change_parts[2]
             out_player_id = int(string[string.find("(")+1:string.find(")")])
-            rcs.add(roster_change_optimizer.RosterChange(out_player_id, in_player_id, change_date, player_df.loc[in_player_id]))
+            rcs.add(roster_change_optimizer.RosterChange(out_player_id, in_player_id, change_date))
         # roster_changes.append(roster_change_optimizer.RosterChange) 
     return rcs
 
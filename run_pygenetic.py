@@ -7,10 +7,12 @@ from contextlib import suppress
 
 from pygenetic import Utils
 
-from csh_fantasy_bot.ga import RosterChangeSetFactory, fitness, RandomWeightedSelector, CeleryFitnessGAEngine, ScoringType
+from csh_fantasy_bot.ga import RosterChangeSetFactory, fitness, FitnessMemo, RandomWeightedSelector, CeleryFitnessGAEngine, ScoringType
 from csh_fantasy_bot.bot import ManagerBot
 from csh_fantasy_bot.league import FantasyLeague
+from csh_fantasy_bot.projection_table import ProjectionTable
 from csh_fantasy_bot.roster_change_optimizer import RosterException, RosterChangeSet
+from csh_fantasy_bot.score_gekko import PiecewiseLinearBackend
 from csh_fantasy_bot.celery_app import app
 
 # this will hold player ids of players which can be dropped as overrides to the drop selection criteria
@@ -23,8 +25,11 @@ black_list = {
     # '403.l.41177': [4684, 5696],
     '411.l.85094': [],
 }
-def do_run(week=5, league_id='403.l.41177', population_size=500):
-    """Run the algorithm."""
+def do_run(week=5, league_id='403.l.41177', population_size=500, optimizer='ga'):
+    """Run the algorithm.
+
+    optimizer 'ga' evolves roster change sets, 'milp' chooses the changes and lineups together in one solve.
+    """
     week = 14
     league_id = '419.l.90115'
     # league_id = "403.l.18782"
@@ -81,6 +86,19 @@ def do_run(week=5, league_id='403.l.41177', population_size=500):
     if num_allowed_player_adds == 0:
         print("No roster changes left, no need to run.")
         return
+    if optimizer == 'milp':
+        roster = projected_stats[(projected_stats.fantasy_status == my_team_id) & (projected_stats.position_type == "P")].loc[:,rostering_columns]
+        candidates = addable_players[addable_players.position_type == "P"].loc[:,rostering_columns]
+        opponent_scores = game_week.opponent.scores()[league_scoring_categories].sum().to_dict()
+        week_model = league.week_model(roster, date_range, opponent_scores, candidates=candidates, team_id=team_key)
+        rcs, _ = week_model.best_roster_changes(droppable_players.index, valid_roster_change_dates, num_allowed_player_adds,
+                                                backend=PiecewiseLinearBackend())
+        _, roster_week_results = league.score_team(roster, date_range, opponent_scores, roster_change_set=rcs, team_id=team_key, week_model=week_model,
+                                                   projection_table=ProjectionTable(candidates))
+        rcs.scoring_summary = roster_week_results.reset_index()
+        rcs.pretty_print(projected_stats=projected_stats)
+        print(game_week.score_comparer.score(rcs.scoring_summary))
+        return
     factory = RosterChangeSetFactory(projected_stats[rostering_columns], valid_roster_change_dates, num_moves=num_allowed_player_adds, add_selector=add_selector, drop_selector=drop_selector)
     gea = CeleryFitnessGAEngine(factory=factory,population_size=population_size,
                                 cross_prob=0.5,mut_prob = 0.1, adaptive_mutation=False)
@@ -120,7 +138,7 @@ def do_run(week=5, league_id='403.l.41177', population_size=500):
                     continue
                 if not any(player_id == rc.in_player_id for rc in chromosome.roster_changes):
                     with suppress(RosterException):
-                        chromosome.replace(roster_change_to_mutate, roster_change_to_mutate._replace(in_player_id=player_id, in_projections=plyr[scoring_categories + ['eligible_positions', 'team_id', 'fpts']]))
+                        chromosome.replace(roster_change_to_mutate, roster_change_to_mutate._replace(in_player_id=player_id))
                     break
         else:
             if len(chromosome.roster_changes) > 1:
@@ -176,7 +194,10 @@ def do_run(week=5, league_id='403.l.41177', population_size=500):
     gea.addMutationHandler(mutate, 2, add_selector, drop_selector, valid_roster_change_dates, league_scoring_categories)
     # & (projected_stats.status != "IR")
     all_players = projected_stats[(projected_stats.position_type == "P") ].loc[:,rostering_columns]
-    gea.setFitnessHandler(fitness, all_players, date_range, league_scoring_categories, game_week.score_comparer, team_key, game_week.opponent.scores()[league_scoring_categories].sum().to_dict(), scoring)
+    # scores of the change sets seen most recently, kept across generations and continue_evolve
+    fitness_memo = FitnessMemo()
+    gea.setFitnessHandler(fitness, all_players, date_range, league_scoring_categories, game_week.score_comparer, team_key, game_week.opponent.scores()[league_scoring_categories].sum().to_dict(), scoring, None, fitness_memo,
+                         ProjectionTable(all_players))
     gea.setSelectionHandler(Utils.SelectionHandlers.best)
 
 
@@ -5,8 +5,6 @@ import json
 import datetime
 import pandas as pd 
 
-from csh_fantasy_bot.league import FantasyLeague
-
 @pytest.fixture
 def season_start_date():
     """Hardcode season start date."""
@@ -21,6 +19,8 @@ def all_players_df():
 @pytest.fixture
 def league(mocker, all_players_df, default_player_scoring_stats):
     """League object."""
+    from csh_fantasy_bot.league import FantasyLeague
+
     league =  FantasyLeague('396.l.53432')
     # mock the yahoo web endpoint by using files
     yhandler_mock = mocker.MagicMock()
@@ -58,4 +58,74 @@ def default_player_scoring_stats():
 @pytest.fixture
 def scoring_weights(default_player_scoring_stats):
     """Weighting for each stat used for determining overall quality of player."""
-    return pd.Series([1, .75, 1, .5, 1, .1, 1], index=default_player_scoring_stats)
\ No newline at end of file
+    return pd.Series([1, .75, 1, .5, 1, .1, 1], index=default_player_scoring_stats)
+
+
+class ScheduleScraper:
+    """Scraper with the games of the days given, counting its requests."""
+
+    def __init__(self, days, teams_playing):
+        self.ea = self
+        self.days = days
+        self.teams_playing = teams_playing
+        self.calls = 0
+
+    def get(self, api):
+        self.calls += 1
+        return {'dates': [{'date': f"{day:%Y-%m-%d}", 'games': [{'teams': {'home': {'team': {'id': team}}}} for team in self.teams_playing(day)]}
+                          for day in self.days]}
+
+
+@pytest.fixture
+def nhl_schedule(monkeypatch, tmp_path):
+    """Make an NhlSchedule from March 1st 2021 to end, with the teams teams_playing(day) returns playing each day.
+
+    The schedule is patched in as the nhl_schedule of the modules given, its scraper counts the requests made.
+    """
+    from csh_fantasy_bot.schedule import NhlSchedule
+
+    def make_schedule(end, teams_playing, *modules):
+        days = pd.date_range('2021-03-01', end)
+        schedule = NhlSchedule(days[0].date(), days[-1].date(), cache_dir=str(tmp_path), scraper=ScheduleScraper(days, teams_playing))
+        for module in modules:
+            monkeypatch.setattr(module, 'nhl_schedule', lambda game_day: schedule)
+        return schedule
+    return make_schedule
+
+
+class Redis:
+    """Just the connection of a RedisClient, held in a dict, counting the values set and recording their expiry."""
+
+    def __init__(self):
+        self.conn = self
+        self.values = {}
+        self.sets = 0
+        self.expiries = {}
+
+    def get(self, key):
+        return self.values.get(key)
+
+    def set(self, key, value, ex=None):
+        self.sets += 1
+        self.values[key] = value
+        self.expiries[key] = ex
+
+
+class DownRedis:
+    """A RedisClient that can't connect."""
+
+    @property
+    def conn(self):
+        raise ConnectionError("Error 111 connecting to localhost:6379. Connection refused.")
+
+
+@pytest.fixture
+def fake_redis():
+    """Redis held in process, to share between stores standing in for the driver and its workers."""
+    return Redis()
+
+
+@pytest.fixture
+def down_redis():
+    """Redis that can't be reached."""
+    return DownRedis()
@@ -47,3 +47,17 @@ def test_get_waivers(league):
 def get_team_roster(league):
     """Return team roster at given date."""
     pass
+
+def test_category_league_has_no_stat_modifiers(league):
+    """Head to head categories aren't worth points, so they are scored with the MILP."""
+    assert(league.stat_modifiers() is None)
+
+def test_points_league_stat_modifiers(league):
+    """Each category is worth the points of its stat modifier, those without one are worth nothing."""
+    settings = league.yhandler.get_settings_raw.return_value
+    settings['fantasy_content']['league'][1]['settings'][0]['stat_modifiers'] = {
+        'stats': [{'stat': {'stat_id': 1, 'value': '3'}}, {'stat': {'stat_id': 2, 'value': '2'}}]}
+    stat_modifiers = league.stat_modifiers()
+    assert(stat_modifiers['G'] == 3.0)
+    assert(stat_modifiers['A'] == 2.0)
+    assert(stat_modifiers['+/-'] == 0.0)
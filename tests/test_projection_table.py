@@ -0,0 +1,26 @@
+"""Tests."""
+import pandas as pd
+
+from csh_fantasy_bot.projection_table import ProjectionTable
+
+
+def projection_table(goals=2.0):
+    """Centers 20 and 21."""
+    return ProjectionTable(pd.DataFrame({'team_id': [1, 1], 'eligible_positions': [['C'], ['C']], 'fpts': [3.0, 3.0], 'G': [goals, 2.0],
+                                         'A': [0.0, 0.0]}, index=pd.Index([20, 21], name='player_id')))
+
+
+def test_version_is_a_digest_of_the_projections():
+    assert projection_table().version == projection_table().version
+    assert projection_table(goals=3.0).version != projection_table().version
+    # eligible positions serialized by jsonpickle are the same table
+    serialized = projection_table().projections.assign(eligible_positions=["['C']", "['C']"])
+    assert ProjectionTable(serialized).version == projection_table().version
+
+
+def test_added_players_once_each():
+    from csh_fantasy_bot.roster_change_optimizer import RosterChange, RosterChangeSet
+
+    change_sets = [RosterChangeSet([RosterChange(10, 21, None)]), None, RosterChangeSet([RosterChange(11, 20, None), RosterChange(10, 21, None)])]
+    assert projection_table().added_players(change_sets).index.tolist() == [21, 20]
+    assert projection_table().added_players(change_sets).eligible_positions.tolist() == [['C'], ['C']]
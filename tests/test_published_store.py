@@ -0,0 +1,26 @@
+"""Tests."""
+import pytest
+
+from csh_fantasy_bot.published_store import PublishedStore
+
+
+def test_published_in_driver_loaded_in_worker(fake_redis):
+    driver = PublishedStore('projection-table', redis=fake_redis)
+    table = {'version': 'a', 'rows': [1, 2]}
+    driver.publish('a', table)
+    driver.publish('a', table)
+    assert fake_redis.sets == 1
+
+    # a worker has its own store, it fetches the value from redis once then keeps it
+    worker = PublishedStore('projection-table', redis=fake_redis)
+    loaded = worker.load('a')
+    assert loaded == table
+    assert worker.load('a') is loaded
+    assert len(worker) == 1
+    with pytest.raises(KeyError):
+        worker.load('unpublished')
+
+
+def test_publish_fails_without_redis(down_redis):
+    with pytest.raises(RuntimeError):
+        PublishedStore('projection-table', redis=down_redis).publish('a', {'version': 'a'})
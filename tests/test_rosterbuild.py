@@ -109,3 +109,167 @@ def test_single_lw_rw(build_roster, team):
 
     best_roster = list(build_roster(day1_roster.itertuples()))
     assert(best_roster[0] == RosteredPlayer("LW" ,1 ,5698))
+
+
+def test_all_players_started_when_chain_of_moves_needed():
+    """Fitting the C requires moving the C/LW to LW and the LW/RW to RW."""
+    from csh_fantasy_bot.roster import AssignmentRosterBuilder
+
+    builder = AssignmentRosterBuilder(pd.Index(["C", "LW", "RW"]))
+    players = pd.DataFrame({'eligible_positions': [['C', 'LW'], ['LW', 'RW'], ['C']]}, index=[1, 2, 3])
+
+    best_roster = list(builder.find_best(players.itertuples()))
+    assert len(best_roster) == 3
+    assert {(p.position, p.player_id) for p in best_roster} == {("LW", 1), ("RW", 2), ("C", 3)}
+
+
+def test_fpts_used_to_choose_starters():
+    from csh_fantasy_bot.roster import AssignmentRosterBuilder
+
+    builder = AssignmentRosterBuilder({"C": 1, "D": 1})
+    players = pd.DataFrame({'eligible_positions': [['C'], ['C'], ['D']],
+                            'fpts': [1.0, 5.0, np.nan]}, index=[1, 2, 3])
+
+    best_roster = list(builder.find_best(players.itertuples()))
+    assert best_roster == [RosteredPlayer("C", 1, 2), RosteredPlayer("D", 1, 3)]
+
+
+def test_batched_games_played_matches_assignment():
+    """Batched lineups start the same number of players, with the same fpts, as solving each day."""
+    from csh_fantasy_bot.roster import AssignmentRosterBuilder
+
+    builder = AssignmentRosterBuilder()
+    rng = np.random.default_rng(42)
+    num_teams, num_players, num_days = 6, 16, 7
+    eligible = rng.random((num_teams, num_players, len(builder.positions))) < .35
+    weights = rng.normal(size=(num_teams, num_players))
+    available = rng.random((num_teams, num_players, num_days)) < .6
+
+    games_played = builder.games_played(available, eligible, weights)
+    for team in range(num_teams):
+        for day in range(num_days):
+            playing = np.flatnonzero(available[team, :, day])
+            assigned_slots = builder.solve(eligible[team, playing], weights[team, playing])
+            expected = playing[assigned_slots >= 0]
+            started = np.flatnonzero(games_played[team, :, day])
+            assert len(started) == len(expected)
+            assert weights[team, started].sum() == pytest.approx(weights[team, expected].sum())
+
+
+def test_swap_games_played_matches_full_solve():
+    """Updating lineups for a dropped and an added player gives the same lineups as solving again."""
+    from csh_fantasy_bot.roster import AssignmentRosterBuilder
+
+    builder = AssignmentRosterBuilder()
+    rng = np.random.default_rng(7)
+    num_players, num_days = 16, 7
+    for _ in range(50):
+        eligible = rng.random((num_players, len(builder.positions))) < .35
+        weights = rng.normal(size=num_players)
+        available = rng.random((num_players, num_days)) < .6
+        out_player, in_player = rng.choice(num_players, 2, replace=False)
+
+        before = available.copy()
+        before[in_player] = False
+        after = available.copy()
+        after[out_player] = False
+        expected = builder.games_played(after, eligible, weights)
+        swapped = builder.swap_games_played(builder.games_played(before, eligible, weights), available, eligible, weights, out_player, in_player)
+        assert not swapped[out_player].any()
+        assert (swapped.sum(axis=0) == expected.sum(axis=0)).all()
+        assert weights @ swapped == pytest.approx(weights @ expected)
+
+
+def test_games_played_with_changes():
+    """Players added only start from their change, players dropped don't start after theirs."""
+    from csh_fantasy_bot.roster import AssignmentRosterBuilder
+
+    builder = AssignmentRosterBuilder(pd.Index(['C', 'D']))
+    eligible = np.array([[True, False], [True, False], [False, True]])
+    available = np.ones((3, 4), dtype=bool)
+    # player 1 replaces player 0 at the third day
+    games_played = builder.games_played_with_changes(available, eligible, [1.0, 5.0, 2.0], [(2, 0, 1)])
+    assert games_played.tolist() == [[True, True, False, False],
+                                     [False, False, True, True],
+                                     [True, True, True, True]]
+
+
+def test_lineup_cache_hits_on_same_players(team):
+    from csh_fantasy_bot.roster import LineupCache, best_roster
+
+    cache = LineupCache(maxsize=1)
+    day1 = team.loc[[5462, 5984, 3982], :]
+    day2 = team.loc[[3982, 5462, 5984], :]
+    day3 = team.loc[[5698], :]
+
+    lineup = cache.find_best(day1.loc[:, ['eligible_positions']].assign(fpts=[3, 2, 1]).itertuples())
+    assert list(lineup) == list(best_roster(day1.loc[:, ['eligible_positions']].assign(fpts=[3, 2, 1]).itertuples()))
+    assert cache.find_best(day2.loc[:, ['eligible_positions']].assign(fpts=[1, 3, 2]).itertuples()) == lineup
+    cache.find_best(day3.itertuples())
+    cache.find_best(day1.loc[:, ['eligible_positions']].assign(fpts=[3, 2, 1]).itertuples())
+
+    assert cache.cache_info() == (1, 3, 1, 1)
+
+
+def test_lineup_cache_misses_on_changed_eligibility(team):
+    from csh_fantasy_bot.roster import LineupCache
+
+    cache = LineupCache()
+    day = team.loc[[5462, 5984, 3982], ['eligible_positions']].assign(fpts=[3, 2, 1])
+    cache.find_best(day.itertuples())
+    day['eligible_positions'] = [['D'], ['D'], ['D']]
+    lineup = cache.find_best(day.itertuples())
+
+    assert cache.cache_info().misses == 2
+    assert {rostered.position for rostered in lineup} == {'D'}
+
+
+def test_roster_players_position_masks(team):
+    from csh_fantasy_bot.roster import RosterPlayers, best_roster
+
+    players = RosterPlayers.from_frame(team.loc[[5462, 5984, 5698]], ["C", "LW", "RW", "D"])
+    assert players.masks.tolist() == [0b1, 0b101, 0b110]
+    assert players.eligibility(["RW", "C"]).tolist() == [[False, True], [True, True], [True, False]]
+    assert [p.Index for p in players.sorted()] == [5462, 5984, 5698]
+
+    best_roster = list(best_roster(players))
+    assert best_roster[0] == RosteredPlayer("C", 1, 5462)
+    assert len(best_roster) == 3
+
+
+def test_fitter_augmenting_path_and_undo():
+    from csh_fantasy_bot.roster import RosterFitter
+
+    fitter = RosterFitter({"C": 1, "LW": 1, "RW": 1})
+    # C/LW and LW/RW have to shift over to make room for the C
+    assert fitter.insert('c_lw', 0b011)
+    assert fitter.insert('lw_rw', 0b110)
+    assert not fitter.has_empty_slot("C")
+    assert fitter.insert('c', 0b001)
+    assert (fitter.position_of('c'), fitter.position_of('c_lw'), fitter.position_of('lw_rw')) == ("C", "LW", "RW")
+    assert not fitter.insert('another_c', 0b001)
+
+    fitter.undo()
+    assert fitter.position_of('c') is None
+    assert (fitter.position_of('c_lw'), fitter.position_of('lw_rw')) == ("C", "LW")
+    assert fitter.has_empty_slot("RW")
+
+
+def test_builder_fit_if_space(team):
+    from csh_fantasy_bot.roster import Builder
+
+    builder = Builder(["C", "LW", "RW"])
+    roster = []
+    for player_id in [5363, 5698, 3982]:
+        player = team.loc[player_id].copy()
+        player['selected_position'] = np.nan
+        roster = builder.fit_if_space(roster, player)
+
+    assert [p.selected_position for p in roster] == ["LW", "RW", "C"]
+    with pytest.raises(LookupError):
+        builder.fit_if_space(roster, team.loc[4471].copy())
+
+    fits = list(builder.enumerate_fit(roster, team.loc[4471].copy()))
+    assert len(fits) == 3
+    assert all(len(fit) == 3 and 4471 in [p.name for p in fit] for fit in fits)
+    assert [p.selected_position for p in roster] == ["LW", "RW", "C"]
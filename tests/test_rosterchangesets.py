@@ -40,4 +40,19 @@ def test_get_by_date(a_change_date):
     change_set.add(234,1,a_change_date + timedelta(days=1))
 
     assert (len(change_set) == 3)
-    assert (len(change_set.get(a_change_date)) == 2)
\ No newline at end of file
+    assert (len(change_set.get(a_change_date)) == 2)
+
+def test_equal_change_sets_hash_alike(a_change_date):
+    """Order of the changes, and the type of the change date, don't matter."""
+    from csh_fantasy_bot.roster_change_optimizer import RosterChange
+
+    first = RosterChange(34, 44, a_change_date)
+    second = RosterChange(35, 45, a_change_date + timedelta(days=1))
+    change_set = RosterChangeSet([first, second])
+    reordered = RosterChangeSet([second._replace(change_date=pd.Timestamp(second.change_date)), first._replace(change_date=a_change_date.date())])
+    assert change_set == reordered
+    assert len({change_set, reordered}) == 1
+    assert change_set != RosterChangeSet([first])
+
+    del reordered[0]
+    assert reordered == RosterChangeSet([first])
@@ -0,0 +1,46 @@
+"""Tests."""
+import datetime
+
+import pandas as pd
+import numpy as np
+import pytest
+
+from csh_fantasy_bot.schedule import NhlSchedule, season_bounds
+
+
+@pytest.fixture
+def schedule(nhl_schedule):
+    """Schedule for the first ten days of March, team 1 plays every other day and team 2 on the 2nd."""
+    return nhl_schedule('2021-03-10', lambda day: [1] * (day.day % 2) + [2] * (day.day == 2))
+
+
+def test_season_bounds():
+    assert season_bounds(datetime.date(2021, 3, 1)) == (datetime.date(2020, 9, 1), datetime.date(2021, 8, 31))
+    assert season_bounds(datetime.datetime(2021, 10, 12, 19)) == (datetime.date(2021, 9, 1), datetime.date(2022, 8, 31))
+
+
+def test_season_fetched_in_one_request(schedule):
+    assert schedule.scraper.calls == 1
+
+
+def test_lookups(schedule):
+    assert schedule.teams_playing(datetime.date(2021, 3, 1)).tolist() == [1]
+    assert schedule.teams_playing(pd.Timestamp('2021-03-02')).tolist() == [2]
+    assert schedule.teams_playing(datetime.date(2021, 4, 1)).tolist() == []
+    assert schedule.games_count(datetime.date(2021, 3, 1), datetime.date(2021, 3, 4)) == {1: 2, 2: 1}
+    assert schedule.team_games(1, datetime.date(2021, 3, 1), datetime.date(2021, 3, 10)) == 5
+    assert schedule.remaining_games(1, datetime.date(2021, 3, 6)) == 2
+    assert schedule.remaining_games(3, datetime.date(2021, 3, 6)) == 0
+
+
+def test_schedule_matrix(schedule):
+    game_days = pd.date_range('2021-02-28', periods=4)
+    matrix = schedule.schedule_matrix([1, 2, np.nan], game_days)
+    assert matrix.tolist() == [[False, True, False, True], [False, False, True, False], [False, False, False, False]]
+
+
+def test_schedule_persisted(tmp_path, schedule):
+    calls = schedule.scraper.calls
+    reloaded = NhlSchedule(datetime.date(2021, 3, 1), datetime.date(2021, 3, 10), cache_dir=str(tmp_path), scraper=schedule.scraper)
+    assert schedule.scraper.calls == calls
+    assert (reloaded.games == schedule.games).all()
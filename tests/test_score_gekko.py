@@ -0,0 +1,130 @@
+"""Tests."""
+import datetime
+
+import numpy as np
+import pytest
+from scipy.sparse import csr_matrix
+
+
+@pytest.fixture
+def problem():
+    """One day, one slot, two players: the fpts pick helps goals but goals are already won."""
+    from csh_fantasy_bot.score_gekko import LineupProblem
+
+    return LineupProblem(variables=[(0, 'C', 1), (0, 'C', 2)],
+                         rewards=np.array([[3.0, 0.0], [0.0, 2.0]]),
+                         margins=np.array([10.0, -1.0]),
+                         constraints=csr_matrix(np.array([[1.0, 1.0]])),
+                         limits=np.array([1.0]),
+                         initial=np.array([1, 0]))
+
+
+def test_highs_backend_improves_on_initial(problem):
+    from csh_fantasy_bot.score_gekko import HighsBackend, _objective
+
+    x = HighsBackend().solve(problem)
+    assert x.tolist() == [0, 1]
+    assert _objective(problem, x) > _objective(problem, problem.initial)
+    assert (problem.constraints @ x <= problem.limits).all()
+    assert backend_solved_by(HighsBackend, problem) == 'highs'
+
+
+def backend_solved_by(backend_class, problem, **kwargs):
+    backend = backend_class(**kwargs)
+    backend.solve(problem)
+    return backend.solved_by
+
+
+def test_out_of_time_uses_fpts_lineups(problem):
+    from csh_fantasy_bot.score_gekko import GREEDY, HighsBackend
+
+    backend = HighsBackend(time_limit=0)
+    assert backend.solve(problem).tolist() == problem.initial.tolist()
+    assert backend.solved_by == GREEDY
+
+
+@pytest.mark.parametrize('breakpoints', [3, 9])
+def test_piecewise_linear_backend(problem, breakpoints):
+    from csh_fantasy_bot.score_gekko import HighsBackend, PiecewiseLinearBackend
+
+    assert PiecewiseLinearBackend(breakpoints=breakpoints).solve(problem).tolist() == [0, 1]
+    polished = PiecewiseLinearBackend(breakpoints=breakpoints, polish=HighsBackend())
+    assert polished.solve(problem).tolist() == [0, 1]
+    assert polished.solved_by == 'piecewise'
+
+
+class ChangeSet:
+    """Just the roster changes of a RosterChangeSet."""
+
+    def __init__(self, roster_changes):
+        self.roster_changes = roster_changes
+
+
+@pytest.fixture
+def week_model(nhl_schedule):
+    """Week model for three days, a center and a defenceman with a center to add.
+
+    Team 1 plays every day and team 2 on the first two days.
+    """
+    import pandas as pd
+    from csh_fantasy_bot import score_gekko
+
+    nhl_schedule('2021-03-03', lambda day: [1, 2] if day.day <= 2 else [1], score_gekko)
+    roster = pd.DataFrame({'team_id': [1, 2], 'eligible_positions': [['C'], ['D']], 'fpts': [1.0, 2.0],
+                           'G': [1.0, 0.0], 'A': [0.0, 1.0]}, index=pd.Index([10, 11], name='player_id'))
+    candidates = pd.DataFrame({'team_id': [1], 'eligible_positions': [['C']], 'fpts': [3.0], 'G': [2.0], 'A': [0.0]},
+                              index=pd.Index([20], name='player_id'))
+    return score_gekko.WeekModel(roster, {'G': 5.0, 'A': 5.0}, ['G', 'A'], pd.date_range('2021-03-01', periods=3),
+                                 {'C': 1, 'D': 1}, candidates=candidates)
+
+
+def test_week_model_bounds_players_off_roster(week_model):
+    from csh_fantasy_bot.roster_change_optimizer import RosterChange
+
+    problem = week_model.problem()
+    starters = {variable for variable, upper in zip(problem.variables, problem.upper) if upper}
+    assert starters == {(0, 'C', 10), (0, 'D', 11), (1, 'C', 10), (1, 'D', 11), (2, 'C', 10)}
+    assert (problem.initial <= problem.upper).all()
+
+    changes = ChangeSet([RosterChange(10, 20, datetime.date(2021, 3, 2))])
+    assert week_model.covers(changes)
+    problem = week_model.problem(changes)
+    assert [variable for variable, initial in zip(problem.variables, problem.initial) if initial and variable[1] == 'C'] == \
+        [(0, 'C', 10), (1, 'C', 20), (2, 'C', 20)]
+    assert week_model.problem().variables is problem.variables
+
+
+def test_week_model_score(week_model):
+    from csh_fantasy_bot.roster_change_optimizer import RosterChange
+    from csh_fantasy_bot.score_gekko import GREEDY, HighsBackend
+
+    changes = ChangeSet([RosterChange(10, 20, datetime.date(2021, 3, 2))])
+    results = week_model.score(changes, backend=HighsBackend())
+    assert results.groupby('player_id').size().to_dict() == {10: 1, 11: 2, 20: 2}
+    assert results[['G', 'A']].sum().to_dict() == {'G': 5.0, 'A': 2.0}
+    # the fpts lineups are best, the solver doesn't improve them
+    assert (results.lineup_solver == GREEDY).all()
+    assert not week_model.covers(ChangeSet([RosterChange(10, 21, datetime.date(2021, 3, 2))]))
+
+
+def test_week_model_chooses_roster_changes(week_model):
+    import pandas as pd
+    from csh_fantasy_bot.score_gekko import HighsBackend
+
+    change_dates = pd.date_range('2021-03-02', periods=2)
+    roster_change_set, results = week_model.best_roster_changes([10], change_dates, 1, backend=HighsBackend())
+    assert [(rc.out_player_id, rc.in_player_id, rc.change_date) for rc in roster_change_set.roster_changes] == \
+        [(10, 20, datetime.date(2021, 3, 2))]
+    assert results[['G', 'A']].sum().to_dict() == {'G': 5.0, 'A': 2.0}
+
+    roster_change_set, results = week_model.best_roster_changes([10], change_dates, 0, backend=HighsBackend())
+    assert len(roster_change_set) == 0
+    assert results[['G', 'A']].sum().to_dict() == {'G': 3.0, 'A': 2.0}
+
+
+def test_roster_changes_default_to_the_milp_backend(week_model):
+    import pandas as pd
+
+    roster_change_set, results = week_model.best_roster_changes([10], pd.date_range('2021-03-02', periods=2), 1)
+    assert [(rc.out_player_id, rc.in_player_id) for rc in roster_change_set.roster_changes] == [(10, 20)]
+    assert results.lineup_solver.iloc[0].startswith('piecewise')
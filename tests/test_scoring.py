@@ -18,4 +18,121 @@ def test_scoring_function(league: FantasyLeague, scoring_weights):
     projected_stats['fpts'] = projected_stats.loc[projected_stats.G == projected_stats.G,scoring_weights.index.tolist()].mul(scoring_weights).sum(1)
 
     results = score_team(projected_stats, date_range, tracked_stats)
-    pass
\ No newline at end of file
+    pass
+
+def test_score_many_matches_score():
+    """Batch scores are the score summary rows summed over categories."""
+    import numpy as np
+    from csh_fantasy_bot.scoring import ScoreComparer
+
+    league_lineups = [pd.DataFrame({'G': [1.0, 2.0], 'A': [3.0, 1.0]}), pd.DataFrame({'G': [4.0, 0.0], 'A': [2.0, 2.0]}),
+                      pd.DataFrame({'G': [0.0, 1.0], 'A': [1.0, 0.0]})]
+    score_comparer = ScoreComparer(league_lineups, ['G', 'A'])
+    opponent = {'G': 3.0, 'A': 4.0}
+    candidates = [pd.DataFrame({'G': [1.0, 2.0], 'A': [0.5, 3.0]}), pd.DataFrame({'G': [5.0, 1.0], 'A': [0.0, 0.0]})]
+    team_totals = np.array([candidate.sum().to_numpy() for candidate in candidates])
+    for score_type in ['score_opp', 'score_league']:
+        expected = [score_comparer.score(candidate, opponent).loc[score_type].sum() for candidate in candidates]
+        assert np.allclose(score_comparer.score_many(team_totals, opponent, score_type), expected, atol=2e-3)
+
+
+def test_league_statistics_updated_in_place():
+    """Replacing a team's lineup gives the statistics of aggregating every team again."""
+    import numpy as np
+    from csh_fantasy_bot.scoring import ScoreComparer
+
+    rng = np.random.default_rng(0)
+    lineups = {team: pd.DataFrame(rng.random((4, 2)) * 5, columns=['G', 'A']) for team in range(6)}
+    score_comparer = ScoreComparer(lineups, ['G', 'A'])
+    for team in [2, 5, 2]:
+        lineups[team] = pd.DataFrame(rng.random((4, 2)) * 5, columns=['G', 'A'])
+        score_comparer.update_team(team, lineups[team])
+
+    team_totals = pd.DataFrame([lineup.sum() for lineup in lineups.values()])
+    assert np.allclose(score_comparer.league_means, team_totals.mean())
+    assert np.allclose(score_comparer.stdevs, team_totals.std())
+
+    score_comparer.remove_team(5)
+    assert np.allclose(score_comparer.stdevs, team_totals.drop(index=5).std())
+
+
+def test_team_added_again_replaces_its_lineup():
+    """Adding a team that is already in the league statistics doesn't count it twice."""
+    import numpy as np
+    from csh_fantasy_bot.scoring import ScoreComparer
+
+    lineups = {team: pd.DataFrame({'G': [float(team), 1.0], 'A': [2.0, float(team)]}) for team in range(4)}
+    score_comparer = ScoreComparer(lineups, ['G', 'A'])
+    lineups[1] = pd.DataFrame({'G': [6.0, 1.0], 'A': [0.0, 3.0]})
+    score_comparer.add_team(1, lineups[1])
+
+    team_totals = pd.DataFrame([lineup.sum() for lineup in lineups.values()])
+    assert np.allclose(score_comparer.league_means, team_totals.mean())
+    assert np.allclose(score_comparer.stdevs, team_totals.std())
+
+
+def test_win_probability_scoring():
+    """Category win probabilities from the variance of each player's games."""
+    import numpy as np
+    from csh_fantasy_bot.scoring import ScoreComparer, per_game_variances
+
+    box_scores = pd.DataFrame({'player_id': [1, 1, 1, 2], 'G': [0.0, 1.0, 2.0, 1.0], 'A': [1.0, 1.0, 1.0, 0.0]})
+    score_comparer = ScoreComparer([pd.DataFrame({'G': [1.0], 'A': [1.0]}), pd.DataFrame({'G': [2.0], 'A': [0.0]})], ['G', 'A'])
+    score_comparer.player_variances = per_game_variances(box_scores, ['G', 'A'], min_games=2)
+    assert score_comparer.player_variances.index.tolist() == [1]
+
+    # player 1 has known variances, player 2 is Poisson and the actual game is known
+    lineup = pd.DataFrame({'player_id': [1, 1, 2, 2], 'score_type': ['p', 'p', 'p', 'a'],
+                           'G': [1.0, 1.0, 0.5, 1.0], 'A': [1.0, 1.0, 0.25, 3.0]})
+    assert score_comparer.lineup_variances(lineup).tolist() == [2.5, 0.25]
+
+    probabilities = score_comparer.win_probabilities([[3.5, 5.25]], [[2.5, 0.0]], {'G': 3.5, 'A': 4.0}, [1.5, 0.0])
+    assert probabilities.tolist() == [[0.5, 1.0]]
+    rng = np.random.default_rng(0)
+    simulated = (rng.normal(4.0, np.sqrt(2.5), 100000) > rng.normal(3.0, np.sqrt(1.5), 100000)).mean()
+    score_comparer.opp_variances = [1.5, 0.0]
+    win_probability = score_comparer.score_many([[4.0, 0.0]], {'G': 3.0, 'A': 1.0}, 'win_probability', [[2.5, 0.0]])
+    assert np.allclose(win_probability, simulated, atol=0.01)
+
+
+def test_matchup_simulator():
+    """Simulated outcomes are reproducible, and known scores decide categories."""
+    import numpy as np
+    from csh_fantasy_bot.scoring import MatchupSimulator
+
+    index = pd.MultiIndex.from_product([pd.date_range('2021-03-01', periods=3), [1, 2]], names=['play_date', 'player_id'])
+    team = pd.DataFrame({'score_type': 'p', 'G': 0.5, 'SOG': 3.0, '+/-': 0.2}, index=index)
+    # the opponent has played, it only has actual scores
+    opponent = pd.DataFrame({'player_id': [3], 'score_type': ['a'], 'G': [3.0], 'SOG': [0.0], '+/-': [0.0]})
+    player_variances = pd.DataFrame({'G': [1.0], 'SOG': [3.0], '+/-': [1.0]}, index=pd.Index([1], name='player_id'))
+    simulator = MatchupSimulator(['G', 'SOG', '+/-'], player_variances, seed=1)
+
+    results = simulator.simulate(team, opponent, num_simulations=200000)
+    assert results.equals(simulator.simulate(team, opponent, num_simulations=200000))
+    assert np.allclose(results.sum(), 1)
+    assert results.at['win', 'SOG'] == 1
+    assert results.at['tie', '+/-'] == 0
+    # player 1's games are negative binomial, player 2's Poisson, P(more than 3 goals) from the convolution
+    assert np.isclose(results.at['win', 'G'], 0.3412, atol=0.005)
+    # normal with mean 1.2 and variance 3 * 1.0 + 3 * 0.2
+    assert np.isclose(results.at['win', '+/-'], 0.7365, atol=0.005)
+
+
+def test_player_variances_reach_lineup_variances():
+    """Variances from NHL box scores are matched to yahoo players and used for their games."""
+    from csh_fantasy_bot.scoring import ScoreComparer, per_game_variances, yahoo_player_variances
+
+    box_scores = pd.DataFrame({'player_id': [8478402] * 3 + [8471214] * 3, 'G': [0.0, 1.0, 2.0, 0.0, 0.0, 3.0],
+                               'A': [1.0, 1.0, 1.0, 0.0, 1.0, 2.0]})
+    nhl_variances = per_game_variances(box_scores, ['G', 'A'], min_games=2).join(
+        pd.DataFrame({'player_name': ['Connor McDavid', 'Alex Ovechkin'], 'team_id': [22, 15]}, index=[8478402, 8471214]))
+    # ovechkin's team changed since his last game, he is matched on his name alone
+    players = pd.DataFrame({'name': ['Connor McDavid', 'Alex Ovechkin', 'Sebastian Aho'], 'team_id': [22, 12, 12]},
+                           index=pd.Index([6743, 3637, 6726], name='player_id'))
+    player_variances = yahoo_player_variances(nhl_variances, players)
+    assert player_variances.to_dict('index') == {6743: {'G': 1.0, 'A': 0.0}, 3637: {'G': 3.0, 'A': 1.0}}
+
+    score_comparer = ScoreComparer([pd.DataFrame({'G': [1.0], 'A': [1.0]}), pd.DataFrame({'G': [2.0], 'A': [0.0]})], ['G', 'A'])
+    score_comparer.player_variances = player_variances
+    lineup = pd.DataFrame({'player_id': [6743, 3637, 6726], 'G': [1.0, 1.0, 0.5], 'A': [1.0, 1.0, 0.25]})
+    assert score_comparer.lineup_variances(lineup).tolist() == [4.5, 1.25]
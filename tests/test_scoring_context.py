@@ -0,0 +1,52 @@
+"""Tests."""
+import pandas as pd
+import pytest
+
+from csh_fantasy_bot import scoring_context
+from csh_fantasy_bot.projection_table import ProjectionTable
+from csh_fantasy_bot.published_store import PublishedStore
+
+
+@pytest.fixture
+def context():
+    """Context of a week for a center and a defenceman, with a center to add."""
+    def context(opponent_scores=None):
+        roster = pd.DataFrame({'team_id': [1, 2], 'eligible_positions': [['C'], ['D']], 'fpts': [1.0, 2.0], 'G': [1.0, 0.0]},
+                              index=pd.Index([10, 11], name='player_id'))
+        table = ProjectionTable(pd.DataFrame({'team_id': [1], 'eligible_positions': [['C']], 'fpts': [3.0], 'G': [2.0]},
+                                             index=pd.Index([20], name='player_id')))
+        return scoring_context.ScoringContext(roster, pd.date_range('2021-03-01', periods=3), ['G'], '403.l.1.t.2',
+                                              opponent_scores or {'G': 5.0}, table)
+    return context
+
+
+def test_key_is_a_digest_of_the_content(context):
+    assert context().key == context().key
+    assert context(opponent_scores={'G': 6.0}).key != context().key
+
+
+def test_workers_load_published_context(monkeypatch, context, fake_redis):
+    monkeypatch.setattr(scoring_context, 'scoring_contexts', PublishedStore('scoring-context', redis=fake_redis))
+    key = scoring_context.publish_scoring_context(context())
+    assert len(fake_redis.values) == 1
+
+    # a worker has its own store, it fetches the context from redis once then keeps it
+    worker_contexts = PublishedStore('scoring-context', redis=fake_redis)
+    monkeypatch.setattr(scoring_context, 'scoring_contexts', worker_contexts)
+    loaded = scoring_context.load_scoring_context(key)
+    assert loaded.roster.equals(context().roster)
+    assert scoring_context.load_scoring_context(key) is loaded
+    assert len(worker_contexts) == 1
+    with pytest.raises(KeyError):
+        scoring_context.load_scoring_context('unpublished')
+
+
+def test_published_to_redis_with_file_cache_backing(monkeypatch, context, fake_redis):
+    """With the default cache backing contexts still go to redis, workers can't see the driver's memory."""
+    from csh_fantasy_bot import config, redis
+
+    assert config.CACHE_BACKING == config.CacheBacking.file
+    monkeypatch.setattr(redis, 'RedisClient', lambda: fake_redis)
+    monkeypatch.setattr(scoring_context.scoring_contexts, '_redis', None)
+    key = scoring_context.publish_scoring_context(context())
+    assert list(fake_redis.values) == [f'scoring-context-{key}']
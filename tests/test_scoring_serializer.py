@@ -0,0 +1,43 @@
+"""Tests."""
+import datetime
+
+import pandas as pd
+import pytest
+
+from csh_fantasy_bot.roster_change_optimizer import RosterChange, RosterChangeSet
+from csh_fantasy_bot.scoring_serializer import dumps, loads
+
+
+@pytest.fixture
+def roster():
+    """A center and a defenceman."""
+    return pd.DataFrame({'team_id': [1, 2], 'eligible_positions': [['C'], ['C', 'D']], 'fpts': [1.0, 2.5],
+                         'G': [1.0, float('nan')]}, index=pd.Index([10, 11], name='player_id'))
+
+
+@pytest.fixture
+def results():
+    """Scoring of two days, indexed by play_date, player_id."""
+    return pd.DataFrame({'play_date': pd.to_datetime(['2021-03-01', '2021-03-02']), 'player_id': [10, 11],
+                         'score_type': ['p', 'p'], 'G': [1.0, 0.5]}).set_index(['play_date', 'player_id'])
+
+
+def test_round_trip(roster, results):
+    change_set = RosterChangeSet([RosterChange(10, 20, datetime.date(2021, 3, 2))], max_allowed=2)
+    change_set._id = 1234
+    args = [roster, pd.Timestamp('2021-03-01'), ['G'], {'G': 5.0}, [change_set, RosterChangeSet()], [(1234, results)]]
+
+    decoded_roster, start_date, categories, opponent_scores, change_sets, scores = loads(dumps(args))
+    pd.testing.assert_frame_equal(decoded_roster, roster)
+    assert start_date == pd.Timestamp('2021-03-01')
+    assert (categories, opponent_scores) == (['G'], {'G': 5.0})
+    assert change_sets == [change_set, RosterChangeSet()]
+    assert change_sets[0]._id == 1234 and change_sets[0].max_allowed_changes == 2
+    assert scores[0][0] == 1234
+    pd.testing.assert_frame_equal(scores[0][1], results)
+
+
+def test_compressed_above_threshold(results):
+    many = pd.concat([results] * 500)
+    assert len(dumps(many, compress_threshold=10 ** 9)) > len(dumps(many, compress_threshold=0))
+    pd.testing.assert_frame_equal(loads(dumps(many, compress_threshold=0)), many)
@@ -0,0 +1,111 @@
+"""Tests."""
+import datetime
+import pickle
+
+import pandas as pd
+import pytest
+
+from csh_fantasy_bot.projection_table import ProjectionTable
+from csh_fantasy_bot.roster_change_optimizer import RosterChange, RosterChangeSet
+from csh_fantasy_bot.score_gekko import GREEDY
+from csh_fantasy_bot.solution_cache import SolutionCache, lineup_fingerprint
+
+
+@pytest.fixture
+def roster():
+    """A center and a defenceman."""
+    return pd.DataFrame({'team_id': [1, 2], 'eligible_positions': [['C'], ['D']], 'fpts': [1.0, 2.0],
+                         'G': [1.0, 0.0], 'A': [0.0, 1.0]}, index=pd.Index([10, 11], name='player_id'))
+
+
+def projection_table(goals=2.0):
+    """Centers 20 and 21 to add."""
+    return ProjectionTable(pd.DataFrame({'team_id': [1, 1], 'eligible_positions': [['C'], ['C']], 'fpts': [3.0, 3.0], 'G': [goals, 2.0],
+                                         'A': [0.0, 0.0]}, index=pd.Index([20, 21], name='player_id')))
+
+
+@pytest.fixture
+def fingerprint(roster):
+    """Fingerprint of the roster's week with a change set and opponent totals."""
+    def fingerprint(roster_changes=(), opponent_scoring=None, table=projection_table()):
+        return lineup_fingerprint(roster, pd.date_range('2021-03-01', periods=3), {'C': 1, 'D': 1}, ['G', 'A'],
+                                  opponent_scoring or {'G': 5.0, 'A': 5.0}, roster_change_set=RosterChangeSet(list(roster_changes)),
+                                  projection_table=table)
+    return fingerprint
+
+
+def test_fingerprint_is_canonical(fingerprint):
+    first = RosterChange(10, 20, datetime.date(2021, 3, 2))
+    second = RosterChange(11, 21, datetime.date(2021, 3, 3))
+    assert fingerprint([first, second]) == fingerprint([second, first])
+    # changes before the period apply from its first day, those after it don't apply
+    assert fingerprint([first._replace(change_date=datetime.date(2021, 2, 20))]) == \
+        fingerprint([first._replace(change_date=datetime.date(2021, 3, 1))])
+    assert fingerprint([first._replace(change_date=datetime.date(2021, 3, 9))]) == fingerprint()
+    assert fingerprint(opponent_scoring={'G': 5.001, 'A': 5.0}) == fingerprint()
+
+    assert fingerprint([first]) != fingerprint()
+    assert fingerprint(opponent_scoring={'G': 6.0, 'A': 5.0}) != fingerprint()
+    assert fingerprint([first], table=projection_table(goals=3.0)) != fingerprint([first])
+
+
+def test_solution_cache():
+    cache = SolutionCache(maxsize=2, ttl=60)
+    solution = pd.DataFrame({'G': [1.0]})
+    assert cache.solve('a', lambda: solution).equals(solution)
+    assert cache.solve('a', lambda: pytest.fail('solved twice')).equals(solution)
+    assert cache.cache_info().hits == 1
+
+    cache.set('b', solution)
+    cache.set('c', solution)
+    assert cache.get('a') is None
+    assert cache.cache_info().currsize == 2
+
+    expired = SolutionCache(ttl=-1)
+    expired.set('a', solution)
+    assert expired.get('a') is None
+
+
+def test_solution_cache_shared_through_redis(fake_redis):
+    solution = pd.DataFrame({'G': [1.0]})
+    SolutionCache(redis=fake_redis).set('a', solution)
+    other_worker = SolutionCache(redis=fake_redis)
+    assert other_worker.solve('a', lambda: pytest.fail('solved twice')).equals(solution)
+
+
+def test_greedy_solutions_kept_briefly(fake_redis):
+    greedy = pd.DataFrame({'G': [1.0], 'lineup_solver': [GREEDY]})
+    solved = pd.DataFrame({'G': [2.0], 'lineup_solver': ['highs']})
+    cache = SolutionCache(ttl=60, greedy_ttl=-1)
+    assert cache.solve('a', lambda: greedy).equals(greedy)
+    assert cache.get('a') is None
+    cache.solve('b', lambda: solved)
+    assert cache.solve('b', lambda: pytest.fail('solved twice')).equals(solved)
+
+    shared = SolutionCache(ttl=3600, greedy_ttl=30, redis=fake_redis)
+    shared.set('a', greedy)
+    shared.set('b', solved)
+    assert fake_redis.expiries == {'lineup-solution-a': 30, 'lineup-solution-b': 3600}
+
+
+def test_solution_cache_without_redis_reachable(down_redis, fake_redis):
+    cache = SolutionCache(redis=down_redis)
+    solution = pd.DataFrame({'G': [1.0]})
+    assert cache.solve('a', lambda: solution).equals(solution)
+    assert cache.solve('a', lambda: pytest.fail('solved twice')).equals(solution)
+
+    # redis isn't tried again until the retry interval has passed
+    cache.redis = fake_redis
+    fake_redis.set('lineup-solution-b', pickle.dumps(solution))
+    assert cache.get('b') is None
+    cache._redis_retry = 0
+    assert cache.get('b').equals(solution)
+
+
+def test_lineups_shared_through_redis_with_any_cache_backing():
+    from csh_fantasy_bot import config
+    from csh_fantasy_bot.redis import RedisClient
+    from csh_fantasy_bot.solution_cache import lineup_solution_cache
+
+    assert config.CACHE_BACKING == config.CacheBacking.file
+    assert isinstance(lineup_solution_cache.redis, RedisClient)
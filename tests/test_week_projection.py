@@ -0,0 +1,136 @@
+"""Tests."""
+import datetime
+
+import pandas as pd
+import numpy as np
+import pytest
+
+from csh_fantasy_bot.roster_change_optimizer import RosterChange
+
+
+class ChangeSet:
+    """Just the roster changes of a RosterChangeSet."""
+
+    def __init__(self, roster_changes):
+        self.roster_changes = roster_changes
+
+
+@pytest.fixture
+def game_days():
+    """Three days, team 1 plays the first two, team 2 the last two."""
+    return pd.date_range('2021-03-01', periods=3)
+
+
+@pytest.fixture
+def week_projection(nhl_schedule):
+    """WeekProjection with the schedule of game_days."""
+    from csh_fantasy_bot import week_projection
+
+    schedule = {1: [1], 2: [1, 2], 3: [2]}
+    nhl_schedule('2021-03-05', lambda day: schedule.get(day.day, []), week_projection)
+    return week_projection
+
+
+@pytest.fixture
+def roster():
+    """Two centers and a defenceman."""
+    return pd.DataFrame({'team_id': [1, 2, 1],
+                         'eligible_positions': [['C'], ['C'], ['D']],
+                         'fpts': [1.0, 2.0, 3.0],
+                         'G': [1.0, 2.0, 0.0],
+                         'A': [0.0, 1.0, 3.0]}, index=pd.Index([10, 11, 12], name='player_id'))
+
+
+def test_category_totals_match_results(week_projection, game_days, roster):
+    projection = week_projection.WeekProjection(roster, game_days, ['G', 'A'])
+    totals = projection.category_totals()
+    assert totals.to_dict() == {'G': 6.0, 'A': 8.0}
+    assert projection.results()[['G', 'A']].sum().to_dict() == totals.to_dict()
+    assert projection.daily_totals().sum().to_dict() == totals.to_dict()
+
+
+@pytest.fixture
+def projection_table():
+    """A defenceman to add."""
+    from csh_fantasy_bot.projection_table import ProjectionTable
+
+    return ProjectionTable(pd.DataFrame({'team_id': [2], 'eligible_positions': [['D']], 'fpts': [5.0], 'G': [0.0], 'A': [4.0]},
+                                        index=pd.Index([13], name='player_id')))
+
+
+def test_roster_change_masks_rows(week_projection, game_days, roster, projection_table):
+    changes = ChangeSet([RosterChange(12, 13, datetime.date(2021, 3, 2))])
+    projection = week_projection.WeekProjection(roster, game_days, ['G', 'A'], changes, projection_table=projection_table)
+
+    results = projection.results()
+    assert results.loc[(game_days[0], 12), 'A'] == 3.0
+    assert (game_days[1], 12) not in results.index
+    assert results.xs(13, level='player_id').index.tolist() == list(game_days[1:])
+    assert projection.category_totals().to_dict() == {'G': 6.0, 'A': 13.0}
+
+
+def test_for_teams_matches_single_team(week_projection, game_days, roster):
+    other = roster.assign(fpts=[3.0, 2.0, 1.0])
+    batched = week_projection.WeekProjection.for_teams([roster, other], game_days, ['G', 'A'])
+    for team_roster, projection in zip([roster, other], batched):
+        single = week_projection.WeekProjection(team_roster, game_days, ['G', 'A'])
+        assert (projection.games_played == single.games_played).all()
+
+
+def test_cache_reuses_roster_without_changes(week_projection, game_days, roster, projection_table):
+    cache = week_projection.WeekProjectionCache()
+    changes = ChangeSet([RosterChange(12, 13, datetime.date(2021, 3, 2))])
+
+    baseline = cache.projection(roster, game_days, ['G', 'A'])
+    changed = cache.projection(roster, game_days, ['G', 'A'], changes, projection_table=projection_table)
+    assert changed.baseline is baseline
+    assert cache.cache_info().hits == 1
+    uncached = week_projection.WeekProjection(roster, game_days, ['G', 'A'], changes, projection_table=projection_table)
+    assert (changed.games_played == uncached.games_played).all()
+    # days before the change keep the lineups of the roster without changes
+    assert (changed.games_played[:3, :1] == baseline.games_played[:, :1]).all()
+
+    # new projections are a different roster
+    cache.projection(roster.assign(fpts=[3.0, 2.0, 1.0]), game_days, ['G', 'A'])
+    assert cache.cache_info().misses == 2
+
+
+def test_stat_weights_choose_starters(week_projection, game_days, roster):
+    from csh_fantasy_bot.roster import AssignmentRosterBuilder
+
+    # one center slot, both centers play on the second day
+    builder = AssignmentRosterBuilder({'C': 1, 'D': 1})
+    roster = roster.assign(G=[3.0, 2.0, 0.0])
+    by_fpts = week_projection.WeekProjection(roster, game_days, ['G', 'A'], builder=builder)
+    by_goals = week_projection.WeekProjection(roster, game_days, ['G', 'A'], stat_weights={'G': 1.0}, builder=builder)
+    assert by_fpts.games_played[:2, 1].tolist() == [False, True]
+    assert by_goals.games_played[:2, 1].tolist() == [True, False]
+
+
+def test_league_roster_makeup(week_projection, game_days, roster):
+    from csh_fantasy_bot.roster import AssignmentRosterBuilder
+
+    cache = week_projection.WeekProjectionCache()
+    default = cache.projection(roster, game_days, ['G', 'A'])
+    one_center = cache.projection(roster, game_days, ['G', 'A'], builder=AssignmentRosterBuilder({'C': 1, 'D': 1}))
+    assert cache.cache_info().misses == 2
+    # both centers play on the second day, only one starts with a single center slot
+    assert default.games_played[:2, 1].tolist() == [True, True]
+    assert one_center.games_played[:2, 1].tolist() == [False, True]
+
+
+def test_results_shaped_as_week_model_results(monkeypatch, week_projection, game_days, roster):
+    from csh_fantasy_bot import score_gekko
+    from csh_fantasy_bot.roster import AssignmentRosterBuilder
+
+    monkeypatch.setattr(score_gekko, 'nhl_schedule', week_projection.nhl_schedule)
+    roster_makeup = {'C': 1, 'D': 1}
+    results = week_projection.WeekProjection(roster, game_days, ['G', 'A'], stat_weights={'G': 1, 'A': 1},
+                                             builder=AssignmentRosterBuilder(roster_makeup)).results().reset_index()
+    week_model = score_gekko.WeekModel(roster, {'G': 5.0, 'A': 5.0}, ['G', 'A'], game_days, roster_makeup)
+    model_results = week_model.score(backend=score_gekko.HighsBackend())
+
+    assert sorted(results.columns) == sorted(model_results.columns)
+    assert (results.lineup_solver == week_projection.ASSIGNMENT).all()
+    lineups = ['play_date', 'player_id', 'rostered_position']
+    assert sorted(results[lineups].itertuples(index=False)) == sorted(model_results[lineups].itertuples(index=False))